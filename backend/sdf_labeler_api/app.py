@@ -1,13 +1,28 @@
 # ABOUTME: FastAPI application entry point for SDF Labeler API
 # ABOUTME: Defines routes for project management, point cloud handling, and sample generation
 
+import asyncio
+import functools
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import asynccontextmanager
-from typing import Annotated
-
-from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from pathlib import Path
+from typing import Annotated, Any, Literal
+
+import aiofiles.tempfile
+import numpy as np
+import orjson
+from anyio import to_thread
+from fastapi import Depends, FastAPI, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse, JSONResponse
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 
+from sdf_labeler_api import workers
 from sdf_labeler_api.config import settings
 from sdf_labeler_api.models.constraints import Constraint, ConstraintSet
 from sdf_labeler_api.models.project import (
@@ -17,10 +32,13 @@ from sdf_labeler_api.models.project import (
     ProjectList,
 )
 from sdf_labeler_api.models.point_cloud import (
+    OctreeMetadata,
     PointCloudStats,
     PointCloudUploadResponse,
+    TileEncoding,
 )
 from sdf_labeler_api.models.samples import (
+    ExportConfig,
     SampleGenerationRequest,
     SamplePreview,
     SampleVisualizationResponse,
@@ -36,13 +54,25 @@ from sdf_labeler_api.models.pockets import PocketAnalysis
 from sdf_labeler_api.models.constraints import SignConvention
 
 
+def _new_process_pool() -> ProcessPoolExecutor:
+    """Create the pool that runs CPU-bound parsing and sampling off the event loop."""
+    return ProcessPoolExecutor(max_workers=settings.worker_processes or os.cpu_count())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup/shutdown."""
     # Startup: ensure data directory exists
     settings.ensure_data_dir()
+    app.state.pool = _new_process_pool()
+    # Starlette's default 40 threads oversubscribe the cores for sync work
+    to_thread.current_default_thread_limiter().total_tokens = (
+        settings.worker_threads or os.cpu_count()
+    )
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop worker processes
+    app.state.pool.shutdown(cancel_futures=True)
+    app.state.pool = None
 
 
 app = FastAPI(
@@ -52,6 +82,11 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Responses smaller than this are not worth compressing
+GZIP_MINIMUM_SIZE = 2048
+# Low levels keep most of the size win at a fraction of the CPU cost
+GZIP_COMPRESS_LEVEL = 4
+
 # Configure CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -61,6 +96,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# JSON tiles and octree metadata compress well; parquet and binary files are
+# already compact, so octet-stream responses are sent as-is
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=GZIP_MINIMUM_SIZE,
+    compresslevel=GZIP_COMPRESS_LEVEL,
+    exclude_content_types=(*DEFAULT_EXCLUDED_CONTENT_TYPES, "application/octet-stream"),
+)
+
 # Initialize services
 project_service = ProjectService(settings.data_dir)
 pointcloud_service = PointCloudService(settings)
@@ -68,6 +112,105 @@ constraint_service = ConstraintService()
 sampling_service = SamplingService()
 pocket_service = PocketService(settings)
 
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Exports are streamed from disk in chunks of this size (Starlette reads 64 KiB)
+EXPORT_CHUNK_SIZE = 1 << 20
+
+
+async def _stream_upload_to_disk(file: UploadFile) -> Path:
+    """Stream an upload into a temporary file under the data directory.
+
+    Memory use is bounded by UPLOAD_CHUNK_SIZE regardless of file size.
+    Raises 413 once the upload exceeds settings.max_upload_size_mb.
+    """
+    max_bytes = settings.max_upload_size_mb * 1024 * 1024
+    suffix = Path(file.filename or "").suffix
+    written = 0
+
+    async with aiofiles.tempfile.NamedTemporaryFile(
+        "wb", dir=settings.ensure_data_dir(), suffix=suffix, delete=False
+    ) as tmp:
+        tmp_path = Path(tmp.name)
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds {settings.max_upload_size_mb} MB limit",
+                    )
+                await tmp.write(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    return tmp_path
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, serializing numpy arrays natively.
+
+    For endpoints returning plain dicts with large arrays; endpoints with a
+    response_model are already serialized to bytes by Pydantic.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+async def load_project(project_id: str) -> Project:
+    """Resolve the project_id path parameter, raising 404 if it does not exist."""
+    project = project_service.get(project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+# Handlers taking this parameter get a resolved project or a 404
+ProjectDep = Annotated[Project, Depends(load_project)]
+
+
+def _replace_broken_pool(broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    """Swap a broken process pool for a fresh one, once per breakage."""
+    # Requests failing on the same pool race here; only the first replaces it
+    if app.state.pool is broken:
+        app.state.pool = _new_process_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+    return app.state.pool
+
+
+async def _run_cpu_bound(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a CPU-bound module-level function off the event loop.
+
+    Uses the process pool created in lifespan, falling back to the thread
+    pool when the app is served without lifespan (e.g. in tests). Only the
+    function's arguments are pickled, so pass module-level functions (see
+    sdf_labeler_api.workers) rather than bound service methods.
+
+    A worker dying (e.g. killed for memory) breaks the whole pool. The pool is
+    then rebuilt and the call retried once; if that breaks it again, the
+    request fails with 503.
+    """
+    pool = getattr(app.state, "pool", None)
+    call = functools.partial(func, *args, **kwargs)
+    if pool is None:
+        return await run_in_threadpool(call)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, call)
+    except BrokenProcessPool:
+        pool = _replace_broken_pool(pool)
+    try:
+        return await loop.run_in_executor(pool, call)
+    except BrokenProcessPool:
+        _replace_broken_pool(pool)
+        raise HTTPException(
+            status_code=503, detail="Worker process failed; try again later"
+        ) from None
+
 
 # =============================================================================
 # Health Check
@@ -95,33 +238,28 @@ async def create_project(project: ProjectCreate):
 async def list_projects():
     """List all projects."""
     projects = project_service.list_all()
-    return ProjectList(projects=projects, total=len(projects))
+    # Projects come from the service cache already validated; serializing them
+    # directly skips FastAPI's dump-and-revalidate pass over response_model
+    body = ProjectList.model_construct(projects=projects, total=len(projects))
+    return Response(content=body.model_dump_json(), media_type="application/json")
 
 
 @app.get("/v1/projects/{project_id}", response_model=Project)
-async def get_project(project_id: str):
+async def get_project(project_id: str, project: ProjectDep):
     """Get project details."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
     return project
 
 
 @app.patch("/v1/projects/{project_id}", response_model=Project)
-async def update_project(project_id: str, config: ProjectConfig):
+async def update_project(project_id: str, project: ProjectDep, config: ProjectConfig):
     """Update project configuration."""
-    project = project_service.update_config(project_id, config)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    return project_service.update_config(project_id, config)
 
 
 @app.delete("/v1/projects/{project_id}")
-async def delete_project(project_id: str):
+async def delete_project(project_id: str, project: ProjectDep):
     """Delete a project and all associated data."""
-    success = project_service.delete(project_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Project not found")
+    project_service.delete(project_id)
     return {"status": "deleted", "project_id": project_id}
 
 
@@ -133,6 +271,7 @@ async def delete_project(project_id: str):
 @app.post("/v1/projects/{project_id}/pointcloud", response_model=PointCloudUploadResponse)
 async def upload_pointcloud(
     project_id: str,
+    project: ProjectDep,
     file: UploadFile = File(...),
     estimate_normals: bool = True,
     normal_k: int = 16,
@@ -141,14 +280,14 @@ async def upload_pointcloud(
 
     Supports: PLY, LAS/LAZ, CSV, Parquet, NPY, NPZ
     """
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
+    tmp_path = await _stream_upload_to_disk(file)
     try:
-        result = await pointcloud_service.upload_and_process(
+        result = await _run_cpu_bound(
+            workers.process_upload,
+            settings.data_dir,
             project_id=project_id,
-            file=file,
+            path=tmp_path,
+            filename=file.filename or "unknown",
             estimate_normals=estimate_normals,
             normal_k=normal_k,
         )
@@ -157,18 +296,22 @@ async def upload_pointcloud(
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
 
 @app.get("/v1/projects/{project_id}/pointcloud", response_model=PointCloudStats)
 async def get_pointcloud_stats(project_id: str):
     """Get point cloud statistics."""
-    project = project_service.get(project_id)
+    # Project and point cloud reads are independent, so overlap them
+    project, stats = await asyncio.gather(
+        run_in_threadpool(project_service.get, project_id),
+        run_in_threadpool(pointcloud_service.get_stats, project_id),
+    )
     if project is None:
         raise HTTPException(status_code=404, detail="Project not found")
     if project.point_cloud_id is None:
         raise HTTPException(status_code=404, detail="No point cloud uploaded")
-
-    stats = pointcloud_service.get_stats(project_id)
     if stats is None:
         raise HTTPException(status_code=404, detail="Point cloud not found")
     return stats
@@ -181,25 +324,59 @@ async def get_pointcloud_tile(
     x: int,
     y: int,
     z: int,
+    encoding: Annotated[TileEncoding, Query()] = "json",
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    """Get a specific octree tile for LOD rendering."""
-    project = project_service.get(project_id)
+    """Get a specific octree tile for LOD rendering.
+
+    encoding="base64" returns arrays as base64 little-endian binary, which is
+    several times smaller than JSON number lists; "quantized" additionally
+    sends normals octahedral-encoded in 2 bytes and labels in 2 bits (see
+    EncodedTileData). encoding="binary" returns application/octet-stream: a
+    12-byte header then raw float32 positions, int8 octahedral normals and
+    packed labels (see tile_codec.encode_tile_binary); "binary16" sends
+    positions as uint16 steps across the tile's bounding box, half the size.
+    Tiles carry an ETag; clients revalidating with If-None-Match get a 304.
+    """
+    project, tile = await asyncio.gather(
+        run_in_threadpool(project_service.get, project_id),
+        run_in_threadpool(
+            pointcloud_service.get_tile_bytes, project_id, level, x, y, z, encoding
+        ),
+    )
     if project is None:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    tile_data = pointcloud_service.get_tile(project_id, level, x, y, z)
-    if tile_data is None:
+    if tile is None:
         raise HTTPException(status_code=404, detail="Tile not found")
 
-    return JSONResponse(content=tile_data)
+    etag, body = tile
+    # Tile URLs are reused when a new point cloud is uploaded, so clients
+    # must revalidate rather than cache indefinitely
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    binary = encoding in ("binary", "binary16")
+    media_type = "application/octet-stream" if binary else "application/json"
+    return Response(content=body, media_type=media_type, headers=headers)
 
 
-@app.get("/v1/projects/{project_id}/pointcloud/metadata")
-async def get_pointcloud_metadata(project_id: str):
-    """Get octree metadata for LOD streaming."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
+@app.get("/v1/projects/{project_id}/pointcloud/metadata", response_model=OctreeMetadata)
+async def get_pointcloud_metadata(
+    project_id: str,
+    project: ProjectDep,
+    format: Literal["json", "binary"] = Query(default="json"),
+):
+    """Get octree metadata for LOD streaming.
+
+    format="binary" returns the compact implicit hierarchy (a 64-byte header
+    plus one child mask and point count per node; see
+    tile_codec.encode_octree_hierarchy) instead of the JSON node dict.
+    """
+    if format == "binary":
+        path = pointcloud_service.get_octree_hierarchy_path(project_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Point cloud not found")
+        return FileResponse(path, media_type="application/octet-stream")
 
     metadata = pointcloud_service.get_octree_metadata(project_id)
     if metadata is None:
@@ -214,32 +391,38 @@ async def get_pointcloud_metadata(project_id: str):
 
 
 @app.post("/v1/projects/{project_id}/constraints", response_model=Constraint)
-async def add_constraint(project_id: str, constraint: Constraint):
+async def add_constraint(
+    project_id: str,
+    project: ProjectDep,
+    constraint: Constraint,
+):
     """Add a constraint to the project."""
     print(f"[DEBUG] add_constraint: type={constraint.type}", flush=True)
     if hasattr(constraint, 'back_buffer_coefficient'):
         print(f"[DEBUG] back_buffer_coefficient={constraint.back_buffer_coefficient}", flush=True)
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
+    return await run_in_threadpool(constraint_service.add, project_id, constraint)
+
 
-    return constraint_service.add(project_id, constraint)
+@app.post("/v1/projects/{project_id}/constraints:batch", response_model=list[Constraint])
+async def add_constraints_batch(
+    project_id: str,
+    project: ProjectDep,
+    constraints: list[Constraint],
+):
+    """Add many constraints to the project in one request and one write."""
+    return await run_in_threadpool(constraint_service.add_many, project_id, constraints)
 
 
 @app.get("/v1/projects/{project_id}/constraints", response_model=ConstraintSet)
-async def list_constraints(project_id: str):
+async def list_constraints(project_id: str, project: ProjectDep):
     """List all constraints in a project."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    return constraint_service.list_all(project_id)
+    return await run_in_threadpool(constraint_service.list_all, project_id)
 
 
 @app.delete("/v1/projects/{project_id}/constraints/{constraint_id}")
-async def delete_constraint(project_id: str, constraint_id: str):
+async def delete_constraint(project_id: str, constraint_id: str, project: ProjectDep):
     """Delete a constraint."""
-    success = constraint_service.delete(project_id, constraint_id)
+    success = await run_in_threadpool(constraint_service.delete, project_id, constraint_id)
     if not success:
         raise HTTPException(status_code=404, detail="Constraint not found")
     return {"status": "deleted", "constraint_id": constraint_id}
@@ -253,6 +436,7 @@ async def delete_constraint(project_id: str, constraint_id: str):
 @app.post("/v1/projects/{project_id}/pockets/analyze", response_model=PocketAnalysis)
 async def analyze_pockets(
     project_id: str,
+    project: ProjectDep,
     voxel_target: int = Query(default=256, ge=64, le=512),
     recompute: bool = Query(default=False),
 ):
@@ -260,9 +444,6 @@ async def analyze_pockets(
 
     This is a potentially expensive operation. Results are cached.
     """
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
     if project.point_cloud_id is None:
         raise HTTPException(status_code=400, detail="No point cloud uploaded")
 
@@ -277,36 +458,35 @@ async def analyze_pockets(
 
 
 @app.get("/v1/projects/{project_id}/pockets", response_model=PocketAnalysis | None)
-async def get_pockets(project_id: str):
+async def get_pockets(project_id: str, project: ProjectDep):
     """Get cached pocket analysis for a project."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    return pocket_service.get_cached_analysis(project_id)
+    return await run_in_threadpool(pocket_service.get_cached_analysis, project_id)
 
 
 @app.get("/v1/projects/{project_id}/pockets/{pocket_id}/voxels")
-async def get_pocket_voxels(project_id: str, pocket_id: int):
+async def get_pocket_voxels(
+    project_id: str,
+    project: ProjectDep,
+    pocket_id: int,
+):
     """Get voxel coordinates for visualization of a specific pocket."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    voxels = pocket_service.get_pocket_voxels(project_id, pocket_id)
+    voxels = await run_in_threadpool(pocket_service.get_pocket_voxels, project_id, pocket_id)
     if voxels is None:
         raise HTTPException(status_code=404, detail="Pocket not found")
 
-    return {
-        "pocket_id": pocket_id,
-        "voxel_count": len(voxels),
-        "positions": voxels.flatten().tolist(),
-    }
+    return ORJSONResponse(
+        {
+            "pocket_id": pocket_id,
+            "voxel_count": len(voxels),
+            "positions": voxels.ravel(),
+        }
+    )
 
 
 @app.post("/v1/projects/{project_id}/pockets/{pocket_id}/toggle", response_model=Constraint)
 async def toggle_pocket(
     project_id: str,
+    project: ProjectDep,
     pocket_id: int,
     sign: SignConvention = Query(...),
 ):
@@ -315,13 +495,11 @@ async def toggle_pocket(
     SOLID = fill the pocket (negative SDF)
     EMPTY = leave as void (positive SDF, default)
     """
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
     try:
-        pocket_constraint = pocket_service.create_pocket_constraint(project_id, pocket_id, sign)
-        return constraint_service.add(project_id, pocket_constraint)
+        pocket_constraint = await run_in_threadpool(
+            pocket_service.create_pocket_constraint, project_id, pocket_id, sign
+        )
+        return await run_in_threadpool(constraint_service.add, project_id, pocket_constraint)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -332,36 +510,46 @@ async def toggle_pocket(
 
 
 @app.post("/v1/projects/{project_id}/samples/preview", response_model=SamplePreview)
-async def preview_samples(project_id: str, request: SampleGenerationRequest):
+async def preview_samples(
+    project_id: str,
+    project: ProjectDep,
+    request: SampleGenerationRequest,
+):
     """Preview what training samples will be generated."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    return sampling_service.preview(project_id, request)
+    return await _run_cpu_bound(workers.preview_samples, settings.data_dir, project_id, request)
 
 
 @app.post("/v1/projects/{project_id}/samples/generate", response_model=TrainingSampleSet)
-async def generate_samples(project_id: str, request: SampleGenerationRequest):
-    """Generate training samples from constraints."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
+async def generate_samples(
+    project_id: str,
+    project: ProjectDep,
+    request: SampleGenerationRequest,
+    include_samples: bool = Query(
+        default=False, description="Return the samples, not only their counts (for debugging)"
+    ),
+):
+    """Generate training samples from constraints.
 
-    return sampling_service.generate(project_id, request)
+    Samples are saved with the project; fetch them via the samples or Parquet
+    export endpoints rather than this response.
+    """
+    return await _run_cpu_bound(
+        workers.generate_samples,
+        settings.data_dir,
+        project_id,
+        request,
+        include_samples=include_samples,
+    )
 
 
 @app.get("/v1/projects/{project_id}/samples", response_model=SampleVisualizationResponse)
 async def get_samples(
     project_id: str,
+    project: ProjectDep,
     limit: int = Query(default=10000, ge=100, le=100000),
     subsample: bool = Query(default=True),
 ):
     """Get samples for 3D visualization."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
     return sampling_service.get_samples_for_visualization(project_id, limit, subsample)
 
 
@@ -373,28 +561,29 @@ async def get_samples(
 @app.get("/v1/projects/{project_id}/export/parquet")
 async def export_parquet(project_id: str):
     """Export training data as Parquet file (survi-compatible)."""
-    project = project_service.get(project_id)
+    project, path = await asyncio.gather(
+        run_in_threadpool(project_service.get, project_id),
+        run_in_threadpool(sampling_service.export_parquet, project_id),
+    )
     if project is None:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    path = sampling_service.export_parquet(project_id)
     if path is None:
         raise HTTPException(status_code=404, detail="No samples generated")
 
-    return FileResponse(
+    # samples.parquet is written at generation time, so the export streams
+    # that file as-is rather than re-encoding it per request
+    response = FileResponse(
         path=path,
         media_type="application/octet-stream",
         filename=f"{project_id}_samples.parquet",
     )
+    response.chunk_size = EXPORT_CHUNK_SIZE
+    return response
 
 
-@app.get("/v1/projects/{project_id}/export/config")
-async def export_config(project_id: str):
+@app.get("/v1/projects/{project_id}/export/config", response_model=ExportConfig)
+async def export_config(project_id: str, project: ProjectDep):
     """Export SDFTaskSpec as JSON for survi CLI."""
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
     config = sampling_service.export_config(project_id, project)
     return config
 
@@ -436,6 +625,7 @@ async def list_scenarios(category: str | None = None):
 @app.post("/v1/projects/{project_id}/load-scenario")
 async def load_scenario(
     project_id: str,
+    project: ProjectDep,
     scenario_name: str = Query(..., description="Name of the scenario to load"),
     category: str = Query("trenchfoot", description="Category: 'trenchfoot' or 'sdf'"),
     variant: str = Query("culled", description="Point cloud variant (for trenchfoot)"),
@@ -444,13 +634,12 @@ async def load_scenario(
 
     This replaces any existing point cloud in the project.
     """
-    project = project_service.get(project_id)
-    if project is None:
-        raise HTTPException(status_code=404, detail="Project not found")
-
     try:
         if category == "trenchfoot":
-            loaded = scenarios_service.load_trenchfoot_scenario(scenario_name, variant=variant)
+            # float32 halves the memory each cached scenario holds
+            loaded = scenarios_service.load_trenchfoot_scenario(
+                scenario_name, variant=variant, dtype=np.float32
+            )
         elif category == "sdf":
             loaded = scenarios_service.load_sdf_scenario(scenario_name)
         else:
@@ -29,6 +29,8 @@ class Settings(BaseSettings):
     octree_node_target: int = 65536  # Target points per octree leaf node
     octree_max_depth: int = 12
     default_normal_k: int = 16
+    # Above this many points, normals use approximate k-NN if hnswlib or faiss is installed
+    ann_normal_threshold: int = 1_000_000
 
     # Pocket detection settings
     pocket_voxel_target: int = 256  # Target voxels along longest axis
@@ -37,6 +39,11 @@ class Settings(BaseSettings):
     pocket_occupancy_dilation: int = 1  # Voxels to dilate around points
     pocket_min_volume_voxels: int = 8  # Minimum pocket size to report
 
+    # Worker processes for CPU-bound work (None = one per core)
+    worker_processes: int | None = None
+    # Threads for run_in_threadpool and sync endpoints (None = one per core)
+    worker_threads: int | None = None
+
     # CORS settings
     cors_origins: list[str] = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
@@ -0,0 +1,47 @@
+# ABOUTME: Identifier generation for projects, constraints, and point clouds
+# ABOUTME: Produces time-ordered UUIDv7 strings (RFC 9562)
+
+import os
+import threading
+import time
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+# rand_a holds a 12-bit counter; seeding it below 0x800 leaves room to count
+# up within a millisecond before borrowing the next one
+_COUNTER_MAX = 0xFFF
+_COUNTER_SEED_MASK = 0x7FF
+
+
+def _uuid7_int() -> int:
+    """Generate a UUIDv7 as a 128-bit integer, monotonic within this process.
+
+    Layout: 48-bit Unix milliseconds, version 7, a 12-bit counter seeded
+    randomly each millisecond, the RFC variant, and 62 random bits.
+    """
+    global _last_ms, _counter
+
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _counter = int.from_bytes(os.urandom(2), "big") & _COUNTER_SEED_MASK
+        else:
+            # Same millisecond (or clock went back): keep counting
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return (ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand_b
+
+
+def new_id() -> str:
+    """Generate a new identifier string (canonical UUID text form)."""
+    # Formatting the integer directly skips building a UUID object per id
+    h = f"{_uuid7_int():032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
@@ -1,11 +1,25 @@
 # ABOUTME: Constraint models for SDF labeling
 # ABOUTME: Defines geometric primitives and regions for inside/outside marking
 
+from dataclasses import dataclass
 from enum import Enum
-from typing import Annotated, Literal, Union
-import uuid
+from typing import Annotated, Any, Literal, Union
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PlainSerializer,
+    PlainValidator,
+    PrivateAttr,
+    TypeAdapter,
+    WithJsonSchema,
+    computed_field,
+    model_validator,
+)
+
+from sdf_labeler_api.ids import new_id
 
 
 class SignConvention(str, Enum):
@@ -22,14 +36,69 @@ class SignConvention(str, Enum):
     SURFACE = "surface"  # On boundary / zero SDF
 
 
+def _to_point_array(value: Any) -> np.ndarray:
+    """Coerce a sequence of (x, y, z) points into an (N, 3) float64 array."""
+    try:
+        arr = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Expected a list of (x, y, z) points: {e}") from e
+    if arr.size == 0:
+        return arr.reshape(0, 3)
+    if arr.ndim != 2 or arr.shape[1] != 3:
+        raise ValueError(f"Expected a list of (x, y, z) points, got shape {arr.shape}")
+    return arr
+
+
+# (N, 3) point array that validates from and serializes to nested [x, y, z] lists
+PointArray = Annotated[
+    np.ndarray,
+    PlainValidator(_to_point_array),
+    PlainSerializer(lambda arr: arr.tolist(), return_type=list),
+    WithJsonSchema(
+        {
+            "type": "array",
+            "items": {
+                "type": "array",
+                "items": {"type": "number"},
+                "minItems": 3,
+                "maxItems": 3,
+            },
+        }
+    ),
+]
+
+
 class BaseConstraint(BaseModel):
     """Base class for all constraint types."""
 
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    model_config = ConfigDict(extra="forbid")
+
+    id: str = Field(default_factory=new_id)
     name: str | None = Field(default=None, description="Optional user-friendly name")
     sign: SignConvention = Field(..., description="Label: solid (inside) or empty (outside)")
     weight: float = Field(default=1.0, ge=0.0, le=10.0, description="Sample weight")
 
+    def __eq__(self, other: object) -> bool:
+        """Compare like BaseModel, but with array fields compared by value.
+
+        The default comparison tests the field dicts for equality, which is
+        ambiguous for PointArray fields. Private attributes only cache data
+        derived from the fields (e.g. RayCarveConstraint's ray arrays), so
+        they are not compared.
+        """
+        if not isinstance(other, BaseModel):
+            return NotImplemented
+        return (
+            type(self) is type(other)
+            and self.__dict__.keys() == other.__dict__.keys()
+            and all(
+                np.array_equal(value, other.__dict__[name])
+                if isinstance(value, np.ndarray)
+                else value == other.__dict__[name]
+                for name, value in self.__dict__.items()
+            )
+        )
+
 
 class BoxConstraint(BaseConstraint):
     """Axis-aligned bounding box constraint."""
@@ -77,9 +146,7 @@ class BrushStrokeConstraint(BaseConstraint):
     """User-painted volumetric stroke in 3D space."""
 
     type: Literal["brush_stroke"] = "brush_stroke"
-    stroke_points: list[tuple[float, float, float]] = Field(
-        ..., description="Path of brush center positions"
-    )
+    stroke_points: PointArray = Field(..., description="Path of brush center positions")
     radius: float = Field(..., gt=0, description="Brush/stroke radius")
 
 
@@ -131,6 +198,47 @@ class RayInfo(BaseModel):
     )
 
 
+@dataclass(frozen=True)
+class RayCarveArrays:
+    """Structure-of-arrays view of a ray-carve constraint's rays.
+
+    Missing per-ray values are encoded in-band: local_spacing is NaN when
+    not provided, and has_surface_normal masks rows of surface_normals.
+    """
+
+    origins: np.ndarray  # (N, 3)
+    directions: np.ndarray  # (N, 3), normalized
+    hit_distances: np.ndarray  # (N,)
+    local_spacing: np.ndarray  # (N,), NaN where missing
+    surface_normals: np.ndarray  # (N, 3), zero where missing
+    has_surface_normal: np.ndarray  # (N,) bool
+
+    @classmethod
+    def from_rays(cls, rays: list["RayInfo"]) -> "RayCarveArrays":
+        """Pack a list of rays into contiguous arrays."""
+        n = len(rays)
+        origins = np.array([r.origin for r in rays], dtype=np.float64).reshape(n, 3)
+        directions = np.array([r.direction for r in rays], dtype=np.float64).reshape(n, 3)
+        directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+        hit_distances = np.array([r.hit_distance for r in rays], dtype=np.float64)
+        local_spacing = np.array(
+            [np.nan if r.local_spacing is None else r.local_spacing for r in rays],
+            dtype=np.float64,
+        )
+        has_surface_normal = np.array([bool(r.surface_normal) for r in rays], dtype=bool)
+        surface_normals = np.array(
+            [r.surface_normal or (0.0, 0.0, 0.0) for r in rays], dtype=np.float64
+        ).reshape(n, 3)
+        return cls(
+            origins=origins,
+            directions=directions,
+            hit_distances=hit_distances,
+            local_spacing=local_spacing,
+            surface_normals=surface_normals,
+            has_surface_normal=has_surface_normal,
+        )
+
+
 class RayCarveConstraint(BaseConstraint):
     """Constraint from ray-scribble interaction.
 
@@ -158,6 +266,22 @@ class RayCarveConstraint(BaseConstraint):
         default=1.0, ge=0, description="Multiplier for per-ray local_spacing"
     )
 
+    _arrays: RayCarveArrays | None = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def _pack_rays(self) -> "RayCarveConstraint":
+        """Cache the rays as arrays for vectorized sampling."""
+        self._arrays = RayCarveArrays.from_rays(self.rays)
+        return self
+
+    @property
+    def arrays(self) -> RayCarveArrays:
+        """Rays as structure-of-arrays, built once at validation time."""
+        if self._arrays is None:
+            # Instances built without validation (model_construct) pack lazily
+            self._arrays = RayCarveArrays.from_rays(self.rays)
+        return self._arrays
+
 
 class PocketConstraint(BaseConstraint):
     """Pocket (cavity) constraint from voxel analysis."""
@@ -200,13 +324,17 @@ Constraint = Annotated[
     Field(discriminator="type"),
 ]
 
+# Validator for the union, built once; dispatches on "type" without trying each arm
+CONSTRAINT_ADAPTER: TypeAdapter[Constraint] = TypeAdapter(Constraint)
+
 
 class ConstraintSet(BaseModel):
     """Collection of all constraints for a project."""
 
     constraints: list[Constraint] = Field(default_factory=list)
-    total: int = 0
 
-    def __init__(self, **data):
-        super().__init__(**data)
-        self.total = len(self.constraints)
+    @computed_field
+    @property
+    def total(self) -> int:
+        """Number of constraints; derived, so it never goes stale."""
+        return len(self.constraints)
@@ -1,8 +1,13 @@
 # ABOUTME: Point cloud related Pydantic models
 # ABOUTME: Defines upload responses, statistics, and tile metadata
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
+# Wire formats for tile point data
+TileEncoding = Literal["json", "base64", "quantized", "binary", "binary16"]
+
 
 class PointCloudUploadResponse(BaseModel):
     """Response after uploading and processing a point cloud."""
@@ -68,3 +73,23 @@ class TileData(BaseModel):
     normals: list[float] | None = None
     # Labels as array (0=unlabeled, 1=solid, 2=empty)
     labels: list[int] | None = None
+
+
+class EncodedTileData(BaseModel):
+    """Point data for a single octree tile as base64-encoded binary arrays.
+
+    Arrays are little-endian and map directly onto typed arrays on the client.
+
+    - base64: positions and normals as Float32Array, labels as Uint8Array
+    - quantized: positions as Float32Array; normals as Int8Array pairs in
+      octahedral encoding (divide by 127, z = 1 - |x| - |y|, and where z < 0
+      fold x, y to (1 - |y|) * sign(x), (1 - |x|) * sign(y), then normalize);
+      labels packed four per byte, 2 bits each, first label in the low bits
+    """
+
+    node_id: str
+    point_count: int
+    encoding: Literal["base64", "quantized"] = "base64"
+    positions: str
+    normals: str | None = None
+    labels: str | None = None
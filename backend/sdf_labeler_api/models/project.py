@@ -1,11 +1,15 @@
 # ABOUTME: Project-related Pydantic models
 # ABOUTME: Defines project metadata, configuration, and state
 
-from datetime import datetime
+from datetime import UTC, datetime
+from functools import partial
 from typing import Literal
-import uuid
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from sdf_labeler_api.ids import new_id
+
+utc_now = partial(datetime.now, UTC)
 
 
 class ProjectConfig(BaseModel):
@@ -41,14 +45,14 @@ class ProjectCreate(BaseModel):
 class Project(BaseModel):
     """Complete project state."""
 
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     name: str
     description: str | None = None
     config: ProjectConfig = Field(default_factory=ProjectConfig)
 
     # Timestamps
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
 
     # Point cloud reference
     point_cloud_id: str | None = None
@@ -59,6 +63,12 @@ class Project(BaseModel):
     constraint_count: int = 0
     sample_count: int = 0
 
+    @field_validator("created_at", "updated_at")
+    @classmethod
+    def _assume_utc(cls, value: datetime) -> datetime:
+        """Treat naive timestamps (written by older versions) as UTC."""
+        return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
 
 class ProjectList(BaseModel):
     """Response model for listing projects."""
@@ -3,7 +3,7 @@
 
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 
 class SampleGenerationRequest(BaseModel):
@@ -27,6 +27,8 @@ class SampleGenerationRequest(BaseModel):
 class TrainingSample(BaseModel):
     """Single training sample with SDF value."""
 
+    model_config = ConfigDict(frozen=True)
+
     x: float
     y: float
     z: float
@@ -40,10 +42,17 @@ class TrainingSample(BaseModel):
     is_free: bool = False
 
 
+# Validates a whole list of sample dicts in one pydantic-core call, which is
+# cheaper than constructing TrainingSample objects one at a time
+TRAINING_SAMPLES_ADAPTER: TypeAdapter[list[TrainingSample]] = TypeAdapter(list[TrainingSample])
+
+
 class TrainingSampleSet(BaseModel):
     """Complete training sample set."""
 
-    samples: list[TrainingSample]
+    samples: list[TrainingSample] = Field(
+        default_factory=list, description="Generated samples, if requested"
+    )
     sample_count: int
     source_breakdown: dict[str, int] = Field(
         default_factory=dict, description="Sample counts by source type"
@@ -96,6 +105,9 @@ class SamplePoint(BaseModel):
     phi: float
 
 
+SAMPLE_POINTS_ADAPTER: TypeAdapter[list[SamplePoint]] = TypeAdapter(list[SamplePoint])
+
+
 class SampleVisualizationResponse(BaseModel):
     """Response for sample visualization endpoint."""
 
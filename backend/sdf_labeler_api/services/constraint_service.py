@@ -1,81 +1,229 @@
 # ABOUTME: Constraint management service
 # ABOUTME: Handles storage and retrieval of user-defined constraints
 
-import json
+import threading
 from pathlib import Path
+from typing import Any, NamedTuple
 
-from sdf_labeler_api.models.constraints import Constraint, ConstraintSet
+import orjson
+
+from sdf_labeler_api.models.constraints import CONSTRAINT_ADAPTER, Constraint, ConstraintSet
+
+
+def _encode(constraint: Constraint) -> bytes:
+    """Serialize one constraint as a single NDJSON line, without the newline."""
+    return orjson.dumps(constraint.model_dump(mode="json"))
+
+
+def _join_lines(lines: list[bytes]) -> bytes:
+    """Join encoded constraints into NDJSON file contents."""
+    return b"".join(line + b"\n" for line in lines)
+
+
+def _file_version(path: Path) -> tuple[int, int]:
+    """(mtime_ns, size) of a file, which changes on every write to it."""
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _CacheEntry(NamedTuple):
+    """A parsed constraints file, valid while its (mtime_ns, size) is unchanged.
+
+    mtime alone can miss an append landing in the same clock tick as the
+    cached read; the file is append-only NDJSON, so an append always
+    changes its size.
+    """
+
+    version: tuple[int, int]
+    constraints: ConstraintSet
+    index: dict[str, int]
+    # Encoded form of each constraint, so rewrites only serialize what changed
+    lines: list[bytes]
 
 
 class ConstraintService:
-    """Service for managing project constraints."""
+    """Service for managing project constraints.
+
+    Constraints are stored as NDJSON so adding is an append rather than a
+    rewrite of the whole file; update and delete rewrite it. Projects still
+    holding a constraints.json document are read as-is and converted on
+    their next write.
+
+    Parsed constraint files are cached per path together with an id -> index
+    map and each constraint's encoded line, and reused while the file's mtime
+    and size are unchanged. Cached sets are replaced rather than mutated, so results
+    handed out stay consistent and their cached lines stay accurate.
+
+    Endpoints call the service from a thread pool, so each project's reads and
+    read-modify-writes are serialized by a per-project lock.
+    """
 
     def __init__(self):
         # Constraints are stored per-project in their project directory
-        pass
+        self._cache: dict[Path, _CacheEntry] = {}
+        self._locks: dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, project_id: str) -> threading.RLock:
+        """Get the lock guarding a project's constraints file and cache entry."""
+        with self._locks_guard:
+            return self._locks.setdefault(project_id, threading.RLock())
 
     def _constraints_path(self, project_id: str, data_dir: Path) -> Path:
         """Get path to constraints file."""
+        return data_dir / "projects" / project_id / "constraints.ndjson"
+
+    def _legacy_path(self, project_id: str, data_dir: Path) -> Path:
+        """Get path to the pre-NDJSON constraints document."""
         return data_dir / "projects" / project_id / "constraints.json"
 
-    def add(self, project_id: str, constraint: Constraint) -> Constraint:
-        """Add a constraint to a project."""
+    def add(self, project_id: str, constraint: Constraint | dict[str, Any]) -> Constraint:
+        """Add a constraint to a project.
+
+        Args:
+            project_id: Project to add the constraint to
+            constraint: A constraint model, or a raw payload validated against
+                the Constraint union
+        """
+        return self.add_many(project_id, [constraint])[0]
+
+    def add_many(
+        self, project_id: str, constraints: list[Constraint | dict[str, Any]]
+    ) -> list[Constraint]:
+        """Add several constraints to a project with a single read and write.
+
+        Args:
+            project_id: Project to add the constraints to
+            constraints: Constraint models or raw payloads; all are validated
+                before anything is written
+        """
         from sdf_labeler_api.config import settings
 
-        constraints = self.list_all(project_id)
-        constraints.constraints.append(constraint)
-        self._save(project_id, constraints, settings.data_dir)
-        return constraint
+        added = [
+            CONSTRAINT_ADAPTER.validate_python(c) if isinstance(c, dict) else c
+            for c in constraints
+        ]
+
+        added_lines = [_encode(c) for c in added]
+
+        with self._lock(project_id):
+            existing = self._load(project_id)
+            updated = ConstraintSet(constraints=[*existing.constraints.constraints, *added])
+            lines = [*existing.lines, *added_lines]
+
+            path = self._constraints_path(project_id, settings.data_dir)
+            if self._legacy_path(project_id, settings.data_dir).exists():
+                # Convert to NDJSON in full rather than appending beside the old file
+                self._save(project_id, updated, lines, settings.data_dir)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "ab") as f:
+                    f.write(_join_lines(added_lines))
+                self._remember(path, updated, lines)
+        return added
 
     def list_all(self, project_id: str) -> ConstraintSet:
         """List all constraints for a project."""
-        from sdf_labeler_api.config import settings
-
-        path = self._constraints_path(project_id, settings.data_dir)
-        if not path.exists():
-            return ConstraintSet(constraints=[])
-
-        with open(path) as f:
-            data = json.load(f)
-
-        return ConstraintSet(**data)
+        return self._load(project_id).constraints
 
     def get(self, project_id: str, constraint_id: str) -> Constraint | None:
         """Get a specific constraint."""
-        constraints = self.list_all(project_id)
-        for c in constraints.constraints:
-            if c.id == constraint_id:
-                return c
-        return None
+        entry = self._load(project_id)
+        i = entry.index.get(constraint_id)
+        return None if i is None else entry.constraints.constraints[i]
 
     def update(self, project_id: str, constraint: Constraint) -> Constraint | None:
         """Update an existing constraint."""
         from sdf_labeler_api.config import settings
 
-        constraints = self.list_all(project_id)
-        for i, c in enumerate(constraints.constraints):
-            if c.id == constraint.id:
-                constraints.constraints[i] = constraint
-                self._save(project_id, constraints, settings.data_dir)
-                return constraint
-        return None
+        with self._lock(project_id):
+            entry = self._load(project_id)
+            i = entry.index.get(constraint.id)
+            if i is None:
+                return None
+
+            items = list(entry.constraints.constraints)
+            items[i] = constraint
+            lines = list(entry.lines)
+            lines[i] = _encode(constraint)
+            self._save(project_id, ConstraintSet(constraints=items), lines, settings.data_dir)
+        return constraint
 
     def delete(self, project_id: str, constraint_id: str) -> bool:
         """Delete a constraint."""
         from sdf_labeler_api.config import settings
 
-        constraints = self.list_all(project_id)
-        original_count = len(constraints.constraints)
-        constraints.constraints = [c for c in constraints.constraints if c.id != constraint_id]
-
-        if len(constraints.constraints) < original_count:
-            self._save(project_id, constraints, settings.data_dir)
-            return True
-        return False
+        with self._lock(project_id):
+            entry = self._load(project_id)
+            if constraint_id not in entry.index:
+                return False
+
+            kept = [
+                (c, line)
+                for c, line in zip(entry.constraints.constraints, entry.lines, strict=True)
+                if c.id != constraint_id
+            ]
+            remaining = ConstraintSet(constraints=[c for c, _ in kept])
+            self._save(project_id, remaining, [line for _, line in kept], settings.data_dir)
+        return True
+
+    def _load(self, project_id: str) -> _CacheEntry:
+        """Load a project's constraints, id -> index map and lines, using the cache if fresh."""
+        with self._lock(project_id):
+            return self._load_locked(project_id)
+
+    def _load_locked(self, project_id: str) -> _CacheEntry:
+        """Load a project's constraints; the caller holds the project's lock."""
+        from sdf_labeler_api.config import settings
 
-    def _save(self, project_id: str, constraints: ConstraintSet, data_dir: Path) -> None:
-        """Save constraints to disk."""
+        path = self._constraints_path(project_id, settings.data_dir)
+        legacy_path = self._legacy_path(project_id, settings.data_dir)
+        if legacy_path.exists():
+            path = legacy_path
+        try:
+            version = _file_version(path)
+        except FileNotFoundError:
+            self._cache.pop(path, None)
+            return _CacheEntry((0, 0), ConstraintSet(constraints=[]), {}, [])
+
+        cached = self._cache.get(path)
+        if cached is not None and cached.version == version:
+            return cached
+
+        data = path.read_bytes()
+        if path == legacy_path:
+            constraints = ConstraintSet.model_validate_json(data)
+            lines = [_encode(c) for c in constraints.constraints]
+        else:
+            # Splice the lines into one document so pydantic-core parses and
+            # validates everything in a single pass
+            lines = [line for line in data.splitlines() if line.strip()]
+            document = b'{"constraints":[' + b",".join(lines) + b"]}"
+            constraints = ConstraintSet.model_validate_json(document)
+
+        return self._remember(path, constraints, lines)
+
+    def _remember(
+        self, path: Path, constraints: ConstraintSet, lines: list[bytes]
+    ) -> _CacheEntry:
+        """Cache a constraint set and its encoded lines against the file's current version."""
+        index: dict[str, int] = {}
+        for i, c in enumerate(constraints.constraints):
+            index.setdefault(c.id, i)
+        entry = _CacheEntry(_file_version(path), constraints, index, lines)
+        self._cache[path] = entry
+        return entry
+
+    def _save(
+        self, project_id: str, constraints: ConstraintSet, lines: list[bytes], data_dir: Path
+    ) -> None:
+        """Rewrite a project's constraints file in full from already-encoded lines."""
         path = self._constraints_path(project_id, data_dir)
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w") as f:
-            json.dump(constraints.model_dump(mode="json"), f, indent=2)
+        path.write_bytes(_join_lines(lines))
+        self._remember(path, constraints, lines)
+
+        legacy_path = self._legacy_path(project_id, data_dir)
+        if legacy_path.exists():
+            legacy_path.unlink()
+            self._cache.pop(legacy_path, None)
@@ -1,11 +1,16 @@
 # ABOUTME: Pocket detection service using voxel occupancy analysis
 # ABOUTME: Provides flood-fill based cavity detection for click-pocket annotation
 
-import json
+import asyncio
+import functools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
 import numpy as np
+import orjson
 from scipy import ndimage
 
 from sdf_labeler_api.config import Settings
@@ -16,6 +21,70 @@ from sdf_labeler_api.models.pockets import (
     VoxelGridMetadata,
     VoxelState,
 )
+from sdf_labeler_api.services import point_store
+
+# Points binned per task when marking occupied voxels
+VOXEL_BIN_CHUNK_SIZE = 1 << 20
+
+
+@functools.cache
+def _binning_pool(pid: int) -> ThreadPoolExecutor:
+    """Thread pool shared by every _mark_voxels call in process pid.
+
+    Keyed by PID because a forked worker process inherits the executor but
+    none of its threads.
+    """
+    return ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="voxel-bin")
+
+
+def _mark_voxels(
+    grid: np.ndarray,
+    xyz: np.ndarray,
+    bounds_low: np.ndarray,
+    voxel_size: float,
+    value: int | bool,
+) -> None:
+    """Set every voxel of grid that contains a point to value, in place.
+
+    Points are binned to flat indices in chunks of VOXEL_BIN_CHUNK_SIZE,
+    which bounds the temporary index arrays. Chunks run on a thread pool:
+    numpy releases the GIL for the arithmetic and the scatter, and threads
+    racing to write the same constant to a voxel is harmless.
+    """
+    flat_grid = grid.reshape(-1)
+    max_index = np.asarray(grid.shape) - 1
+    inv_voxel_size = 1.0 / voxel_size
+
+    def mark(start: int) -> None:
+        chunk = xyz[start : start + VOXEL_BIN_CHUNK_SIZE]
+        voxel_indices = ((chunk - bounds_low) * inv_voxel_size).astype(np.intp)
+        np.clip(voxel_indices, 0, max_index, out=voxel_indices)
+        flat_grid[np.ravel_multi_index(voxel_indices.T, grid.shape)] = value
+
+    starts = range(0, len(xyz), VOXEL_BIN_CHUNK_SIZE)
+    if len(starts) <= 1:
+        for start in starts:
+            mark(start)
+        return
+
+    list(_binning_pool(os.getpid()).map(mark, starts))
+
+
+def _save_cold(path: Path, array: np.ndarray) -> None:
+    """np.save an array nothing reads back soon, without keeping it in page cache.
+
+    The data is flushed to disk and its pages dropped with POSIX_FADV_DONTNEED,
+    so a large write does not evict other projects' hot files. Only pages of
+    this file are affected; on platforms without posix_fadvise this is a
+    plain np.save.
+    """
+    with open(path, "wb") as f:
+        np.save(f, array)
+        if hasattr(os, "posix_fadvise"):
+            f.flush()
+            # Dirty pages are not dropped, so write them back first
+            os.fdatasync(f.fileno())
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
 
 
 class PocketService:
@@ -40,12 +109,9 @@ class PocketService:
         return pockets_dir
 
     def _load_points(self, project_id: str) -> np.ndarray | None:
-        """Load point cloud positions."""
-        points_path = self._pointcloud_dir(project_id) / "points.npz"
-        if not points_path.exists():
-            return None
-        data = np.load(points_path)
-        return data["xyz"]
+        """Load point cloud positions (memory-mapped read-only when possible)."""
+        loaded = point_store.load_points(self._pointcloud_dir(project_id))
+        return None if loaded is None else loaded[0]
 
     def compute_voxel_resolution(
         self,
@@ -55,14 +121,12 @@ class PocketService:
     ) -> float:
         """Compute adaptive voxel size based on point cloud extent."""
         target = target_voxels or self.settings.pocket_voxel_target
-        extent = bounds_high - bounds_low
-        longest_axis = np.max(extent)
+        # Three-element metadata: plain Python floats avoid numpy dispatch
+        longest_axis = max((bounds_high - bounds_low).tolist())
         voxel_size = longest_axis / target
 
         # Enforce minimum voxel size
-        voxel_size = max(voxel_size, self.settings.pocket_min_voxel_size)
-
-        return float(voxel_size)
+        return max(voxel_size, self.settings.pocket_min_voxel_size)
 
     def _build_occupancy_grid(
         self,
@@ -86,33 +150,23 @@ class PocketService:
         """
         dilation = dilation if dilation is not None else self.settings.pocket_occupancy_dilation
 
-        # Compute grid resolution
-        extent = bounds_high - bounds_low
-        resolution = np.ceil(extent / voxel_size).astype(int)
-
-        # Clamp to max resolution
+        # Compute grid resolution, clamped to the per-axis maximum
         max_res = self.settings.pocket_max_voxels_per_axis
-        resolution = np.minimum(resolution, max_res)
+        resolution = tuple(
+            min(math.ceil(e / voxel_size), max_res) for e in (bounds_high - bounds_low).tolist()
+        )
 
         # Initialize grid as EMPTY
-        grid = np.full(tuple(resolution), VoxelState.EMPTY, dtype=np.uint8)
-
-        # Bin points to voxels
-        voxel_indices = ((xyz - bounds_low) / voxel_size).astype(int)
-        voxel_indices = np.clip(voxel_indices, 0, resolution - 1)
+        grid = np.full(resolution, VoxelState.EMPTY, dtype=np.uint8)
 
         # Mark occupied voxels
         if dilation == 0:
             # Simple: mark only voxel containing point
-            grid[voxel_indices[:, 0], voxel_indices[:, 1], voxel_indices[:, 2]] = (
-                VoxelState.OCCUPIED
-            )
+            _mark_voxels(grid, xyz, bounds_low, voxel_size, VoxelState.OCCUPIED)
         else:
             # Create a binary mask and dilate
             occupied_mask = np.zeros_like(grid, dtype=bool)
-            occupied_mask[
-                voxel_indices[:, 0], voxel_indices[:, 1], voxel_indices[:, 2]
-            ] = True
+            _mark_voxels(occupied_mask, xyz, bounds_low, voxel_size, True)
 
             # Dilate the occupied region
             struct = ndimage.generate_binary_structure(3, 1)  # 6-connectivity
@@ -124,87 +178,97 @@ class PocketService:
         return grid
 
     def _flood_fill_outside(self, grid: np.ndarray) -> np.ndarray:
-        """Flood-fill from boundary to mark outside air.
-
-        Uses scipy.ndimage for efficient 3D flood fill.
-        """
-        # Create boundary seed mask (empty voxels on grid boundary)
-        boundary_mask = np.zeros_like(grid, dtype=bool)
-        boundary_mask[0, :, :] = True
-        boundary_mask[-1, :, :] = True
-        boundary_mask[:, 0, :] = True
-        boundary_mask[:, -1, :] = True
-        boundary_mask[:, :, 0] = True
-        boundary_mask[:, :, -1] = True
-
-        # Seed: boundary voxels that are empty
-        seed = boundary_mask & (grid == VoxelState.EMPTY)
-
-        # Traversable: empty voxels only
-        traversable = grid == VoxelState.EMPTY
-
-        # Flood fill using binary_dilation with constraint
-        struct = ndimage.generate_binary_structure(3, 1)  # 6-connectivity
-        outside = ndimage.binary_dilation(
-            seed, mask=traversable, iterations=-1, structure=struct  # Until no change
-        )
+        """Mark empty space connected to the grid boundary as outside air."""
+        return self._split_empty_space(grid)[0]
 
-        # Mark outside voxels
-        result = grid.copy()
-        result[outside] = VoxelState.OUTSIDE
-
-        return result
+    def _split_empty_space(self, grid: np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+        """Classify EMPTY voxels as outside air or enclosed pockets in one labeling pass.
 
-    def _label_pockets(self, grid: np.ndarray) -> tuple[np.ndarray, int]:
-        """Label disconnected pocket regions.
+        Empty space is labeled into 6-connected components once. Components
+        touching any grid face are outside air; the rest are pockets,
+        relabeled 1..K in scan order of their first voxel.
+        This replaces an iterative flood fill that needs one dilation per
+        voxel of path length.
 
         Returns:
-            (labeled_grid, pocket_count) where labeled_grid has integer labels
+            (grid with OUTSIDE marked, labeled pocket grid, pocket count)
         """
-        # Pockets are EMPTY voxels that weren't marked as OUTSIDE
-        pocket_mask = grid == VoxelState.EMPTY
+        struct = ndimage.generate_binary_structure(3, 1)  # 6-connectivity
+        components, num_components = ndimage.label(grid == VoxelState.EMPTY, structure=struct)
+
+        touches_boundary = np.zeros(num_components + 1, dtype=bool)
+        for face in (
+            components[0],
+            components[-1],
+            components[:, 0],
+            components[:, -1],
+            components[:, :, 0],
+            components[:, :, -1],
+        ):
+            touches_boundary[face.ravel()] = True
+        touches_boundary[0] = False  # Background (non-empty voxels)
 
-        # Label connected components with 6-connectivity
-        struct = ndimage.generate_binary_structure(3, 1)
-        labeled, num_features = ndimage.label(pocket_mask, structure=struct)
+        result = grid.copy()
+        result[touches_boundary[components]] = VoxelState.OUTSIDE
+
+        # Relabel through a lookup table in the narrowest unsigned type that
+        # holds the pocket count (uint8/uint16 in practice, not int32), so
+        # every later pass over the labels moves fewer bytes
+        pocket_labels = np.flatnonzero(~touches_boundary[1:]) + 1
+        relabel = np.zeros(
+            num_components + 1, dtype=np.min_scalar_type(max(len(pocket_labels), 1))
+        )
+        relabel[pocket_labels] = np.arange(1, len(pocket_labels) + 1)
 
-        return labeled, num_features
+        return result, relabel[components], len(pocket_labels)
 
-    def _extract_pocket_info(
+    def _extract_all_pocket_info(
         self,
         labeled: np.ndarray,
-        pocket_id: int,
+        num_pockets: int,
         voxel_size: float,
         bounds_low: np.ndarray,
-    ) -> PocketInfo:
-        """Extract metadata for a single pocket."""
-        mask = labeled == pocket_id
-        voxel_coords = np.argwhere(mask)
-
-        if len(voxel_coords) == 0:
-            raise ValueError(f"Pocket {pocket_id} has no voxels")
-
-        # Convert to world coordinates (voxel centers)
-        world_coords = voxel_coords * voxel_size + bounds_low + voxel_size / 2
+        min_voxels: int,
+    ) -> list[PocketInfo]:
+        """Extract metadata for every pocket of at least min_voxels voxels.
 
-        centroid = tuple(world_coords.mean(axis=0).tolist())
-        pocket_bounds_low = tuple((voxel_coords.min(axis=0) * voxel_size + bounds_low).tolist())
-        pocket_bounds_high = tuple(
-            ((voxel_coords.max(axis=0) + 1) * voxel_size + bounds_low).tolist()
-        )
-
-        voxel_count = len(voxel_coords)
-        volume = voxel_count * (voxel_size**3)
-
-        return PocketInfo(
-            pocket_id=pocket_id,
-            voxel_count=voxel_count,
-            centroid=centroid,
-            bounds_low=pocket_bounds_low,
-            bounds_high=pocket_bounds_high,
-            volume_estimate=volume,
-            is_toggled_solid=False,
+        Sizes, bounding boxes and centroids come from whole-grid passes
+        (bincount, find_objects, center_of_mass) rather than a scan per pocket.
+        """
+        sizes = np.bincount(labeled.ravel(), minlength=num_pockets + 1)
+        pocket_ids = [int(i) for i in np.flatnonzero(sizes[1:] >= min_voxels) + 1]
+        if not pocket_ids:
+            return []
+
+        regions = ndimage.find_objects(labeled)
+        centers = ndimage.center_of_mass(np.ones(labeled.shape, np.uint8), labeled, pocket_ids)
+
+        # World-space geometry for all pockets as (K, 3) arrays, converted once.
+        # Voxel centers sit half a voxel in from their corner.
+        corners = np.array(
+            [[(axis.start, axis.stop) for axis in regions[i - 1]] for i in pocket_ids]
         )
+        centroids = ((np.array(centers) + 0.5) * voxel_size + bounds_low).tolist()
+        lows = (corners[:, :, 0] * voxel_size + bounds_low).tolist()
+        highs = (corners[:, :, 1] * voxel_size + bounds_low).tolist()
+        counts = sizes[pocket_ids].tolist()
+        voxel_volume = voxel_size**3
+
+        # Every field is computed here, so skip per-pocket validation
+        return [
+            PocketInfo.model_construct(
+                pocket_id=pocket_id,
+                voxel_count=count,
+                centroid=tuple(centroid),
+                bounds_low=tuple(low),
+                bounds_high=tuple(high),
+                volume_estimate=count * voxel_volume,
+                is_toggled_solid=False,
+            )
+            for pocket_id, count, centroid, low, high in zip(
+                pocket_ids, counts, centroids, lows, highs, strict=True
+            )
+        ]
 
     async def analyze_pockets(
         self,
@@ -214,14 +278,20 @@ class PocketService:
     ) -> PocketAnalysis:
         """Analyze point cloud for pockets (disconnected cavities).
 
-        This is a potentially expensive operation. Results are cached.
+        This is a potentially expensive operation. Results are cached. The
+        file IO and grid computation run in a worker thread so the event loop
+        stays responsive.
         """
         # Check cache first
         if not recompute:
-            cached = self.get_cached_analysis(project_id)
+            cached = await asyncio.to_thread(self.get_cached_analysis, project_id)
             if cached is not None:
                 return cached
 
+        return await asyncio.to_thread(self._analyze, project_id, voxel_target)
+
+    def _analyze(self, project_id: str, voxel_target: int | None) -> PocketAnalysis:
+        """Run pocket analysis from the stored point cloud and cache the result."""
         # Load points
         xyz = self._load_points(project_id)
         if xyz is None:
@@ -237,26 +307,20 @@ class PocketService:
         # Build occupancy grid
         grid = self._build_occupancy_grid(xyz, bounds_low, bounds_high, voxel_size)
 
-        # Flood fill from boundary
-        grid = self._flood_fill_outside(grid)
-
-        # Label pockets
-        labeled, num_pockets = self._label_pockets(grid)
+        # Separate outside air from enclosed pockets
+        grid, labeled, num_pockets = self._split_empty_space(grid)
 
         # Extract pocket info for significant pockets
-        pockets = []
-        min_voxels = self.settings.pocket_min_volume_voxels
-        for pocket_id in range(1, num_pockets + 1):
-            voxel_count = np.sum(labeled == pocket_id)
-            if voxel_count >= min_voxels:
-                info = self._extract_pocket_info(labeled, pocket_id, voxel_size, bounds_low)
-                pockets.append(info)
+        pockets = self._extract_all_pocket_info(
+            labeled, num_pockets, voxel_size, bounds_low, self.settings.pocket_min_volume_voxels
+        )
 
         # Compute grid statistics
         resolution = tuple(grid.shape)
-        occupied_count = int(np.sum(grid == VoxelState.OCCUPIED))
-        outside_count = int(np.sum(grid == VoxelState.OUTSIDE))
-        empty_count = int(np.sum(grid == VoxelState.EMPTY))
+        state_counts = np.bincount(grid.ravel(), minlength=len(VoxelState))
+        occupied_count = int(state_counts[VoxelState.OCCUPIED])
+        outside_count = int(state_counts[VoxelState.OUTSIDE])
+        empty_count = int(state_counts[VoxelState.EMPTY])
 
         grid_metadata = VoxelGridMetadata(
             resolution=resolution,
@@ -293,28 +357,85 @@ class PocketService:
         pockets_dir = self._pockets_dir(project_id)
 
         # Save analysis JSON
-        with open(pockets_dir / "analysis.json", "w") as f:
-            json.dump(analysis.model_dump(mode="json"), f, indent=2, default=str)
-
-        # Save grid data for visualization and sampling
-        np.savez_compressed(
-            pockets_dir / "grid.npz",
-            grid=grid,
-            labeled=labeled,
-            voxel_size=np.array([voxel_size]),
-            bounds_low=bounds_low,
+        (pockets_dir / "analysis.json").write_bytes(
+            orjson.dumps(analysis.model_dump(mode="json"), option=orjson.OPT_INDENT_2)
+        )
+
+        # Save grid data for visualization and sampling as plain .npy files so
+        # readers can memory-map them; the scalars go in a small sidecar.
+        # Labels are stored in the narrowest unsigned type that holds them and
+        # stay in page cache for get_pocket_voxels; the state grid is not read
+        # back by the service, so it is written without polluting the cache.
+        label_dtype = np.min_scalar_type(max(int(labeled.max(initial=0)), 1))
+        _save_cold(pockets_dir / "grid.npy", grid)
+        # get_pocket_voxels may hold the old labels mapped, so replace rather than truncate
+        point_store.save_npy(pockets_dir / "labeled.npy", labeled.astype(label_dtype, copy=False))
+
+        # Voxel index box of each reported pocket, so get_pocket_voxels reads only
+        # that part of the grid. Pocket bounds lie on voxel faces; pad by one
+        # voxel against rounding.
+        origin = bounds_low.tolist()
+        pocket_boxes = {
+            str(p.pocket_id): [
+                [
+                    max(math.floor((b - o) / voxel_size) - 1, 0)
+                    for b, o in zip(p.bounds_low, origin, strict=True)
+                ],
+                [
+                    math.ceil((b - o) / voxel_size) + 1
+                    for b, o in zip(p.bounds_high, origin, strict=True)
+                ],
+            ]
+            for p in analysis.pockets
+        }
+        (pockets_dir / "grid.json").write_bytes(
+            orjson.dumps(
+                {
+                    "voxel_size": voxel_size,
+                    "bounds_low": bounds_low.tolist(),
+                    "pocket_boxes": pocket_boxes,
+                }
+            )
         )
 
+    def _load_labeled_grid(
+        self, project_id: str
+    ) -> tuple[np.ndarray, float, np.ndarray, dict[str, list[list[int]]]] | None:
+        """Open the cached pocket label grid, memory-mapped when possible.
+
+        Returns:
+            (labeled, voxel_size, bounds_low, pocket_boxes), or None if there is
+            no cache. pocket_boxes maps pocket id strings to [low, high] voxel
+            index corners and is empty for caches written without it.
+        """
+        pockets_dir = self._pockets_dir(project_id)
+        meta_path = pockets_dir / "grid.json"
+        if meta_path.exists():
+            meta = orjson.loads(meta_path.read_bytes())
+            labeled = np.load(pockets_dir / "labeled.npy", mmap_mode="r")
+            return (
+                labeled,
+                float(meta["voxel_size"]),
+                np.array(meta["bounds_low"]),
+                meta.get("pocket_boxes", {}),
+            )
+
+        # Caches written before the .npy layout
+        legacy_path = pockets_dir / "grid.npz"
+        if legacy_path.exists():
+            data = np.load(legacy_path)
+            return data["labeled"], float(data["voxel_size"][0]), data["bounds_low"], {}
+
+        return None
+
     def get_cached_analysis(self, project_id: str) -> PocketAnalysis | None:
         """Get cached pocket analysis if available."""
         analysis_path = self._pockets_dir(project_id) / "analysis.json"
         if not analysis_path.exists():
             return None
 
-        with open(analysis_path) as f:
-            data = json.load(f)
-
-        return PocketAnalysis.model_validate(data)
+        # Parse and validate in one pass without building an intermediate dict
+        return PocketAnalysis.model_validate_json(analysis_path.read_bytes())
 
     def get_pocket_voxels(
         self, project_id: str, pocket_id: int
@@ -324,20 +445,25 @@ class PocketService:
         Returns:
             (N, 3) array of voxel center positions, or None if not found
         """
-        grid_path = self._pockets_dir(project_id) / "grid.npz"
-        if not grid_path.exists():
+        loaded = self._load_labeled_grid(project_id)
+        if loaded is None:
             return None
+        labeled, voxel_size, bounds_low, pocket_boxes = loaded
 
-        data = np.load(grid_path)
-        labeled = data["labeled"]
-        voxel_size = float(data["voxel_size"][0])
-        bounds_low = data["bounds_low"]
+        # Only read the pocket's box from the mapped grid when the cache records
+        # it; pockets below the size threshold need a full scan
+        offset = np.zeros(3, dtype=int)
+        box = pocket_boxes.get(str(pocket_id))
+        if box is not None:
+            low, high = box
+            offset = np.array(low)
+            labeled = labeled[tuple(slice(lo, hi) for lo, hi in zip(low, high, strict=True))]
 
         mask = labeled == pocket_id
         if not np.any(mask):
             return None
 
-        voxel_coords = np.argwhere(mask)
+        voxel_coords = np.argwhere(mask) + offset
         world_coords = voxel_coords * voxel_size + bounds_low + voxel_size / 2
 
         return world_coords
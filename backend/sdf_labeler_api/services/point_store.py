@@ -0,0 +1,78 @@
+# ABOUTME: On-disk storage of a project's raw point cloud arrays
+# ABOUTME: Uncompressed .npy files read memory-mapped, with the legacy points.npz as fallback
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+XYZ_NAME = "xyz.npy"
+NORMALS_NAME = "normals.npy"
+# Compressed archive holding both arrays, written before the .npy layout
+LEGACY_POINTS_NAME = "points.npz"
+
+
+def points_source(pc_dir: Path) -> Path | None:
+    """Get the file holding a point cloud's positions, or None if there is none."""
+    for name in (XYZ_NAME, LEGACY_POINTS_NAME):
+        path = pc_dir / name
+        if path.exists():
+            return path
+    return None
+
+
+def save_npy(path: Path, array: np.ndarray) -> None:
+    """Save an array as .npy by writing a temporary file and renaming it into place.
+
+    Readers may hold the previous file memory-mapped; truncating it in place
+    would fault them (SIGBUS), while a rename leaves their mapping intact.
+    """
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    # Write through a handle, since np.save appends ".npy" to other file names
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def save_points(pc_dir: Path, xyz: np.ndarray, normals: np.ndarray | None) -> Path:
+    """Save positions and optional normals as plain .npy files.
+
+    Point data barely compresses, so skipping deflate makes writes cheap and
+    lets readers memory-map the arrays. Each file is replaced atomically, so
+    readers of the previous cloud keep a valid mapping. Files from an older
+    layout or a previous cloud with normals are removed.
+
+    Returns:
+        Path of the positions file
+    """
+    xyz_path = pc_dir / XYZ_NAME
+    save_npy(xyz_path, xyz)
+    normals_path = pc_dir / NORMALS_NAME
+    if normals is not None:
+        save_npy(normals_path, normals)
+    else:
+        normals_path.unlink(missing_ok=True)
+    (pc_dir / LEGACY_POINTS_NAME).unlink(missing_ok=True)
+    return xyz_path
+
+
+def load_points(pc_dir: Path) -> tuple[np.ndarray, np.ndarray | None] | None:
+    """Load positions and normals (None if absent), memory-mapped read-only when possible.
+
+    Returns:
+        (xyz, normals), or None if no point cloud is stored
+    """
+    xyz_path = pc_dir / XYZ_NAME
+    if xyz_path.exists():
+        xyz = np.load(xyz_path, mmap_mode="r")
+        normals_path = pc_dir / NORMALS_NAME
+        normals = np.load(normals_path, mmap_mode="r") if normals_path.exists() else None
+        return xyz, normals
+
+    legacy_path = pc_dir / LEGACY_POINTS_NAME
+    if legacy_path.exists():
+        data = np.load(legacy_path)
+        normals = data["normals"]
+        return data["xyz"], normals if normals.size > 0 else None
+
+    return None
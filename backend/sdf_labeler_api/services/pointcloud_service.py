@@ -1,21 +1,433 @@
 # ABOUTME: Point cloud processing service
 # ABOUTME: Handles upload, octree building, and tile streaming
 
-import uuid
+import base64
+import functools
+import logging
+import math
+import os
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 import numpy as np
-from fastapi import UploadFile
+import orjson
 
 from sdf_labeler_api.config import Settings
+from sdf_labeler_api.ids import new_id
 from sdf_labeler_api.models.point_cloud import (
+    EncodedTileData,
     OctreeMetadata,
     OctreeNodeInfo,
     PointCloudStats,
     PointCloudUploadResponse,
     TileData,
+    TileEncoding,
 )
+from sdf_labeler_api.services import point_store
+from sdf_labeler_api.services.tile_codec import (
+    HIERARCHY_HEADER,
+    decode_normals_oct,
+    encode_normals_oct,
+    encode_octree_hierarchy,
+    encode_tile_binary,
+    pack_labels,
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of encoded tiles kept in memory (a full tile is a few MB of JSON)
+TILE_CACHE_SIZE = 64
+
+# Sidecar summarizing the stored points so stats never load them
+POINTS_SUMMARY_NAME = "points_meta.json"
+
+# Tile store: raw arrays for every tile in one file, located by an offset index
+TILE_STORE_NAME = "tiles.bin"
+TILE_INDEX_NAME = "tiles_index.json"
+# Arrays in the store start on this boundary so mapped views are aligned
+TILE_STORE_ALIGN = 8
+
+# Column names read from tabular (CSV / Parquet) uploads
+XYZ_COLUMNS = ("x", "y", "z")
+NORMAL_COLUMNS = ("nx", "ny", "nz")
+
+# LAS/LAZ uploads are decoded this many points at a time
+LAS_CHUNK_SIZE = 1_000_000
+# Extra dimensions holding per-point normals in LAS/LAZ uploads
+LAS_NORMAL_DIMENSIONS = ("NormalX", "NormalY", "NormalZ")
+
+
+def _stack_columns(table: Any, names: tuple[str, ...]) -> np.ndarray:
+    """Stack columns of a pyarrow Table into an (N, len(names)) array."""
+    return np.column_stack([table.column(name).to_numpy() for name in names])
+
+
+def _read_las(source: Any) -> tuple[np.ndarray, np.ndarray | None]:
+    """Read positions and optional normals from a LAS/LAZ file in chunks.
+
+    Points are decoded LAS_CHUNK_SIZE at a time and scaled straight into
+    buffers sized from the header, so a large LAZ never holds its full
+    decoded point records alongside the output arrays.
+    """
+    import laspy
+
+    with laspy.open(source) as reader:
+        header = reader.header
+        count = header.point_count
+        has_normals = set(LAS_NORMAL_DIMENSIONS) <= set(header.point_format.dimension_names)
+
+        xyz = np.empty((count, 3), dtype=np.float64)
+        normals = np.empty((count, 3), dtype=np.float64) if has_normals else None
+        offset = 0
+        for chunk in reader.chunk_iterator(LAS_CHUNK_SIZE):
+            rows = slice(offset, offset + len(chunk))
+            for axis, dim in enumerate("XYZ"):
+                # Raw integer coordinates -> scaled, without a temporary
+                column = xyz[rows, axis]
+                np.multiply(chunk[dim], header.scales[axis], out=column)
+                column += header.offsets[axis]
+            if normals is not None:
+                for axis, dim in enumerate(LAS_NORMAL_DIMENSIONS):
+                    normals[rows, axis] = chunk[dim]
+            offset = rows.stop
+
+    if offset < count:
+        # Header overstated the point count
+        xyz = xyz[:offset]
+        normals = normals[:offset] if normals is not None else None
+    return xyz, normals
+
+
+def _b64(arr: np.ndarray, dtype: str) -> str:
+    """Base64-encode an array as contiguous little-endian values of dtype."""
+    return base64.b64encode(np.ascontiguousarray(arr, dtype=dtype).tobytes()).decode("ascii")
+
+
+@functools.lru_cache(maxsize=8)
+def _open_tile_store(tiles_dir: Path, version: tuple[int, int]) -> tuple[np.ndarray, dict]:
+    """Memory-map a tile store read-only and load its index.
+
+    version (index mtime_ns, store size) keys the cache to one build; rebuilds
+    replace both files, so an older mapping stays valid while in use.
+    """
+    index = orjson.loads((tiles_dir / TILE_INDEX_NAME).read_bytes())
+    if version[1] == 0:
+        # Zero-length files cannot be mapped
+        return np.empty(0, dtype=np.uint8), index
+    return np.memmap(tiles_dir / TILE_STORE_NAME, dtype=np.uint8, mode="r"), index
+
+
+def _store_tile_arrays(blob: np.ndarray, entry: dict) -> dict[str, np.ndarray]:
+    """Slice one tile's arrays out of a mapped tile store."""
+    count = entry["count"]
+    arrays = {
+        "positions": np.frombuffer(
+            blob, dtype="<f4", count=count * 3, offset=entry["positions"]
+        ).reshape(-1, 3)
+    }
+    if entry.get("normals_oct") is not None:
+        arrays["normals_oct"] = np.frombuffer(
+            blob, dtype=np.int8, count=count * 2, offset=entry["normals_oct"]
+        ).reshape(-1, 2)
+    return arrays
+
+
+def _load_tile(tile_path: Path, node_id: str, version: tuple[int, int]) -> Any:
+    """Load a tile's arrays from the tile store index or a legacy per-tile .npz."""
+    if tile_path.name == TILE_INDEX_NAME:
+        blob, index = _open_tile_store(tile_path.parent, version)
+        return _store_tile_arrays(blob, index[node_id])
+    return np.load(tile_path)
+
+
+def _read_tile(
+    data: Any, node_id: str, encoding: Literal["base64", "quantized"]
+) -> dict[str, Any]:
+    """Convert a tile's arrays into an EncodedTileData dict.
+
+    Args:
+        data: Mapping of array name to array (a store slice or an NpzFile)
+    """
+    positions = data["positions"]
+    labels = data.get("labels")
+
+    # Tiles store octahedral-quantized normals; older tiles stored float32
+    normals_oct = data.get("normals_oct")
+    normals = data.get("normals")
+
+    if encoding == "quantized":
+        if normals_oct is None and normals is not None:
+            normals_oct = encode_normals_oct(normals)
+        return EncodedTileData(
+            node_id=node_id,
+            point_count=len(positions),
+            encoding="quantized",
+            positions=_b64(positions, "<f4"),
+            normals=_b64(normals_oct, "i1") if normals_oct is not None else None,
+            labels=_b64(pack_labels(labels), "u1") if labels is not None else None,
+        ).model_dump()
+
+    if normals_oct is not None:
+        normals = decode_normals_oct(normals_oct)
+
+    return EncodedTileData(
+        node_id=node_id,
+        point_count=len(positions),
+        positions=_b64(positions, "<f4"),
+        normals=_b64(normals, "<f4") if normals is not None else None,
+        labels=_b64(labels, "u1") if labels is not None else None,
+    ).model_dump()
+
+
+def _json_tile_bytes(data: Any, node_id: str) -> bytes:
+    """Serialize a tile as TileData JSON straight from its arrays.
+
+    orjson writes the numbers from the arrays themselves, skipping a Python
+    float per coordinate; float32 values are printed at float32 precision.
+    """
+
+    def flat(arr: np.ndarray | None, dtype: str) -> np.ndarray | None:
+        # orjson only takes base-class, C-contiguous arrays (not memmap views)
+        return np.ascontiguousarray(arr, dtype=dtype).ravel() if arr is not None else None
+
+    normals = data.get("normals")
+    if "normals_oct" in data:
+        normals = decode_normals_oct(data["normals_oct"])
+    positions = data["positions"]
+    tile = {
+        "node_id": node_id,
+        "point_count": len(positions),
+        "positions": flat(positions, "<f4"),
+        "normals": flat(normals, "<f4"),
+        "labels": flat(data["labels"], "u1") if "labels" in data else None,
+    }
+    return orjson.dumps(tile, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _binary_tile(data: Any, quantize: bool = False) -> bytes:
+    """Frame a tile's arrays with encode_tile_binary."""
+    normals_oct = data.get("normals_oct")
+    if normals_oct is None and "normals" in data:
+        normals_oct = encode_normals_oct(data["normals"])
+    labels = data.get("labels")
+    return encode_tile_binary(data["positions"], normals_oct, labels, quantize=quantize)
+
+
+@functools.lru_cache(maxsize=TILE_CACHE_SIZE)
+def _encode_tile(
+    tile_path: Path, node_id: str, version: tuple[int, int], encoding: TileEncoding
+) -> tuple[str, bytes]:
+    """Serialize a tile once; version (mtime_ns, size) keys the cache to the file version."""
+    mtime_ns, size = version
+    etag = f'"{node_id}-{mtime_ns:x}-{size:x}-{encoding}"'
+    data = _load_tile(tile_path, node_id, version)
+    if encoding in ("binary", "binary16"):
+        return etag, _binary_tile(data, quantize=encoding == "binary16")
+    if encoding == "json":
+        return etag, _json_tile_bytes(data, node_id)
+    return etag, orjson.dumps(_read_tile(data, node_id, encoding))
+
+
+def _spread_bits_slow(v: int) -> int:
+    """Spread the low 11 bits of v so two zero bits follow each one."""
+    v = (v | (v << 16)) & 0x70000FF
+    v = (v | (v << 8)) & 0x700F00F
+    v = (v | (v << 4)) & 0x430C30C3
+    v = (v | (v << 2)) & 0x49249249
+    return v
+
+
+# Bit-spread of every 11-bit value, so a Morton code takes table lookups
+# rather than a chain of big-int shifts and masks
+_SPREAD_TABLE = [_spread_bits_slow(v) for v in range(1 << 11)]
+
+# Deepest level whose tile coordinates _spread_bits can interleave
+MORTON_MAX_LEVEL = 22
+
+
+def _spread_bits(v: int) -> int:
+    """Spread the low 22 bits of v so two zero bits follow each one (Morton encoding)."""
+    return _SPREAD_TABLE[v & 0x7FF] | (_SPREAD_TABLE[(v >> 11) & 0x7FF] << 33)
+
+
+# Bits per axis of the Morton codes used to order points within a tile
+TILE_SORT_BITS = 10
+
+
+def _spread_bits_array(v: np.ndarray) -> np.ndarray:
+    """Spread the low 10 bits of each uint32 so two zero bits follow each one."""
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+
+def _morton_order(points: np.ndarray) -> np.ndarray:
+    """Get the permutation that sorts points along a Z-order curve over their bounds."""
+    low = points.min(axis=0).astype(np.float64)
+    extent = points.max(axis=0) - low
+    scale = np.divide(
+        (1 << TILE_SORT_BITS) - 1, extent, out=np.zeros_like(extent), where=extent > 0
+    )
+    q = ((points - low) * scale).astype(np.uint32)
+    code = (
+        _spread_bits_array(q[:, 0])
+        | _spread_bits_array(q[:, 1]) << 1
+        | _spread_bits_array(q[:, 2]) << 2
+    )
+    return np.argsort(code, kind="stable")
+
+
+# Points per batch in normal estimation
+NORMAL_CHUNK_SIZE = 1 << 16
+
+
+def _hnswlib_searcher(xyz: np.ndarray, k: int) -> Callable[[np.ndarray], np.ndarray] | None:
+    """Build an approximate k-NN search with hnswlib, or None if it is not installed."""
+    try:
+        import hnswlib
+    except ImportError:
+        return None
+
+    index = hnswlib.Index(space="l2", dim=3)
+    index.init_index(max_elements=len(xyz), ef_construction=200, M=16)
+    index.add_items(xyz.astype(np.float32))
+    # ef must be at least k; a little headroom keeps recall high
+    index.set_ef(max(2 * k, 32))
+
+    def ann_query(query: np.ndarray) -> np.ndarray:
+        labels, _ = index.knn_query(query.astype(np.float32), k=k)
+        return labels.astype(np.intp)
+
+    return ann_query
+
+
+def _faiss_searcher(xyz: np.ndarray, k: int) -> Callable[[np.ndarray], np.ndarray] | None:
+    """Build an approximate k-NN search with a FAISS HNSW index, or None if unavailable."""
+    try:
+        import faiss
+    except ImportError:
+        return None
+
+    index = faiss.IndexHNSWFlat(3, 32)
+    index.hnsw.efConstruction = 40
+    index.add(np.ascontiguousarray(xyz, dtype=np.float32))
+    index.hnsw.efSearch = max(2 * k, 32)
+
+    def ann_query(query: np.ndarray) -> np.ndarray:
+        _, labels = index.search(np.ascontiguousarray(query, dtype=np.float32), k)
+        # Unfilled slots (-1) only occur if the graph is short of k points
+        return np.where(labels < 0, labels[:, :1], labels).astype(np.intp)
+
+    return ann_query
+
+
+def _knn_searcher(
+    xyz: np.ndarray, k: int, ann_threshold: int
+) -> Callable[[np.ndarray], np.ndarray]:
+    """Build a k-nearest-neighbor search over xyz.
+
+    Clouds larger than ann_threshold use an approximate HNSW index when the
+    optional hnswlib or faiss package is installed (in that order of
+    preference); otherwise an exact cKDTree is used.
+
+    Returns:
+        Function mapping (n, 3) query points to (n, k) neighbor indices
+    """
+    if len(xyz) > ann_threshold:
+        for build in (_hnswlib_searcher, _faiss_searcher):
+            searcher = build(xyz, k)
+            if searcher is not None:
+                return searcher
+        logger.info("No ANN library installed; using exact k-NN for %d points", len(xyz))
+
+    from scipy.spatial import cKDTree
+
+    # Sliding-midpoint splits without node shrinking build far faster than
+    # the median-balanced default and query just as well for k-NN
+    tree = cKDTree(xyz, balanced_tree=False, compact_nodes=False)
+    # workers=-1 splits each batched query across all cores
+    return lambda query: tree.query(query, k=k, workers=-1)[1].reshape(len(query), k)
+
+
+def _open3d_normals(xyz: np.ndarray, k: int) -> np.ndarray | None:
+    """Estimate unoriented k-NN PCA normals with Open3D's parallel C++ kernel.
+
+    Returns:
+        (N, 3) float64 normals, or None if the optional open3d package is not
+        installed
+    """
+    try:
+        import open3d as o3d
+    except ImportError:
+        return None
+
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(xyz)
+    # Plain k-NN rather than hybrid radius search keeps the neighborhoods
+    # identical to the SciPy path
+    pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamKNN(knn=k))
+    return np.asarray(pcd.normals)
+
+
+def _smallest_eigenvectors(cov: np.ndarray) -> np.ndarray:
+    """Unit eigenvectors for the smallest eigenvalue of stacked symmetric 3x3 matrices.
+
+    Solves the characteristic polynomial in closed form (trigonometric
+    method) rather than calling LAPACK per matrix. Degenerate neighborhoods
+    fall back to any direction orthogonal to the spread (collinear points)
+    or to +z (coincident points).
+    """
+    a00, a11, a22 = cov[:, 0, 0], cov[:, 1, 1], cov[:, 2, 2]
+    a01, a02, a12 = cov[:, 0, 1], cov[:, 0, 2], cov[:, 1, 2]
+
+    # Smallest eigenvalue: q + 2p cos(phi + 2pi/3)
+    q = (a00 + a11 + a22) / 3
+    p1 = a01**2 + a02**2 + a12**2
+    p2 = (a00 - q) ** 2 + (a11 - q) ** 2 + (a22 - q) ** 2 + 2 * p1
+    p = np.sqrt(p2 / 6)
+    safe_p = np.where(p > 0, p, 1.0)
+    b00, b11, b22 = (a00 - q) / safe_p, (a11 - q) / safe_p, (a22 - q) / safe_p
+    b01, b02, b12 = a01 / safe_p, a02 / safe_p, a12 / safe_p
+    det_b = (
+        b00 * (b11 * b22 - b12 * b12)
+        - b01 * (b01 * b22 - b12 * b02)
+        + b02 * (b01 * b12 - b11 * b02)
+    )
+    phi = np.arccos(np.clip(det_b / 2, -1.0, 1.0)) / 3
+    eig_min = q + 2 * p * np.cos(phi + 2 * np.pi / 3)
+
+    # The eigenvector is orthogonal to every row of (A - eig_min * I); take the
+    # best-conditioned cross product of two rows
+    shifted = cov - eig_min[:, None, None] * np.eye(3)
+    r0, r1, r2 = shifted[:, 0], shifted[:, 1], shifted[:, 2]
+    crosses = np.stack([np.cross(r0, r1), np.cross(r0, r2), np.cross(r1, r2)], axis=1)
+    cross_norms = np.linalg.norm(crosses, axis=2)
+    best = cross_norms.argmax(axis=1)
+    rows = np.arange(len(cov))
+    vectors = crosses[rows, best]
+    norms = cross_norms[rows, best]
+
+    # Rank <= 1: any vector orthogonal to the dominant row will do
+    scale = np.abs(cov).max(axis=(1, 2))
+    degenerate = norms <= 1e-12 * np.maximum(scale, 1e-300) ** 2
+    if np.any(degenerate):
+        row_norms = np.linalg.norm(shifted[degenerate], axis=2)
+        dominant = shifted[degenerate][np.arange(degenerate.sum()), row_norms.argmax(axis=1)]
+        # Cross with the axis least aligned to the dominant row
+        axis = np.eye(3)[np.abs(dominant).argmin(axis=1)]
+        fallback = np.cross(dominant, axis)
+        fallback_norms = np.linalg.norm(fallback, axis=1)
+        coincident = fallback_norms <= 1e-300
+        fallback[coincident] = (0.0, 0.0, 1.0)
+        fallback_norms[coincident] = 1.0
+        vectors[degenerate] = fallback
+        norms[degenerate] = fallback_norms
+
+    return vectors / norms[:, None]
 
 
 class PointCloudService:
@@ -24,25 +436,36 @@ class PointCloudService:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.data_dir = settings.data_dir
+        # Parsed octree metadata by project ID, with the (mtime_ns, size) of
+        # the file it came from. Octrees may be built in worker processes, so
+        # entries are validated against the file rather than invalidated.
+        self._metadata_cache: dict[str, tuple[tuple[int, int], OctreeMetadata]] = {}
 
-    async def upload_and_process(
+    def process_file(
         self,
         project_id: str,
-        file: UploadFile,
+        path: Path,
+        filename: str,
         estimate_normals: bool = True,
         normal_k: int = 16,
     ) -> PointCloudUploadResponse:
-        """Upload and process a point cloud file."""
+        """Parse, estimate normals for, and store a point cloud file.
+
+        Synchronous and CPU bound, so the API runs it in a worker process.
+
+        Args:
+            project_id: Project to store point cloud in
+            path: Location of the uploaded file
+            filename: Original filename, used for format detection
+            estimate_normals: Whether to estimate normals if not present
+            normal_k: Number of neighbors for normal estimation
+        """
         # Detect format from filename
-        filename = file.filename or "unknown"
         suffix = Path(filename).suffix.lower()
         format_name = self._detect_format(suffix)
 
-        # Read file content
-        content = await file.read()
-
         # Parse point cloud based on format
-        xyz, normals = self._load_points(content, format_name)
+        xyz, normals = self._load_points(path, format_name)
 
         # Estimate normals if needed
         if normals is None and estimate_normals:
@@ -53,17 +476,12 @@ class PointCloudService:
         bounds_high = tuple(xyz.max(axis=0).tolist())
 
         # Generate point cloud ID
-        pc_id = str(uuid.uuid4())
+        pc_id = new_id()
 
         # Save raw point cloud
         pc_dir = self._pointcloud_dir(project_id)
         pc_dir.mkdir(parents=True, exist_ok=True)
-
-        np.savez_compressed(
-            pc_dir / "points.npz",
-            xyz=xyz,
-            normals=normals if normals is not None else np.array([]),
-        )
+        self._save_points(pc_dir, xyz, normals)
 
         # Build octree for LOD streaming
         self._build_octree(project_id, xyz, normals)
@@ -78,39 +496,86 @@ class PointCloudService:
             format=format_name,
         )
 
-    def get_stats(self, project_id: str) -> PointCloudStats | None:
-        """Get statistics for a loaded point cloud."""
-        pc_dir = self._pointcloud_dir(project_id)
-        points_path = pc_dir / "points.npz"
+    def _save_points(
+        self, pc_dir: Path, xyz: np.ndarray, normals: np.ndarray | None
+    ) -> None:
+        """Save the raw point cloud and a sidecar summary of it for get_stats."""
+        points_path = point_store.save_points(pc_dir, xyz, normals)
+        self._write_points_summary(points_path, xyz, normals is not None)
+
+    def _write_points_summary(
+        self, points_path: Path, xyz: np.ndarray, has_normals: bool
+    ) -> dict[str, Any]:
+        """Write points_meta.json, stamped with the points file it describes."""
+        stat = points_path.stat()
+        summary = {
+            "points_mtime_ns": stat.st_mtime_ns,
+            "points_size": stat.st_size,
+            "point_count": len(xyz),
+            "has_normals": has_normals,
+            "bounds_low": xyz.min(axis=0).tolist(),
+            "bounds_high": xyz.max(axis=0).tolist(),
+            "centroid": xyz.mean(axis=0).tolist(),
+        }
+        (points_path.parent / POINTS_SUMMARY_NAME).write_bytes(orjson.dumps(summary))
+        return summary
 
-        if not points_path.exists():
+    def _points_summary(self, project_id: str) -> dict[str, Any] | None:
+        """Get point count, normals flag, bounds and centroid of a stored cloud.
+
+        Read from the points_meta.json sidecar while it matches the stored
+        positions file; otherwise (clouds stored before the sidecar, or
+        replaced since) the points are loaded once and the sidecar rewritten.
+        """
+        pc_dir = self._pointcloud_dir(project_id)
+        points_path = point_store.points_source(pc_dir)
+        if points_path is None:
             return None
+        stat = points_path.stat()
 
-        data = np.load(points_path)
-        xyz = data["xyz"]
-        normals = data["normals"]
-        has_normals = normals.size > 0
+        try:
+            summary = orjson.loads((pc_dir / POINTS_SUMMARY_NAME).read_bytes())
+        except FileNotFoundError:
+            summary = None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if summary is not None and (summary["points_mtime_ns"], summary["points_size"]) == stamp:
+            return summary
 
-        bounds_low = tuple(xyz.min(axis=0).tolist())
-        bounds_high = tuple(xyz.max(axis=0).tolist())
-        centroid = tuple(xyz.mean(axis=0).tolist())
+        xyz, normals = point_store.load_points(pc_dir)
+        return self._write_points_summary(points_path, xyz, normals is not None)
 
-        # Estimate density
-        volume = np.prod(np.array(bounds_high) - np.array(bounds_low))
-        density = len(xyz) / max(volume, 1e-10)
+    def get_stats(self, project_id: str) -> PointCloudStats | None:
+        """Get statistics for a loaded point cloud.
 
-        # Load octree metadata
-        metadata = self.get_octree_metadata(project_id)
-        octree_depth = metadata.max_depth if metadata else 0
-        node_count = metadata.node_count if metadata else 0
+        Served from small summaries: the points sidecar and the octree.bits
+        header, never the point or node data.
+        """
+        summary = self._points_summary(project_id)
+        if summary is None:
+            return None
+
+        bounds_low = summary["bounds_low"]
+        bounds_high = summary["bounds_high"]
+
+        # Estimate density
+        volume = math.prod(hi - lo for lo, hi in zip(bounds_low, bounds_high, strict=True))
+        density = summary["point_count"] / max(volume, 1e-10)
+
+        # Octree depth and size from the hierarchy header
+        octree_depth = node_count = 0
+        bits_path = self.get_octree_hierarchy_path(project_id)
+        if bits_path is not None:
+            with open(bits_path, "rb") as f:
+                header = HIERARCHY_HEADER.unpack(f.read(HIERARCHY_HEADER.size))
+            octree_depth, node_count = header[3], header[4]
         lod_levels = octree_depth + 1
 
         return PointCloudStats(
-            point_count=len(xyz),
-            has_normals=has_normals,
+            point_count=summary["point_count"],
+            has_normals=summary["has_normals"],
             bounds_low=bounds_low,
             bounds_high=bounds_high,
-            centroid=centroid,
+            centroid=summary["centroid"],
             estimated_density=density,
             octree_depth=octree_depth,
             octree_node_count=node_count,
@@ -118,46 +583,120 @@ class PointCloudService:
         )
 
     def get_tile(
-        self, project_id: str, level: int, x: int, y: int, z: int
+        self,
+        project_id: str,
+        level: int,
+        x: int,
+        y: int,
+        z: int,
+        encoding: TileEncoding = "json",
     ) -> dict[str, Any] | None:
-        """Get point data for a specific octree tile."""
-        node_id = self._coords_to_node_id(level, x, y, z)
-        tile_path = self._pointcloud_dir(project_id) / "tiles" / f"{node_id}.npz"
+        """Get point data for a specific octree tile.
 
-        if not tile_path.exists():
+        With encoding="json" arrays are flat number lists (TileData); with
+        "base64" they are base64 binary strings (EncodedTileData). This is
+        the parsed get_tile_bytes body, so it matches what the API serves.
+        The binary encodings are not dicts; use get_tile_bytes for them.
+        """
+        if encoding in ("binary", "binary16"):
+            raise ValueError("Binary tiles are only available from get_tile_bytes")
+
+        encoded = self.get_tile_bytes(project_id, level, x, y, z, encoding)
+        if encoded is None:
             return None
+        return orjson.loads(encoded[1])
 
-        data = np.load(tile_path)
-        positions = data["positions"].flatten().tolist()
-        normals = data["normals"].flatten().tolist() if "normals" in data else None
-        labels = data["labels"].tolist() if "labels" in data else None
-
-        return {
-            "node_id": node_id,
-            "point_count": len(positions) // 3,
-            "positions": positions,
-            "normals": normals,
-            "labels": labels,
-        }
+    def get_tile_bytes(
+        self,
+        project_id: str,
+        level: int,
+        x: int,
+        y: int,
+        z: int,
+        encoding: TileEncoding = "json",
+    ) -> tuple[str, bytes] | None:
+        """Get a tile as a serialized body together with its ETag.
+
+        The body is JSON, or for encoding="binary"/"binary16" the
+        encode_tile_binary framing (binary16 with quantized positions).
+        Encoded tiles are cached in-process; a rebuilt tile changes its
+        mtime/size and so misses the cache and gets a new ETag.
+        """
+        node_id = self._coords_to_node_id(level, x, y, z)
+        located = self._locate_tile(project_id, node_id)
+        if located is None:
+            return None
+
+        tile_path, version = located
+        return _encode_tile(tile_path, node_id, version, encoding)
 
     def get_octree_metadata(self, project_id: str) -> OctreeMetadata | None:
         """Get octree metadata for LOD streaming."""
         metadata_path = self._pointcloud_dir(project_id) / "octree_metadata.json"
 
-        if not metadata_path.exists():
+        try:
+            st = metadata_path.stat()
+        except FileNotFoundError:
+            self._metadata_cache.pop(project_id, None)
             return None
 
-        import json
+        version = (st.st_mtime_ns, st.st_size)
+        cached = self._metadata_cache.get(project_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        metadata = OctreeMetadata.model_validate_json(metadata_path.read_bytes())
+        self._metadata_cache[project_id] = (version, metadata)
+        return metadata
 
-        with open(metadata_path) as f:
-            data = json.load(f)
+    def get_octree_hierarchy_path(self, project_id: str) -> Path | None:
+        """Get the binary octree hierarchy file (see encode_octree_hierarchy).
 
-        return OctreeMetadata(**data)
+        Point clouds processed before the file existed get it written from
+        their JSON metadata on first request.
+        """
+        bits_path = self._pointcloud_dir(project_id) / "octree.bits"
+        if bits_path.exists():
+            return bits_path
+
+        metadata = self.get_octree_metadata(project_id)
+        if metadata is None:
+            return None
+        bits_path.write_bytes(encode_octree_hierarchy(metadata))
+        return bits_path
 
     def _pointcloud_dir(self, project_id: str) -> Path:
         """Get directory for point cloud data."""
         return self.data_dir / "projects" / project_id / "pointcloud"
 
+    def _locate_tile(
+        self, project_id: str, node_id: str
+    ) -> tuple[Path, tuple[int, int]] | None:
+        """Find where a tile is stored.
+
+        Returns:
+            (path, version): the tile store index, or a per-tile .npz for point
+            clouds processed before the store existed, with a (mtime_ns, size)
+            version stamp; None if the tile does not exist
+        """
+        tiles_dir = self._pointcloud_dir(project_id) / "tiles"
+        try:
+            index_stat = (tiles_dir / TILE_INDEX_NAME).stat()
+            store_stat = (tiles_dir / TILE_STORE_NAME).stat()
+        except FileNotFoundError:
+            tile_path = tiles_dir / f"{node_id}.npz"
+            try:
+                stat = tile_path.stat()
+            except FileNotFoundError:
+                return None
+            return tile_path, (stat.st_mtime_ns, stat.st_size)
+
+        version = (index_stat.st_mtime_ns, store_stat.st_size)
+        _, index = _open_tile_store(tiles_dir, version)
+        if node_id not in index:
+            return None
+        return tiles_dir / TILE_INDEX_NAME, version
+
     def _detect_format(self, suffix: str) -> str:
         """Detect point cloud format from file extension."""
         formats = {
@@ -173,15 +712,18 @@ class PointCloudService:
         return formats.get(suffix, "unknown")
 
     def _load_points(
-        self, content: bytes, format_name: str
+        self, source: Path | bytes, format_name: str
     ) -> tuple[np.ndarray, np.ndarray | None]:
-        """Load points from file content."""
+        """Load points from a file path or raw file content."""
         import io
 
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+
         if format_name == "ply":
             import trimesh
 
-            mesh = trimesh.load(io.BytesIO(content), file_type="ply")
+            mesh = trimesh.load(source, file_type="ply")
             if hasattr(mesh, "vertices"):
                 xyz = np.asarray(mesh.vertices)
                 # Check for vertex normals
@@ -192,75 +734,81 @@ class PointCloudService:
             raise ValueError("PLY file does not contain vertices")
 
         elif format_name in ("las", "laz"):
-            import laspy
-
-            las = laspy.read(io.BytesIO(content))
-            xyz = np.column_stack([las.x, las.y, las.z])
-            # Check for normals in LAS attributes
-            normals = None
-            if hasattr(las, "NormalX") and hasattr(las, "NormalY") and hasattr(las, "NormalZ"):
-                normals = np.column_stack([las.NormalX, las.NormalY, las.NormalZ])
-            return xyz, normals
+            return _read_las(source)
 
         elif format_name == "csv":
-            import pandas as pd
-
-            df = pd.read_csv(io.BytesIO(content))
-            # Assume x, y, z columns
-            xyz = df[["x", "y", "z"]].values
+            import pyarrow.csv as pa_csv
+
+            # Parse only the position and normal columns; normal columns the
+            # file lacks come back as all-null columns
+            table = pa_csv.read_csv(
+                source,
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=[*XYZ_COLUMNS, *NORMAL_COLUMNS],
+                    include_missing_columns=True,
+                ),
+            )
+            missing = [c for c in XYZ_COLUMNS if table.schema.field(c).type == "null"]
+            if missing:
+                raise ValueError(f"CSV file is missing columns: {', '.join(missing)}")
             normals = None
-            if all(c in df.columns for c in ["nx", "ny", "nz"]):
-                normals = df[["nx", "ny", "nz"]].values
-            return xyz, normals
+            if all(table.schema.field(c).type != "null" for c in NORMAL_COLUMNS):
+                normals = _stack_columns(table, NORMAL_COLUMNS)
+            return _stack_columns(table, XYZ_COLUMNS), normals
 
         elif format_name == "npy":
-            arr = np.load(io.BytesIO(content))
+            # An uploaded file on disk is mapped rather than read into memory
+            arr = np.load(source, mmap_mode="r" if isinstance(source, Path) else None)
             if arr.shape[1] >= 6:
                 return arr[:, :3], arr[:, 3:6]
             return arr[:, :3], None
 
         elif format_name == "npz":
-            data = np.load(io.BytesIO(content))
+            data = np.load(source)
             xyz = data["points"] if "points" in data else data["xyz"]
             normals = data.get("normals")
             return xyz, normals
 
         elif format_name == "parquet":
-            import pandas as pd
+            import pyarrow.parquet as pq
 
-            df = pd.read_parquet(io.BytesIO(content))
-            xyz = df[["x", "y", "z"]].values
-            normals = None
-            if all(c in df.columns for c in ["nx", "ny", "nz"]):
-                normals = df[["nx", "ny", "nz"]].values
-            return xyz, normals
+            parquet_file = pq.ParquetFile(source)
+            has_normals = all(c in parquet_file.schema_arrow.names for c in NORMAL_COLUMNS)
+            columns = [*XYZ_COLUMNS, *NORMAL_COLUMNS] if has_normals else list(XYZ_COLUMNS)
+            table = parquet_file.read(columns=columns)
+            normals = _stack_columns(table, NORMAL_COLUMNS) if has_normals else None
+            return _stack_columns(table, XYZ_COLUMNS), normals
 
         else:
             raise ValueError(f"Unsupported format: {format_name}")
 
     def _estimate_normals(self, xyz: np.ndarray, k: int = 16) -> np.ndarray:
-        """Estimate normals using PCA on k-nearest neighbors."""
-        from scipy.spatial import cKDTree
+        """Estimate normals using PCA on k-nearest neighbors.
 
-        tree = cKDTree(xyz)
-        normals = np.zeros_like(xyz)
+        Uses Open3D when it is installed. Otherwise neighborhoods are queried
+        and solved in batches of NORMAL_CHUNK_SIZE points, bounding the
+        (chunk, k, 3) working set; clouds above settings.ann_normal_threshold
+        use approximate neighbors if available.
+        """
+        xyz = np.asarray(xyz, dtype=np.float64)
+        k = min(k, len(xyz))
 
-        for i in range(len(xyz)):
-            # Find k nearest neighbors
-            _, indices = tree.query(xyz[i], k=k)
-            neighbors = xyz[indices]
+        normals = _open3d_normals(xyz, k)
+        if normals is None:
+            knn = _knn_searcher(xyz, k, self.settings.ann_normal_threshold)
+            normals = np.empty_like(xyz)
 
-            # PCA to find normal
-            centered = neighbors - neighbors.mean(axis=0)
-            cov = centered.T @ centered
-            _, _, vh = np.linalg.svd(cov)
-            normal = vh[-1]  # Smallest eigenvector
+            for start in range(0, len(xyz), NORMAL_CHUNK_SIZE):
+                chunk = xyz[start : start + NORMAL_CHUNK_SIZE]
+                neighbors = xyz[knn(chunk)]
 
-            # Consistent orientation (pointing "up" on average)
-            if normal[2] < 0:
-                normal = -normal
+                # PCA to find normal: smallest eigenvector of each covariance
+                centered = neighbors - neighbors.mean(axis=1, keepdims=True)
+                cov = np.einsum("nki,nkj->nij", centered, centered)
+                normals[start : start + len(chunk)] = _smallest_eigenvectors(cov)
 
-            normals[i] = normal
+        # Consistent orientation (pointing "up" on average)
+        normals[normals[:, 2] < 0] *= -1
 
         return normals
 
@@ -268,8 +816,6 @@ class PointCloudService:
         self, project_id: str, xyz: np.ndarray, normals: np.ndarray | None
     ) -> None:
         """Build octree for LOD streaming."""
-        import json
-
         pc_dir = self._pointcloud_dir(project_id)
         tiles_dir = pc_dir / "tiles"
         tiles_dir.mkdir(parents=True, exist_ok=True)
@@ -281,22 +827,18 @@ class PointCloudService:
         target_points = self.settings.octree_node_target
         max_depth = self.settings.octree_max_depth
 
-        # Build octree recursively
-        nodes: dict[str, OctreeNodeInfo] = {}
-        self._build_octree_recursive(
-            node_id="r",
-            xyz=xyz,
-            normals=normals,
-            indices=np.arange(len(xyz)),
-            bounds_low=bounds_low,
-            bounds_high=bounds_high,
-            level=0,
+        # Build the node structure first, collecting each tile's point indices
+        nodes, tiles = self._build_octree_nodes(
+            xyz,
+            bounds_low,
+            bounds_high,
             target_points=target_points,
             max_depth=max_depth,
-            tiles_dir=tiles_dir,
-            nodes=nodes,
+            rng=np.random.default_rng(),
         )
 
+        self._write_tile_store(tiles_dir, xyz, normals, tiles)
+
         # Save metadata
         metadata = OctreeMetadata(
             root_id="r",
@@ -308,121 +850,182 @@ class PointCloudService:
             nodes=nodes,
         )
 
-        with open(pc_dir / "octree_metadata.json", "w") as f:
-            json.dump(metadata.model_dump(), f, indent=2)
+        (pc_dir / "octree_metadata.json").write_bytes(
+            orjson.dumps(metadata.model_dump(), option=orjson.OPT_INDENT_2)
+        )
+        self._metadata_cache.pop(project_id, None)
+        (pc_dir / "octree.bits").write_bytes(encode_octree_hierarchy(metadata))
 
-    def _build_octree_recursive(
+    def _write_tile_store(
         self,
-        node_id: str,
+        tiles_dir: Path,
         xyz: np.ndarray,
         normals: np.ndarray | None,
-        indices: np.ndarray,
+        tiles: dict[str, np.ndarray],
+    ) -> None:
+        """Write every tile's arrays into one uncompressed store plus an offset index.
+
+        Each tile is float32 positions followed by octahedral int8 normals, each
+        array starting on a TILE_STORE_ALIGN boundary. Points within a tile
+        are written in Morton (Z-curve) order. Float coordinates barely
+        compress, so raw writes are far cheaper than per-tile deflate, and
+        readers slice tiles straight out of a memory map. Both files are
+        written beside the old ones and swapped in, so mappings of a previous
+        build stay valid.
+        """
+        normals_oct = encode_normals_oct(normals) if normals is not None else None
+
+        index: dict[str, dict[str, int | None]] = {}
+        offset = 0
+        store_tmp = tiles_dir / f"{TILE_STORE_NAME}.tmp"
+        # File writes release the GIL, so one writer thread stores each array
+        # while the next tile is gathered and sorted. At most one write is in
+        # flight, which keeps the arrays held for writing bounded.
+        pending: Future | None = None
+        with open(store_tmp, "wb") as f, ThreadPoolExecutor(max_workers=1) as writer:
+
+            def write(arr: np.ndarray, padding: int) -> None:
+                f.write(arr.data)
+                if padding:
+                    f.write(bytes(padding))
+
+            def append(arr: np.ndarray) -> int:
+                nonlocal offset, pending
+                start = offset
+                arr = np.ascontiguousarray(arr)
+                padding = -arr.nbytes % TILE_STORE_ALIGN
+                if pending is not None:
+                    pending.result()
+                pending = writer.submit(write, arr, padding)
+                offset += arr.nbytes + padding
+                return start
+
+            for node_id, tile_indices in tiles.items():
+                tile_xyz = xyz[tile_indices]
+                if len(tile_indices) > 1:
+                    # Spatially coherent order uploads and draws better on the client
+                    order = _morton_order(tile_xyz)
+                    tile_indices, tile_xyz = tile_indices[order], tile_xyz[order]
+                index[node_id] = {
+                    "count": len(tile_indices),
+                    "positions": append(tile_xyz.astype("<f4")),
+                    "normals_oct": (
+                        append(normals_oct[tile_indices]) if normals_oct is not None else None
+                    ),
+                }
+            if pending is not None:
+                pending.result()
+
+        index_tmp = tiles_dir / f"{TILE_INDEX_NAME}.tmp"
+        index_tmp.write_bytes(orjson.dumps(index))
+        os.replace(store_tmp, tiles_dir / TILE_STORE_NAME)
+        # The index goes last: its mtime versions the store for readers
+        os.replace(index_tmp, tiles_dir / TILE_INDEX_NAME)
+
+        # Per-tile files from builds before the store would only waste space
+        for stale in tiles_dir.glob("*.npz"):
+            stale.unlink()
+
+    def _build_octree_nodes(
+        self,
+        xyz: np.ndarray,
         bounds_low: np.ndarray,
         bounds_high: np.ndarray,
-        level: int,
         target_points: int,
         max_depth: int,
-        tiles_dir: Path,
-        nodes: dict[str, OctreeNodeInfo],
-    ) -> None:
-        """Recursively build octree nodes."""
-        point_count = len(indices)
+        rng: np.random.Generator,
+    ) -> tuple[dict[str, OctreeNodeInfo], dict[str, np.ndarray]]:
+        """Build octree nodes and the point indices of each node's tile.
 
-        # Create node info
-        node_info = OctreeNodeInfo(
-            node_id=node_id,
-            level=level,
-            bounds_low=tuple(bounds_low.tolist()),
-            bounds_high=tuple(bounds_high.tolist()),
-            point_count=point_count,
-            children=[],
-        )
+        Works from an explicit stack over one shared permutation of the point
+        indices: each node owns a contiguous range of it, and subdividing a
+        node reorders only that range by octant so children are subranges.
+        Tiles are not written here.
 
-        # Save tile data (subsample for non-leaf nodes)
-        if point_count > 0:
-            if point_count <= target_points or level >= max_depth:
-                # Leaf node: save all points
-                tile_indices = indices
-            else:
-                # Non-leaf: save subsample
-                subsample_count = min(target_points // 2, point_count)
-                tile_indices = np.random.choice(indices, subsample_count, replace=False)
-
-            tile_xyz = xyz[tile_indices]
-            tile_data = {"positions": tile_xyz.astype(np.float32)}
-            if normals is not None:
-                tile_data["normals"] = normals[tile_indices].astype(np.float32)
-
-            np.savez_compressed(tiles_dir / f"{node_id}.npz", **tile_data)
-
-        # Check if we should subdivide
-        if point_count > target_points and level < max_depth:
-            center = (bounds_low + bounds_high) / 2
+        Returns:
+            (nodes, tiles): node info by ID and tile point indices by node ID
+        """
+        nodes: dict[str, OctreeNodeInfo] = {}
+        tiles: dict[str, np.ndarray] = {}
+        perm = np.arange(len(xyz))
+        stack = [("r", 0, len(xyz), 0, bounds_low, bounds_high)]
+
+        while stack:
+            node_id, start, end, level, low, high = stack.pop()
+            point_count = end - start
+            indices = perm[start:end]
+            node_info = OctreeNodeInfo(
+                node_id=node_id,
+                level=level,
+                bounds_low=tuple(low.tolist()),
+                bounds_high=tuple(high.tolist()),
+                point_count=point_count,
+                children=[],
+            )
+            nodes[node_id] = node_info
 
+            if point_count <= target_points or level >= max_depth:
+                # Leaf node: save all points (the range is never reordered again)
+                if point_count > 0:
+                    tiles[node_id] = indices
+                continue
+
+            # Non-leaf: save subsample. Generator.choice draws without
+            # permuting all of indices, unlike np.random.choice; the
+            # draw order is irrelevant so skip shuffling the result.
+            subsample_count = min(target_points // 2, point_count)
+            tiles[node_id] = rng.choice(indices, subsample_count, replace=False, shuffle=False)
+
+            # Classify every point into its octant in one pass (bit 0 = +x
+            # half, bit 1 = +y, bit 2 = +z), then group the range by octant
+            center = (low + high) / 2
+            above = (xyz[indices] >= center).view(np.uint8)
+            code = above[:, 0] | (above[:, 1] << 1) | (above[:, 2] << 2)
+            perm[start:end] = indices[np.argsort(code, kind="stable")]
+            splits = start + np.concatenate(([0], np.cumsum(np.bincount(code, minlength=8))))
+
+            children = []
             for octant in range(8):
-                # Compute child bounds
-                child_low = bounds_low.copy()
-                child_high = bounds_high.copy()
-
-                if octant & 1:
-                    child_low[0] = center[0]
-                else:
-                    child_high[0] = center[0]
-
-                if octant & 2:
-                    child_low[1] = center[1]
-                else:
-                    child_high[1] = center[1]
-
-                if octant & 4:
-                    child_low[2] = center[2]
-                else:
-                    child_high[2] = center[2]
-
-                # Filter points in this octant
-                mask = (
-                    (xyz[indices, 0] >= child_low[0])
-                    & (xyz[indices, 0] < child_high[0])
-                    & (xyz[indices, 1] >= child_low[1])
-                    & (xyz[indices, 1] < child_high[1])
-                    & (xyz[indices, 2] >= child_low[2])
-                    & (xyz[indices, 2] < child_high[2])
-                )
-                child_indices = indices[mask]
-
-                if len(child_indices) > 0:
-                    child_id = f"{node_id}{octant}"
-                    node_info.children.append(child_id)
-
-                    self._build_octree_recursive(
-                        node_id=child_id,
-                        xyz=xyz,
-                        normals=normals,
-                        indices=child_indices,
-                        bounds_low=child_low,
-                        bounds_high=child_high,
-                        level=level + 1,
-                        target_points=target_points,
-                        max_depth=max_depth,
-                        tiles_dir=tiles_dir,
-                        nodes=nodes,
+                child_start, child_end = int(splits[octant]), int(splits[octant + 1])
+                if child_end == child_start:
+                    continue
+                bits = np.array([octant & 1, octant & 2, octant & 4], dtype=bool)
+                child_id = f"{node_id}{octant}"
+                node_info.children.append(child_id)
+                children.append(
+                    (
+                        child_id,
+                        child_start,
+                        child_end,
+                        level + 1,
+                        np.where(bits, center, low),
+                        np.where(bits, high, center),
                     )
+                )
+            # Reversed so children are visited in octant order
+            stack.extend(reversed(children))
 
-        nodes[node_id] = node_info
+        return nodes, tiles
 
     def _coords_to_node_id(self, level: int, x: int, y: int, z: int) -> str:
-        """Convert tile coordinates to node ID."""
+        """Convert tile coordinates to node ID.
+
+        The octant digits of a node ID are the base-8 digits of the Morton code
+        of (x, y, z), so the ID is that code printed in octal.
+        """
         if level == 0:
             return "r"
 
-        node_id = "r"
-        for l in range(level):
-            # Compute octant at this level
-            shift = level - l - 1
-            octant = ((x >> shift) & 1) | (((y >> shift) & 1) << 1) | (((z >> shift) & 1) << 2)
-            node_id += str(octant)
+        if level > MORTON_MAX_LEVEL:
+            node_id = "r"
+            for shift in range(level - 1, -1, -1):
+                octant = ((x >> shift) & 1) | (((y >> shift) & 1) << 1) | (((z >> shift) & 1) << 2)
+                node_id += str(octant)
+            return node_id
 
-        return node_id
+        mask = (1 << level) - 1
+        code = _spread_bits(x & mask) | _spread_bits(y & mask) << 1 | _spread_bits(z & mask) << 2
+        return f"r{code:0{level}o}"
 
     async def store_dataframe(
         self,
@@ -452,12 +1055,12 @@ class PointCloudService:
         import trimesh
 
         # Extract coordinates
-        xyz = df[["x", "y", "z"]].values.astype(np.float64)
+        xyz = df[["x", "y", "z"]].to_numpy(dtype=np.float64)
 
         # Extract or estimate normals
         normals = None
         if all(c in df.columns for c in ["nx", "ny", "nz"]):
-            normals = df[["nx", "ny", "nz"]].values.astype(np.float64)
+            normals = df[["nx", "ny", "nz"]].to_numpy(dtype=np.float64)
         elif estimate_normals:
             normals = self._estimate_normals(xyz, k=normal_k)
 
@@ -466,17 +1069,12 @@ class PointCloudService:
         bounds_high = tuple(xyz.max(axis=0).tolist())
 
         # Generate point cloud ID
-        pc_id = str(uuid.uuid4())
+        pc_id = new_id()
 
         # Save raw point cloud
         pc_dir = self._pointcloud_dir(project_id)
         pc_dir.mkdir(parents=True, exist_ok=True)
-
-        np.savez_compressed(
-            pc_dir / "points.npz",
-            xyz=xyz,
-            normals=normals if normals is not None else np.array([]),
-        )
+        self._save_points(pc_dir, xyz, normals)
 
         # Save mesh if provided
         if mesh is not None:
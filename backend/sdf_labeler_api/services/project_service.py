@@ -1,11 +1,16 @@
 # ABOUTME: Project management service
 # ABOUTME: Handles CRUD operations for labeling projects
 
-import json
-from datetime import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from sdf_labeler_api.models.project import Project, ProjectConfig, ProjectCreate
+import orjson
+
+from sdf_labeler_api.models.project import Project, ProjectConfig, ProjectCreate, utc_now
+
+# Upper bound on threads reading uncached project files in list_all
+LIST_READ_WORKERS = 32
 
 
 class ProjectService:
@@ -15,6 +20,9 @@ class ProjectService:
         self.data_dir = data_dir
         self.projects_dir = data_dir / "projects"
         self.projects_dir.mkdir(parents=True, exist_ok=True)
+        # Projects already read or written by this service, keyed by ID.
+        # All writes go through _save/delete, which keep it current.
+        self._cache: dict[str, Project] = {}
 
     def _project_path(self, project_id: str) -> Path:
         """Get path to project directory."""
@@ -43,23 +51,36 @@ class ProjectService:
 
     def get(self, project_id: str) -> Project | None:
         """Get a project by ID."""
+        cached = self._cache.get(project_id)
+        if cached is not None:
+            return cached
+
         metadata_path = self._metadata_path(project_id)
         if not metadata_path.exists():
             return None
 
-        with open(metadata_path) as f:
-            data = json.load(f)
-
-        return Project(**data)
+        project = Project.model_validate_json(metadata_path.read_bytes())
+        self._cache[project_id] = project
+        return project
 
     def list_all(self) -> list[Project]:
-        """List all projects."""
-        projects = []
-        for project_dir in self.projects_dir.iterdir():
-            if project_dir.is_dir():
-                project = self.get(project_dir.name)
-                if project:
-                    projects.append(project)
+        """List all projects.
+
+        Projects not yet cached are read on a thread pool so their file
+        reads overlap; a warm cache is listed without starting one.
+        """
+        # scandir reports the entry type from the directory listing itself,
+        # so cached projects are listed without a stat call each
+        with os.scandir(self.projects_dir) as entries:
+            project_ids = [entry.name for entry in entries if entry.is_dir()]
+
+        uncached = [project_id for project_id in project_ids if project_id not in self._cache]
+        if len(uncached) > 1:
+            workers = min(LIST_READ_WORKERS, len(uncached))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(self.get, uncached))
+
+        projects = [project for project in map(self.get, project_ids) if project]
 
         # Sort by creation date, newest first
         projects.sort(key=lambda p: p.created_at, reverse=True)
@@ -71,8 +92,10 @@ class ProjectService:
         if project is None:
             return None
 
-        project.config = config
-        project.updated_at = datetime.utcnow()
+        # Copy rather than mutate: the cached instance may be held by callers
+        project = project.model_copy(
+            update={"config": config, "updated_at": utc_now()}
+        )
         self._save(project)
 
         return project
@@ -89,10 +112,14 @@ class ProjectService:
         if project is None:
             return None
 
-        project.point_cloud_id = pointcloud_id
-        project.bounds_low = bounds_low
-        project.bounds_high = bounds_high
-        project.updated_at = datetime.utcnow()
+        project = project.model_copy(
+            update={
+                "point_cloud_id": pointcloud_id,
+                "bounds_low": bounds_low,
+                "bounds_high": bounds_high,
+                "updated_at": utc_now(),
+            }
+        )
         self._save(project)
 
         return project
@@ -107,10 +134,12 @@ class ProjectService:
         import shutil
 
         shutil.rmtree(project_path)
+        self._cache.pop(project_id, None)
         return True
 
     def _save(self, project: Project) -> None:
         """Save project metadata to disk."""
-        metadata_path = self._metadata_path(project.id)
-        with open(metadata_path, "w") as f:
-            json.dump(project.model_dump(mode="json"), f, indent=2, default=str)
+        self._metadata_path(project.id).write_bytes(
+            orjson.dumps(project.model_dump(mode="json"), option=orjson.OPT_INDENT_2)
+        )
+        self._cache[project.id] = project
@@ -1,6 +1,7 @@
 # ABOUTME: Training sample generation service
 # ABOUTME: Converts constraints to survi-compatible training data
 
+import functools
 import logging
 from pathlib import Path
 from typing import Any
@@ -8,8 +9,6 @@ from typing import Any
 import numpy as np
 import pandas as pd
 
-logger = logging.getLogger(__name__)
-
 from sdf_labeler_api.models.constraints import (
     BoxConstraint,
     BrushStrokeConstraint,
@@ -24,12 +23,167 @@ from sdf_labeler_api.models.constraints import (
 )
 from sdf_labeler_api.models.project import Project
 from sdf_labeler_api.models.samples import (
+    TRAINING_SAMPLES_ADAPTER,
     ExportConfig,
     SampleGenerationRequest,
     SamplePreview,
     TrainingSample,
     TrainingSampleSet,
 )
+from sdf_labeler_api.services import point_store
+
+logger = logging.getLogger(__name__)
+
+# Columns of a sample table, in TrainingSample field order
+SAMPLE_COLUMNS = (
+    "x", "y", "z", "phi", "nx", "ny", "nz", "weight", "source", "is_surface", "is_free"
+)
+
+# Rows per Parquet row group in samples.parquet
+SAMPLES_ROW_GROUP_SIZE = 1 << 16
+
+# Samplers return their samples as one array per column
+SampleColumns = dict[str, np.ndarray]
+
+# Constraint types that refer to stored points by index
+POINT_INDEX_CONSTRAINT_TYPES = frozenset({"seed_propagation", "slice_selection"})
+
+
+@functools.cache
+def _samples_schema() -> Any:
+    """Arrow schema of samples.parquet, one field per SAMPLE_COLUMNS entry.
+
+    Numeric columns are float32, which is ample for training targets and
+    halves the bytes read back; source holds a handful of distinct values,
+    so it is stored as a dictionary with int8 codes.
+    """
+    import pyarrow as pa
+
+    types = {
+        "source": pa.dictionary(pa.int8(), pa.string()),
+        "is_surface": pa.bool_(),
+        "is_free": pa.bool_(),
+    }
+    return pa.schema([(name, types.get(name, pa.float32())) for name in SAMPLE_COLUMNS])
+
+
+def _sample_columns(
+    points: np.ndarray,
+    normals: np.ndarray,
+    phi: np.ndarray | float,
+    *,
+    weight: float | np.ndarray,
+    source: str,
+    is_surface: bool | np.ndarray,
+    is_free: bool,
+) -> SampleColumns:
+    """Lay out (N, 3) points/normals and per-sample values as sample columns.
+
+    Scalars are broadcast to every sample.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    normals = np.broadcast_to(np.asarray(normals, dtype=np.float64), points.shape)
+    n = len(points)
+    return {
+        "x": points[:, 0],
+        "y": points[:, 1],
+        "z": points[:, 2],
+        "phi": np.broadcast_to(np.asarray(phi, dtype=np.float64), (n,)),
+        "nx": normals[:, 0],
+        "ny": normals[:, 1],
+        "nz": normals[:, 2],
+        "weight": np.broadcast_to(np.asarray(weight, dtype=np.float64), (n,)),
+        "source": np.full(n, source, dtype=object),
+        "is_surface": np.broadcast_to(np.asarray(is_surface, dtype=bool), (n,)),
+        "is_free": np.full(n, is_free),
+    }
+
+
+def _gather_points(
+    indices: np.ndarray, xyz: np.ndarray, normals: np.ndarray | None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gather points and normals for stored point indices.
+
+    Indices outside the current point cloud are dropped. Missing normals
+    default to +Z.
+
+    Returns:
+        (mask of kept indices, (K, 3) points, normals)
+    """
+    valid = (indices >= 0) & (indices < len(xyz))
+    kept = indices[valid]
+    point_normals = normals[kept] if normals is not None else np.array([0.0, 0.0, 1.0])
+    return valid, xyz[kept], point_normals
+
+
+def _samples_frame(parts: list[SampleColumns]) -> pd.DataFrame:
+    """Concatenate sampler outputs into one table with SAMPLE_COLUMNS."""
+    if not parts:
+        # An empty part still gives every column its dtype
+        parts = [
+            _sample_columns(
+                np.empty((0, 3)),
+                np.zeros(3),
+                0.0,
+                weight=1.0,
+                source="",
+                is_surface=False,
+                is_free=False,
+            )
+        ]
+    return pd.DataFrame(
+        {name: np.concatenate([part[name] for part in parts]) for name in SAMPLE_COLUMNS}
+    )
+
+
+def _to_samples(columns: SampleColumns | pd.DataFrame) -> list[TrainingSample]:
+    """Build TrainingSamples from sample columns, validated as one list.
+
+    Rows are zipped from per-column Python lists, which is cheaper than
+    DataFrame.to_dict("records"). Validating the whole list in one call is
+    also faster than TrainingSample.model_construct per sample.
+    """
+    names = list(columns.keys())
+    values = [columns[name].tolist() for name in names]
+    return TRAINING_SAMPLES_ADAPTER.validate_python(
+        [dict(zip(names, row, strict=True)) for row in zip(*values, strict=True)]
+    )
+
+
+def _column_range(parquet_file: Any, name: str) -> tuple[float, float] | None:
+    """Get a column's (min, max) from Parquet row group statistics, if all have them."""
+    column = parquet_file.schema_arrow.get_field_index(name)
+    lows, highs = [], []
+    for i in range(parquet_file.metadata.num_row_groups):
+        stats = parquet_file.metadata.row_group(i).column(column).statistics
+        if stats is None or not stats.has_min_max:
+            return None
+        lows.append(stats.min)
+        highs.append(stats.max)
+    if not lows:
+        return None
+    return min(lows), max(highs)
+
+
+def _take_rows(parquet_file: Any, indices: np.ndarray, columns: list[str]) -> Any:
+    """Read the given rows (in the given order) of a Parquet file as a pyarrow Table.
+
+    Only row groups containing at least one requested row are read.
+    """
+    metadata = parquet_file.metadata
+    group_starts = np.cumsum(
+        [0] + [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+    )
+    groups = np.searchsorted(group_starts, indices, side="right") - 1
+    needed = np.unique(groups)
+
+    # Position of each needed group's first row once the groups are concatenated
+    sizes = group_starts[needed + 1] - group_starts[needed]
+    read_starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    local = indices - group_starts[groups] + read_starts[np.searchsorted(needed, groups)]
+
+    table = parquet_file.read_row_groups(needed.tolist(), columns=columns)
+    return table.take(local)
 
 
 class SamplingService:
@@ -74,8 +228,23 @@ class SamplingService:
             preview_samples=[],  # TODO: Generate actual preview
         )
 
-    def generate(self, project_id: str, request: SampleGenerationRequest) -> TrainingSampleSet:
-        """Generate training samples from constraints."""
+    def generate(
+        self,
+        project_id: str,
+        request: SampleGenerationRequest,
+        include_samples: bool = False,
+    ) -> TrainingSampleSet:
+        """Generate training samples from constraints and save them.
+
+        Args:
+            project_id: Project to generate samples for
+            request: Generation parameters
+            include_samples: Whether to return the samples themselves rather than
+                only their count and source breakdown
+
+        Returns:
+            TrainingSampleSet describing the saved samples
+        """
         from sdf_labeler_api.config import settings
         from sdf_labeler_api.services.constraint_service import ConstraintService
         from sdf_labeler_api.services.project_service import ProjectService
@@ -89,11 +258,19 @@ class SamplingService:
 
         constraints = constraint_service.list_all(project_id)
 
-        # Load point cloud
-        xyz, normals = self._load_pointcloud(project_id, settings.data_dir)
+        # Only load the point cloud when some constraint needs its points; halfspaces
+        # need its bounds, which older projects may not have recorded
+        has_bounds = project.bounds_low is not None and project.bounds_high is not None
+        needs_points = any(
+            c.type in POINT_INDEX_CONSTRAINT_TYPES or (c.type == "halfspace" and not has_bounds)
+            for c in constraints.constraints
+        )
+        xyz, normals = (
+            self._load_pointcloud(project_id, settings.data_dir) if needs_points else (None, None)
+        )
 
         # Generate samples from constraints
-        samples = self._generate_from_constraints(
+        frame = self._generate_from_constraints(
             xyz=xyz,
             normals=normals,
             constraints=constraints,
@@ -102,17 +279,14 @@ class SamplingService:
         )
 
         # Save samples
-        self._save_samples(project_id, samples, settings.data_dir)
-
-        # Build response
-        source_breakdown = {}
-        for s in samples:
-            source_breakdown[s.source] = source_breakdown.get(s.source, 0) + 1
+        self._save_samples(project_id, frame, settings.data_dir)
 
+        # Build response; sources are counted in order of first appearance
+        source_breakdown = frame.groupby("source", sort=False).size()
         return TrainingSampleSet(
-            samples=samples,
-            sample_count=len(samples),
-            source_breakdown=source_breakdown,
+            samples=_to_samples(frame) if include_samples else [],
+            sample_count=len(frame),
+            source_breakdown={source: int(n) for source, n in source_breakdown.items()},
         )
 
     def export_parquet(self, project_id: str) -> Path | None:
@@ -136,8 +310,11 @@ class SamplingService:
         samples_path = settings.data_dir / "projects" / project_id / "samples.parquet"
         sample_count = 0
         if samples_path.exists():
-            df = pd.read_parquet(samples_path)
-            sample_count = len(df)
+            import pyarrow.parquet as pq
+
+            # The row count is in the file footer; no data needs reading
+            with pq.ParquetFile(samples_path) as parquet_file:
+                sample_count = parquet_file.metadata.num_rows
 
         return ExportConfig(
             bounds_low=project.bounds_low or (0, 0, 0),
@@ -158,15 +335,11 @@ class SamplingService:
     def _load_pointcloud(
         self, project_id: str, data_dir: Path
     ) -> tuple[np.ndarray, np.ndarray | None]:
-        """Load point cloud for a project."""
-        points_path = data_dir / "projects" / project_id / "pointcloud" / "points.npz"
-        if not points_path.exists():
+        """Load point cloud for a project (memory-mapped read-only when possible)."""
+        loaded = point_store.load_points(data_dir / "projects" / project_id / "pointcloud")
+        if loaded is None:
             raise ValueError("No point cloud uploaded")
-
-        data = np.load(points_path)
-        xyz = data["xyz"]
-        normals = data["normals"] if data["normals"].size > 0 else None
-        return xyz, normals
+        return loaded
 
     def _count_constraint_samples(
         self, constraints: ConstraintSet, samples_per_primitive: int = 100
@@ -174,79 +347,76 @@ class SamplingService:
         """Estimate sample count from constraints."""
         count = 0
         for c in constraints.constraints:
-            if isinstance(c, BrushStrokeConstraint):
-                # Each stroke point generates samples_per_primitive samples
-                count += len(c.stroke_points) * samples_per_primitive
-            elif isinstance(c, SeedPropagationConstraint):
-                count += len(c.propagated_indices)
-            elif isinstance(c, (BoxConstraint, SphereConstraint, HalfspaceConstraint)):
-                count += samples_per_primitive
-            elif isinstance(c, RayCarveConstraint):
-                # Each ray generates samples_per_primitive samples
-                count += len(c.rays) * samples_per_primitive
-            elif isinstance(c, PocketConstraint):
-                # Estimate based on voxel count
-                count += min(c.voxel_count, samples_per_primitive * 10)
-            elif isinstance(c, SliceSelectionConstraint):
-                count += len(c.point_indices)
+            match c.type:
+                case "brush_stroke":
+                    # Each stroke point generates samples_per_primitive samples
+                    count += len(c.stroke_points) * samples_per_primitive
+                case "seed_propagation":
+                    count += len(c.propagated_indices)
+                case "box" | "sphere" | "halfspace":
+                    count += samples_per_primitive
+                case "ray_carve":
+                    # Each ray generates samples_per_primitive samples
+                    count += len(c.rays) * samples_per_primitive
+                case "pocket":
+                    # Estimate based on voxel count
+                    count += min(c.voxel_count, samples_per_primitive * 10)
+                case "slice_selection":
+                    count += len(c.point_indices)
         return count
 
     def _generate_from_constraints(
         self,
-        xyz: np.ndarray,
+        xyz: np.ndarray | None,
         normals: np.ndarray | None,
         constraints: ConstraintSet,
         project: Project,
         request: SampleGenerationRequest,
-    ) -> list[TrainingSample]:
-        """Generate samples from all constraints."""
+    ) -> pd.DataFrame:
+        """Generate samples from all constraints as one table with SAMPLE_COLUMNS.
+
+        xyz may be None when no constraint needs the point cloud's points.
+        """
         rng = np.random.default_rng(request.seed)
-        samples = []
+        parts: list[SampleColumns] = []
 
         n_samples = request.samples_per_primitive
         project_id = project.id
 
-        print(f"[DEBUG] Processing {len(constraints.constraints)} constraints", flush=True)
+        near_band = project.config.near_band
+        # Point cloud bounds for halfspace constraints: recorded on the project at
+        # upload, otherwise computed once on first use
+        bounds: tuple[np.ndarray, np.ndarray] | None = None
+        if project.bounds_low is not None and project.bounds_high is not None:
+            bounds = (np.asarray(project.bounds_low), np.asarray(project.bounds_high))
+        logger.debug("Processing %d constraints", len(constraints.constraints))
+        # Dispatch on the type discriminator rather than an isinstance chain
         for constraint in constraints.constraints:
-            print(f"[DEBUG] Constraint type: {type(constraint).__name__}", flush=True)
-            if isinstance(constraint, BoxConstraint):
-                samples.extend(
-                    self._sample_box(constraint, rng, project.config.near_band, n_samples)
-                )
-            elif isinstance(constraint, SphereConstraint):
-                samples.extend(
-                    self._sample_sphere(constraint, rng, project.config.near_band, n_samples)
-                )
-            elif isinstance(constraint, HalfspaceConstraint):
-                samples.extend(
-                    self._sample_halfspace(
-                        constraint, xyz, rng, project.config.near_band, n_samples
+            match constraint.type:
+                case "box":
+                    parts.append(self._sample_box(constraint, rng, near_band, n_samples))
+                case "sphere":
+                    parts.append(self._sample_sphere(constraint, rng, near_band, n_samples))
+                case "halfspace":
+                    if bounds is None:
+                        bounds = (xyz.min(axis=0), xyz.max(axis=0))
+                    parts.append(
+                        self._sample_halfspace(constraint, bounds, rng, near_band, n_samples)
                     )
-                )
-            elif isinstance(constraint, BrushStrokeConstraint):
-                samples.extend(
-                    self._sample_brush_stroke(
-                        constraint, rng, project.config.near_band, n_samples
+                case "brush_stroke":
+                    parts.append(
+                        self._sample_brush_stroke(constraint, rng, near_band, n_samples)
                     )
-                )
-            elif isinstance(constraint, SeedPropagationConstraint):
-                samples.extend(
-                    self._sample_propagated(constraint, xyz, normals)
-                )
-            elif isinstance(constraint, RayCarveConstraint):
-                samples.extend(
-                    self._sample_ray_carve(constraint, rng, n_samples)
-                )
-            elif isinstance(constraint, PocketConstraint):
-                samples.extend(
-                    self._sample_pocket(constraint, project_id, rng, n_samples)
-                )
-            elif isinstance(constraint, SliceSelectionConstraint):
-                samples.extend(
-                    self._sample_slice_selection(constraint, xyz, normals)
-                )
+                case "seed_propagation":
+                    parts.append(self._sample_propagated(constraint, xyz, normals))
+                case "ray_carve":
+                    parts.append(self._sample_ray_carve(constraint, rng, n_samples))
+                case "pocket":
+                    parts.append(self._sample_pocket(constraint, project_id, rng, n_samples))
+                case "slice_selection":
+                    parts.append(self._sample_slice_selection(constraint, xyz, normals))
 
-        return samples
+        return _samples_frame(parts)
 
     def _sample_box(
         self,
@@ -254,48 +424,38 @@ class SamplingService:
         rng: np.random.Generator,
         near_band: float,
         n_samples: int,
-    ) -> list[TrainingSample]:
+    ) -> SampleColumns:
         """Generate samples from a box constraint."""
-        samples = []
-        center = np.array(constraint.center)
-        half = np.array(constraint.half_extents)
-        for _ in range(n_samples):
-            # Random point near box surface
-            face = rng.integers(0, 6)
-            point = center + rng.uniform(-1, 1, 3) * half
-
-            # Clamp to face
-            axis = face // 2
-            sign = 1 if face % 2 else -1
-            point[axis] = center[axis] + sign * half[axis]
-
-            # Offset based on sign convention
-            # EMPTY (outside) = positive SDF, SOLID (inside) = negative SDF
-            offset = near_band if constraint.sign == SignConvention.EMPTY else -near_band
-            normal = np.zeros(3)
-            normal[axis] = sign
-            point = point + offset * normal
-
-            # phi directly uses offset: EMPTY=+near_band, SOLID=-near_band
-            phi = offset
-
-            samples.append(
-                TrainingSample(
-                    x=float(point[0]),
-                    y=float(point[1]),
-                    z=float(point[2]),
-                    phi=phi,
-                    nx=float(normal[0]),
-                    ny=float(normal[1]),
-                    nz=float(normal[2]),
-                    weight=constraint.weight,
-                    source=f"box_{constraint.sign.value}",
-                    is_surface=False,
-                    is_free=constraint.sign == SignConvention.EMPTY,
-                )
-            )
-
-        return samples
+        center = np.array(constraint.center, dtype=np.float64)
+        half = np.array(constraint.half_extents, dtype=np.float64)
+
+        # Random points near the box surface: pick a face per sample, then
+        # clamp each point onto it
+        faces = rng.integers(0, 6, size=n_samples)
+        axis = faces // 2
+        sign = np.where(faces % 2, 1.0, -1.0)
+        points = center + rng.uniform(-1, 1, (n_samples, 3)) * half
+        rows = np.arange(n_samples)
+        points[rows, axis] = center[axis] + sign * half[axis]
+
+        normals = np.zeros((n_samples, 3))
+        normals[rows, axis] = sign
+
+        # Offset based on sign convention
+        # EMPTY (outside) = positive SDF, SOLID (inside) = negative SDF
+        offset = near_band if constraint.sign == SignConvention.EMPTY else -near_band
+        points += offset * normals
+
+        # phi directly uses offset: EMPTY=+near_band, SOLID=-near_band
+        return _sample_columns(
+            points,
+            normals,
+            np.full(n_samples, offset),
+            weight=constraint.weight,
+            source=f"box_{constraint.sign.value}",
+            is_surface=False,
+            is_free=constraint.sign == SignConvention.EMPTY,
+        )
 
     def _sample_sphere(
         self,
@@ -303,90 +463,65 @@ class SamplingService:
         rng: np.random.Generator,
         near_band: float,
         n_samples: int,
-    ) -> list[TrainingSample]:
+    ) -> SampleColumns:
         """Generate samples from a sphere constraint."""
-        samples = []
-        center = np.array(constraint.center)
-        radius = constraint.radius
-        for _ in range(n_samples):
-            # Random direction
-            direction = rng.standard_normal(3)
-            direction /= np.linalg.norm(direction)
-
-            # Point on sphere surface
-            point = center + radius * direction
-
-            # Offset based on sign
-            # EMPTY (outside) = positive SDF, SOLID (inside) = negative SDF
-            offset = near_band if constraint.sign == SignConvention.EMPTY else -near_band
-            point = point + offset * direction
-            phi = offset
-
-            samples.append(
-                TrainingSample(
-                    x=float(point[0]),
-                    y=float(point[1]),
-                    z=float(point[2]),
-                    phi=phi,
-                    nx=float(direction[0]),
-                    ny=float(direction[1]),
-                    nz=float(direction[2]),
-                    weight=constraint.weight,
-                    source=f"sphere_{constraint.sign.value}",
-                    is_surface=False,
-                    is_free=constraint.sign == SignConvention.EMPTY,
-                )
-            )
-
-        return samples
+        center = np.array(constraint.center, dtype=np.float64)
+
+        # Uniform random directions: normalized Gaussian vectors
+        directions = rng.standard_normal((n_samples, 3))
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+
+        # Offset from the surface based on sign
+        # EMPTY (outside) = positive SDF, SOLID (inside) = negative SDF
+        offset = near_band if constraint.sign == SignConvention.EMPTY else -near_band
+        points = center + (constraint.radius + offset) * directions
+
+        return _sample_columns(
+            points,
+            directions,
+            np.full(n_samples, offset),
+            weight=constraint.weight,
+            source=f"sphere_{constraint.sign.value}",
+            is_surface=False,
+            is_free=constraint.sign == SignConvention.EMPTY,
+        )
 
     def _sample_halfspace(
         self,
         constraint: HalfspaceConstraint,
-        xyz: np.ndarray,
+        bounds: tuple[np.ndarray, np.ndarray],
         rng: np.random.Generator,
         near_band: float,
         n_samples: int,
-    ) -> list[TrainingSample]:
-        """Generate samples from a halfspace constraint."""
-        samples = []
-        point = np.array(constraint.point)
-        normal = np.array(constraint.normal)
-        normal /= np.linalg.norm(normal)
-
-        # Sample points in the halfspace region
-        bounds_low = xyz.min(axis=0)
-        bounds_high = xyz.max(axis=0)
-        for _ in range(n_samples):
-            # Random point in bounds
-            sample_point = rng.uniform(bounds_low, bounds_high)
-
-            # Compute signed distance to plane
-            dist = np.dot(sample_point - point, normal)
+    ) -> SampleColumns:
+        """Generate samples from a halfspace constraint.
 
-            # Determine phi based on sign convention
-            if constraint.sign == SignConvention.EMPTY:
-                phi = abs(dist) + near_band  # Positive (outside)
-            else:
-                phi = -(abs(dist) + near_band)  # Negative (inside)
-
-            samples.append(
-                TrainingSample(
-                    x=float(sample_point[0]),
-                    y=float(sample_point[1]),
-                    z=float(sample_point[2]),
-                    phi=phi,
-                    nx=float(normal[0]),
-                    ny=float(normal[1]),
-                    nz=float(normal[2]),
-                    weight=constraint.weight,
-                    source=f"halfspace_{constraint.sign.value}",
-                    is_surface=False,
-                    is_free=constraint.sign == SignConvention.EMPTY,
-                )
-            )
+        Args:
+            bounds: (low, high) corners of the point cloud's bounding box
+        """
+        point = np.array(constraint.point, dtype=np.float64)
+        normal = np.array(constraint.normal, dtype=np.float64)
+        normal /= np.linalg.norm(normal)
 
-        return samples
+        # Random points in the point cloud bounds, and their distance to the plane
+        bounds_low, bounds_high = bounds
+        points = rng.uniform(bounds_low, bounds_high, size=(n_samples, 3))
+        dist = (points - point) @ normal
+
+        # Determine phi based on sign convention
+        # EMPTY = positive (outside), SOLID = negative (inside)
+        sign = 1.0 if constraint.sign == SignConvention.EMPTY else -1.0
+        phi = sign * (np.abs(dist) + near_band)
+
+        return _sample_columns(
+            points,
+            np.broadcast_to(normal, points.shape),
+            phi,
+            weight=constraint.weight,
+            source=f"halfspace_{constraint.sign.value}",
+            is_surface=False,
+            is_free=constraint.sign == SignConvention.EMPTY,
+        )
 
     def _sample_brush_stroke(
         self,
@@ -394,15 +529,11 @@ class SamplingService:
         rng: np.random.Generator,
         near_band: float,
         n_samples_per_point: int,
-    ) -> list[TrainingSample]:
+    ) -> SampleColumns:
         """Generate samples from brush stroke volume.
 
         Samples uniformly within the tube-like stroke region.
         """
-        samples = []
-        stroke_points = np.array(constraint.stroke_points)
-        radius = constraint.radius
-
         # Determine phi based on sign
         if constraint.sign == SignConvention.SURFACE:
             phi = 0.0
@@ -411,161 +542,123 @@ class SamplingService:
         else:  # EMPTY
             phi = near_band
 
-        # Sample around each stroke point
-        for center in stroke_points:
-            for _ in range(n_samples_per_point):
-                # Random point within sphere of radius
-                direction = rng.standard_normal(3)
-                direction /= np.linalg.norm(direction)
-                distance = rng.uniform(0, radius)
-                point = center + distance * direction
-
-                samples.append(
-                    TrainingSample(
-                        x=float(point[0]),
-                        y=float(point[1]),
-                        z=float(point[2]),
-                        phi=phi,
-                        nx=0.0,  # No normal for volumetric samples
-                        ny=0.0,
-                        nz=0.0,
-                        weight=constraint.weight,
-                        source=f"brush_{constraint.sign.value}",
-                        is_surface=constraint.sign == SignConvention.SURFACE,
-                        is_free=constraint.sign == SignConvention.EMPTY,
-                    )
-                )
-
-        return samples
+        # Random points within a sphere of radius around each stroke point
+        centers = np.repeat(
+            np.asarray(constraint.stroke_points, dtype=np.float64).reshape(-1, 3),
+            n_samples_per_point,
+            axis=0,
+        )
+        directions = rng.standard_normal(centers.shape)
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        distances = rng.uniform(0, constraint.radius, (len(centers), 1))
+
+        return _sample_columns(
+            centers + distances * directions,
+            np.zeros(3),  # No normal for volumetric samples
+            phi,
+            weight=constraint.weight,
+            source=f"brush_{constraint.sign.value}",
+            is_surface=constraint.sign == SignConvention.SURFACE,
+            is_free=constraint.sign == SignConvention.EMPTY,
+        )
 
     def _sample_propagated(
         self,
         constraint: SeedPropagationConstraint,
         xyz: np.ndarray,
         normals: np.ndarray | None,
-    ) -> list[TrainingSample]:
+    ) -> SampleColumns:
         """Generate samples from propagated seed."""
-        samples = []
+        indices = np.asarray(constraint.propagated_indices, dtype=np.intp)
+        # Points without a confidence get full weight
+        confidences = np.ones(len(indices))
+        n_confident = min(len(indices), len(constraint.confidences))
+        confidences[:n_confident] = constraint.confidences[:n_confident]
 
-        for i, idx in enumerate(constraint.propagated_indices):
-            if idx >= len(xyz):
-                continue
+        valid, points, point_normals = _gather_points(indices, xyz, normals)
 
-            point = xyz[idx]
-            normal = normals[idx] if normals is not None else [0, 0, 1]
-            confidence = constraint.confidences[i] if i < len(constraint.confidences) else 1.0
-
-            phi = 0.0 if constraint.sign == SignConvention.SURFACE else (
-                -0.01 if constraint.sign == SignConvention.SOLID else 0.01
-            )
-
-            samples.append(
-                TrainingSample(
-                    x=float(point[0]),
-                    y=float(point[1]),
-                    z=float(point[2]),
-                    phi=phi,
-                    nx=float(normal[0]),
-                    ny=float(normal[1]),
-                    nz=float(normal[2]),
-                    weight=constraint.weight * confidence,
-                    source=f"propagated_{constraint.sign.value}",
-                    is_surface=constraint.sign == SignConvention.SURFACE,
-                    is_free=constraint.sign == SignConvention.EMPTY,
-                )
-            )
+        phi = 0.0 if constraint.sign == SignConvention.SURFACE else (
+            -0.01 if constraint.sign == SignConvention.SOLID else 0.01
+        )
 
-        return samples
+        return _sample_columns(
+            points,
+            point_normals,
+            phi,
+            weight=constraint.weight * confidences[valid],
+            source=f"propagated_{constraint.sign.value}",
+            is_surface=constraint.sign == SignConvention.SURFACE,
+            is_free=constraint.sign == SignConvention.EMPTY,
+        )
 
     def _sample_ray_carve(
         self,
         constraint: RayCarveConstraint,
         rng: np.random.Generator,
         n_samples_per_ray: int,
-    ) -> list[TrainingSample]:
+    ) -> SampleColumns:
         """Generate samples from ray-carve constraint.
 
         For each ray:
-        1. Sample EMPTY points uniformly along ray from origin to (hit - empty_band)
-        2. Sample SURFACE points in band around hit point
-        """
-        print(f"[DEBUG] _sample_ray_carve called with {len(constraint.rays)} rays, coeff={constraint.back_buffer_coefficient}", flush=True)
-        samples = []
-
-        for ray in constraint.rays:
-            origin = np.array(ray.origin)
-            direction = np.array(ray.direction)
-            direction = direction / np.linalg.norm(direction)
-            hit_dist = ray.hit_distance
-
-            # Compute the "impenetrable buffer" zone size
-            # This is the zone before the hit where we don't sample empty points
-            # Higher coefficient = larger buffer = more protection from bleed-through
-            if ray.local_spacing is not None:
-                buffer_zone = ray.local_spacing * constraint.back_buffer_coefficient
-                print(f"[DEBUG] Impenetrable buffer: local_spacing={ray.local_spacing:.4f} × coeff={constraint.back_buffer_coefficient} = {buffer_zone:.4f}", flush=True)
-            else:
-                buffer_zone = constraint.back_buffer_width
-                print(f"[DEBUG] Fixed buffer: {buffer_zone:.4f} (no local_spacing)", flush=True)
-
-            # EMPTY samples along ray (before hit, stopping at buffer zone)
-            empty_end = hit_dist - buffer_zone
-            n_empty = n_samples_per_ray // 2
-
-            if empty_end > 0:
-                for _ in range(n_empty):
-                    t = rng.uniform(0, empty_end)
-                    point = origin + t * direction
-
-                    samples.append(
-                        TrainingSample(
-                            x=float(point[0]),
-                            y=float(point[1]),
-                            z=float(point[2]),
-                            phi=buffer_zone,  # Positive = outside, at least buffer_zone away
-                            nx=float(direction[0]),
-                            ny=float(direction[1]),
-                            nz=float(direction[2]),
-                            weight=constraint.weight,
-                            source="ray_carve_empty",
-                            is_surface=False,
-                            is_free=True,
-                        )
-                    )
+        1. Sample EMPTY points uniformly along ray from origin to (hit - buffer)
+        2. Sample SURFACE points in band before the hit point
 
-            # SURFACE samples near hit (from -surface_band to hit, NEVER past hit!)
-            n_surface = n_samples_per_ray - n_empty
-            for _ in range(n_surface):
-                t = rng.uniform(
-                    hit_dist - constraint.surface_band_width,
-                    hit_dist,  # Never sample past the hit point
-                )
-                point = origin + t * direction
-                phi = t - hit_dist  # Signed distance from surface (always <= 0 now)
-
-                # Use surface normal if available, otherwise use ray direction
-                if ray.surface_normal:
-                    nx, ny, nz = ray.surface_normal
-                else:
-                    nx, ny, nz = -direction[0], -direction[1], -direction[2]
-
-                samples.append(
-                    TrainingSample(
-                        x=float(point[0]),
-                        y=float(point[1]),
-                        z=float(point[2]),
-                        phi=phi,
-                        nx=float(nx),
-                        ny=float(ny),
-                        nz=float(nz),
-                        weight=constraint.weight,
-                        source="ray_carve_surface",
-                        is_surface=abs(phi) < 0.01,
-                        is_free=False,
-                    )
-                )
+        All rays are sampled at once from the constraint's array view.
+        """
+        rays = constraint.arrays
+        n_empty = n_samples_per_ray // 2
+        n_surface = n_samples_per_ray - n_empty
+
+        # Compute the "impenetrable buffer" zone size per ray
+        # This is the zone before the hit where we don't sample empty points
+        # Higher coefficient = larger buffer = more protection from bleed-through
+        buffer_zone = np.where(
+            np.isnan(rays.local_spacing),
+            constraint.back_buffer_width,
+            rays.local_spacing * constraint.back_buffer_coefficient,
+        )
 
-        return samples
+        # EMPTY samples along ray (before hit, stopping at buffer zone)
+        empty_end = rays.hit_distances - buffer_zone
+        carved = empty_end > 0
+        t = rng.uniform(0.0, 1.0, (int(carved.sum()), n_empty)) * empty_end[carved, None]
+        empty_dirs = rays.directions[carved]
+        empty_points = rays.origins[carved, None, :] + t[..., None] * empty_dirs[:, None, :]
+        empty_phi = np.repeat(buffer_zone[carved], n_empty)
+        empty_normals = np.repeat(empty_dirs, n_empty, axis=0)
+
+        # SURFACE samples near hit (from -surface_band to hit, NEVER past hit!)
+        hit = rays.hit_distances[:, None]
+        t = rng.uniform(hit - constraint.surface_band_width, hit, (len(hit), n_surface))
+        surface_points = rays.origins[:, None, :] + t[..., None] * rays.directions[:, None, :]
+        surface_phi = (t - hit).ravel()  # Signed distance from surface (always <= 0)
+
+        # Use surface normal if available, otherwise use reversed ray direction
+        ray_normals = np.where(
+            rays.has_surface_normal[:, None], rays.surface_normals, -rays.directions
+        )
+        surface_normals = np.repeat(ray_normals, n_surface, axis=0)
+
+        # Empty phi is positive (outside), at least buffer_zone away
+        empty = _sample_columns(
+            empty_points,
+            empty_normals,
+            empty_phi,
+            weight=constraint.weight,
+            source="ray_carve_empty",
+            is_surface=False,
+            is_free=True,
+        )
+        surface = _sample_columns(
+            surface_points,
+            surface_normals,
+            surface_phi,
+            weight=constraint.weight,
+            source="ray_carve_surface",
+            is_surface=np.abs(surface_phi) < 0.01,
+            is_free=False,
+        )
+        return {name: np.concatenate([empty[name], surface[name]]) for name in SAMPLE_COLUMNS}
 
     def _sample_pocket(
         self,
@@ -573,7 +666,7 @@ class SamplingService:
         project_id: str,
         rng: np.random.Generator,
         n_samples: int,
-    ) -> list[TrainingSample]:
+    ) -> SampleColumns:
         """Generate samples from a pocket constraint.
 
         Samples uniformly within the pocket voxel volume.
@@ -585,9 +678,8 @@ class SamplingService:
         voxels = pocket_service.get_pocket_voxels(project_id, constraint.pocket_id)
 
         if voxels is None or len(voxels) == 0:
-            return []
-
-        samples = []
+            # No samples; an empty point array keeps the columns well-typed
+            voxels, n_samples = np.empty((1, 3)), 0
 
         # Determine phi based on sign
         if constraint.sign == SignConvention.SOLID:
@@ -595,86 +687,70 @@ class SamplingService:
         else:
             phi = 0.05  # Positive = outside
 
-        # Sample uniformly within pocket volume
+        # Sample uniformly within pocket volume: random voxel centers
         n_to_sample = min(n_samples, len(voxels) * 10)
-        for _ in range(n_to_sample):
-            # Pick random voxel center
-            idx = rng.integers(0, len(voxels))
-            point = voxels[idx]
-
-            samples.append(
-                TrainingSample(
-                    x=float(point[0]),
-                    y=float(point[1]),
-                    z=float(point[2]),
-                    phi=phi,
-                    nx=0.0,
-                    ny=0.0,
-                    nz=0.0,
-                    weight=constraint.weight,
-                    source=f"pocket_{constraint.sign.value}",
-                    is_surface=False,
-                    is_free=constraint.sign == SignConvention.EMPTY,
-                )
-            )
-
-        return samples
+        points = voxels[rng.integers(0, len(voxels), size=n_to_sample)]
+
+        return _sample_columns(
+            points,
+            np.zeros(3),
+            phi,
+            weight=constraint.weight,
+            source=f"pocket_{constraint.sign.value}",
+            is_surface=False,
+            is_free=constraint.sign == SignConvention.EMPTY,
+        )
 
     def _sample_slice_selection(
         self,
         constraint: SliceSelectionConstraint,
         xyz: np.ndarray,
         normals: np.ndarray | None,
-    ) -> list[TrainingSample]:
+    ) -> SampleColumns:
         """Generate samples from slice selection constraint.
 
         One sample per selected point.
         """
-        samples = []
-
-        for idx in constraint.point_indices:
-            if idx >= len(xyz):
-                continue
-
-            point = xyz[idx]
-            normal = normals[idx] if normals is not None else [0, 0, 1]
-
-            # Determine phi based on sign
-            if constraint.sign == SignConvention.SURFACE:
-                phi = 0.0
-            elif constraint.sign == SignConvention.SOLID:
-                phi = -0.01
-            else:  # EMPTY
-                phi = 0.01
-
-            samples.append(
-                TrainingSample(
-                    x=float(point[0]),
-                    y=float(point[1]),
-                    z=float(point[2]),
-                    phi=phi,
-                    nx=float(normal[0]),
-                    ny=float(normal[1]),
-                    nz=float(normal[2]),
-                    weight=constraint.weight,
-                    source=f"slice_{constraint.sign.value}",
-                    is_surface=constraint.sign == SignConvention.SURFACE,
-                    is_free=constraint.sign == SignConvention.EMPTY,
-                )
-            )
+        indices = np.asarray(constraint.point_indices, dtype=np.intp)
+        _, points, point_normals = _gather_points(indices, xyz, normals)
 
-        return samples
+        # Determine phi based on sign
+        if constraint.sign == SignConvention.SURFACE:
+            phi = 0.0
+        elif constraint.sign == SignConvention.SOLID:
+            phi = -0.01
+        else:  # EMPTY
+            phi = 0.01
+
+        return _sample_columns(
+            points,
+            point_normals,
+            phi,
+            weight=constraint.weight,
+            source=f"slice_{constraint.sign.value}",
+            is_surface=constraint.sign == SignConvention.SURFACE,
+            is_free=constraint.sign == SignConvention.EMPTY,
+        )
 
     def _save_samples(
-        self, project_id: str, samples: list[TrainingSample], data_dir: Path
+        self, project_id: str, frame: pd.DataFrame, data_dir: Path
     ) -> None:
-        """Save samples to Parquet file."""
-        if not samples:
+        """Save a sample table to Parquet file."""
+        if frame.empty:
             return
 
-        df = pd.DataFrame([s.model_dump() for s in samples])
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
         path = data_dir / "projects" / project_id / "samples.parquet"
-        df.to_parquet(path)
+        table = pa.Table.from_pandas(frame, schema=_samples_schema(), preserve_index=False)
+        # One row group per batch: modest groups let readers skip what they
+        # don't need, and the writer never buffers the whole table encoded
+        with pq.ParquetWriter(
+            path, table.schema, compression="zstd", compression_level=3, use_dictionary=True
+        ) as writer:
+            for batch in table.to_batches(max_chunksize=SAMPLES_ROW_GROUP_SIZE):
+                writer.write_batch(batch)
 
     def get_samples_for_visualization(
         self, project_id: str, limit: int = 10000, subsample: bool = True
@@ -691,7 +767,10 @@ class SamplingService:
             SampleVisualizationResponse with minimal sample data for rendering
         """
         from sdf_labeler_api.config import settings
-        from sdf_labeler_api.models.samples import SamplePoint, SampleVisualizationResponse
+        from sdf_labeler_api.models.samples import (
+            SAMPLE_POINTS_ADAPTER,
+            SampleVisualizationResponse,
+        )
 
         samples_path = settings.data_dir / "projects" / project_id / "samples.parquet"
         if not samples_path.exists():
@@ -703,25 +782,32 @@ class SamplingService:
                 phi_max=0.0,
             )
 
-        df = pd.read_parquet(samples_path, columns=["x", "y", "z", "phi"])
-        total_count = len(df)
-
-        # Compute phi stats before subsampling
-        phi_min = float(df["phi"].min())
-        phi_max = float(df["phi"].max())
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
 
-        # Subsample if needed
-        if subsample and total_count > limit:
-            indices = np.random.default_rng(seed=42).choice(
-                total_count, size=limit, replace=False
-            )
-            df = df.iloc[indices]
+        columns = ["x", "y", "z", "phi"]
+        with pq.ParquetFile(samples_path) as parquet_file:
+            total_count = parquet_file.metadata.num_rows
 
-        # Convert to list of SamplePoint
-        samples = [
-            SamplePoint(x=row["x"], y=row["y"], z=row["z"], phi=row["phi"])
-            for _, row in df.iterrows()
-        ]
+            # Subsample if needed, reading only the row groups holding chosen rows
+            if subsample and total_count > limit:
+                indices = np.random.default_rng(seed=42).choice(
+                    total_count, size=limit, replace=False
+                )
+                table = _take_rows(parquet_file, indices, columns)
+            else:
+                table = parquet_file.read(columns=columns)
+
+            # phi stats cover every sample, not just the returned subset
+            phi_range = _column_range(parquet_file, "phi")
+            if phi_range is None:
+                phi_column = parquet_file.read(columns=["phi"]).column("phi")
+                phi_stats = pc.min_max(phi_column)
+                phi_range = (phi_stats["min"].as_py(), phi_stats["max"].as_py())
+        phi_min, phi_max = (float(v) for v in phi_range)
+
+        # Convert to SamplePoints from plain row dicts, validated as one list
+        samples = SAMPLE_POINTS_ADAPTER.validate_python(table.to_pylist())
 
         return SampleVisualizationResponse(
             samples=samples,
@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+import functools
 import logging
 from dataclasses import dataclass
 from importlib import resources
@@ -14,10 +15,13 @@ import pandas as pd
 import trimesh
 
 if TYPE_CHECKING:
-    from numpy.typing import NDArray
+    from numpy.typing import DTypeLike, NDArray
 
 logger = logging.getLogger(__name__)
 
+# Loaded scenarios kept in memory; bundled scenario data never changes at runtime
+SCENARIO_CACHE_SIZE = 8
+
 
 @dataclass
 class ScenarioInfo:
@@ -41,21 +45,51 @@ class LoadedScenario:
     metadata: dict
 
 
+@functools.lru_cache(maxsize=1)
+def _cached_trenchfoot_scenarios() -> tuple[ScenarioInfo, ...]:
+    """Import survi_scenarios and describe its trenchfoot scenarios, once."""
+    import survi_scenarios
+
+    return tuple(
+        ScenarioInfo(
+            name=name,
+            description=f"Trenchfoot scenario: {name.replace('_', ' ').title()}",
+            category="trenchfoot",
+        )
+        for name in survi_scenarios.list_trenchfoot_scenarios()
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_sdf_scenarios() -> tuple[ScenarioInfo, ...]:
+    """Import survi_scenarios and describe its SDF scenarios, once."""
+    from survi_scenarios import list_sdf_scenarios as _list_sdf
+
+    return tuple(
+        ScenarioInfo(
+            name=name,
+            description=f"SDF scenario: {name.replace('_', ' ').title()}",
+            category="sdf",
+        )
+        for name in _list_sdf()
+    )
+
+
+def clear_scenario_cache() -> None:
+    """Forget cached scenario listings and loaded scenarios."""
+    for cached in (
+        _cached_trenchfoot_scenarios,
+        _cached_sdf_scenarios,
+        load_trenchfoot_scenario,
+        load_sdf_scenario,
+    ):
+        cached.cache_clear()
+
+
 def list_trenchfoot_scenarios() -> list[ScenarioInfo]:
     """List available trenchfoot scenarios from the surface-scenarios package."""
     try:
-        import survi_scenarios
-
-        scenario_names = survi_scenarios.list_trenchfoot_scenarios()
-        return [
-            ScenarioInfo(
-                name=name,
-                description=f"Trenchfoot scenario: {name.replace('_', ' ').title()}",
-                category="trenchfoot",
-            )
-            for name in scenario_names
-        ]
-
+        return list(_cached_trenchfoot_scenarios())
     except ImportError:
         logger.warning("survi_scenarios package not available")
         return []
@@ -67,18 +101,7 @@ def list_trenchfoot_scenarios() -> list[ScenarioInfo]:
 def list_sdf_scenarios() -> list[ScenarioInfo]:
     """List available SDF scenarios from the surface-scenarios package."""
     try:
-        from survi_scenarios import list_sdf_scenarios as _list_sdf
-
-        scenario_names = _list_sdf()
-        return [
-            ScenarioInfo(
-                name=name,
-                description=f"SDF scenario: {name.replace('_', ' ').title()}",
-                category="sdf",
-            )
-            for name in scenario_names
-        ]
-
+        return list(_cached_sdf_scenarios())
     except ImportError:
         logger.warning("survi_scenarios package not available")
         return []
@@ -87,18 +110,25 @@ def list_sdf_scenarios() -> list[ScenarioInfo]:
         return []
 
 
+@functools.lru_cache(maxsize=SCENARIO_CACHE_SIZE)
 def load_trenchfoot_scenario(
     scenario_name: str,
     num_samples: int = 50000,
     variant: str | None = None,
+    dtype: DTypeLike = np.float64,
 ) -> LoadedScenario:
     """
     Load a trenchfoot scenario by name using the survi_scenarios API.
 
+    Results are cached, so repeated loads return the same LoadedScenario (and
+    the same sampled points); callers must not modify it.
+
     Args:
         scenario_name: Name of the scenario (e.g., "S01_straight_vwalls")
         num_samples: Number of points to sample from mesh (default 50000)
         variant: Optional variant name (not currently used, reserved for future)
+        dtype: Dtype of the sampled point and normal columns; pass float32 to
+            hold mesh-sampled coordinates at half the memory
 
     Returns:
         LoadedScenario with point cloud DataFrame and mesh
@@ -118,30 +148,31 @@ def load_trenchfoot_scenario(
     mesh = trimesh.load(mesh_path)
     if isinstance(mesh, trimesh.Scene):
         meshes = [g for g in mesh.geometry.values() if isinstance(g, trimesh.Trimesh)]
-        if meshes:
-            mesh = trimesh.util.concatenate(meshes)
-        else:
+        if not meshes:
             raise ValueError(f"No mesh geometry found: {scenario_name}")
+        # Concatenating copies every vertex and face, so only do it for several parts
+        mesh = meshes[0] if len(meshes) == 1 else trimesh.util.concatenate(meshes)
 
     # Sample points uniformly from mesh surface
     points, face_indices = mesh.sample(num_samples, return_index=True)
 
     # Compute face normals for sampled points
-    face_normals = mesh.face_normals[face_indices]
-
-    points_data = {
-        "x": points[:, 0].astype(np.float64),
-        "y": points[:, 1].astype(np.float64),
-        "z": points[:, 2].astype(np.float64),
-        "nx": face_normals[:, 0].astype(np.float64),
-        "ny": face_normals[:, 1].astype(np.float64),
-        "nz": face_normals[:, 2].astype(np.float64),
-    }
+    face_normals = np.take(mesh.face_normals, face_indices, axis=0)
 
-    points_df = pd.DataFrame(points_data)
+    # One (N, 6) block backs the whole frame, so pandas wraps it without
+    # copying each column separately
+    points_block = np.hstack([points, face_normals], dtype=dtype)
+    points_df = pd.DataFrame(
+        points_block, columns=["x", "y", "z", "nx", "ny", "nz"], copy=False
+    )
 
-    # Compute bounds from mesh
-    bounds = (mesh.bounds[0], mesh.bounds[1])
+    # Bounds of the coordinates as stored in the frame, so they match the bounds
+    # recorded when it is stored even after rounding to a narrower dtype
+    xyz = points_block[:, :3]
+    bounds = (
+        xyz.min(axis=0).astype(np.float64),
+        xyz.max(axis=0).astype(np.float64),
+    )
 
     # Build metadata
     metadata = {
@@ -162,10 +193,13 @@ def load_trenchfoot_scenario(
     )
 
 
+@functools.lru_cache(maxsize=SCENARIO_CACHE_SIZE)
 def load_sdf_scenario(scenario_name: str) -> LoadedScenario:
     """
     Load an SDF scenario by name.
 
+    Results are cached and shared between callers, who must not modify them.
+
     Args:
         scenario_name: Name of the scenario (e.g., "torus_compact")
 
@@ -176,7 +210,6 @@ def load_sdf_scenario(scenario_name: str) -> LoadedScenario:
 
     surface = _load_sdf(scenario_name)
 
-    # Convert to DataFrame
     points_df = surface.surface_df.copy()
 
     # Ensure required columns exist
@@ -186,9 +219,12 @@ def load_sdf_scenario(scenario_name: str) -> LoadedScenario:
     # Load mesh if available
     mesh = surface.mesh if hasattr(surface, "mesh") and surface.mesh is not None else None
 
-    # Compute bounds
-    coords = points_df[["x", "y", "z"]].values
-    bounds = (coords.min(axis=0), coords.max(axis=0))
+    # Reduce each column in place rather than copying the coordinates into an (N, 3) array
+    columns = [points_df[name] for name in ("x", "y", "z")]
+    bounds = (
+        np.array([column.min() for column in columns], dtype=np.float64),
+        np.array([column.max() for column in columns], dtype=np.float64),
+    )
 
     metadata = {
         "scenario": scenario_name,
@@ -0,0 +1,257 @@
+# ABOUTME: Compact binary encodings for octree tiles and their hierarchy
+# ABOUTME: Octahedral normals, packed labels, 16-bit positions, binary tiles, octree layout
+
+import struct
+from collections import deque
+
+import numpy as np
+
+from sdf_labeler_api.models.point_cloud import OctreeMetadata
+
+
+def _sign_not_zero(v: np.ndarray) -> np.ndarray:
+    """Elementwise sign that maps 0 to +1."""
+    return np.where(v >= 0, 1.0, -1.0)
+
+
+def encode_normals_oct(normals: np.ndarray) -> np.ndarray:
+    """Encode unit normals as octahedral snorm8 pairs.
+
+    Args:
+        normals: (N, 3) unit vectors
+
+    Returns:
+        (N, 2) int8 array; decoding error is about 1 degree at worst
+    """
+    n = np.asarray(normals, dtype=np.float64)
+    n = n / np.maximum(np.abs(n).sum(axis=1, keepdims=True), 1e-12)
+    x, y, z = n[:, 0], n[:, 1], n[:, 2]
+
+    # Fold the lower hemisphere over the diagonals
+    lower = z < 0
+    fx = np.where(lower, (1 - np.abs(y)) * _sign_not_zero(x), x)
+    fy = np.where(lower, (1 - np.abs(x)) * _sign_not_zero(y), y)
+
+    oct_xy = np.stack([fx, fy], axis=1)
+    return np.round(np.clip(oct_xy, -1.0, 1.0) * 127).astype(np.int8)
+
+
+def decode_normals_oct(encoded: np.ndarray) -> np.ndarray:
+    """Decode octahedral snorm8 pairs back to (N, 3) float32 unit normals."""
+    e = np.asarray(encoded, dtype=np.float32).reshape(-1, 2) / 127
+    x, y = e[:, 0], e[:, 1]
+    z = 1 - np.abs(x) - np.abs(y)
+
+    lower = z < 0
+    ux = np.where(lower, (1 - np.abs(y)) * _sign_not_zero(x), x)
+    uy = np.where(lower, (1 - np.abs(x)) * _sign_not_zero(y), y)
+
+    n = np.stack([ux, uy, z], axis=1)
+    return (n / np.linalg.norm(n, axis=1, keepdims=True)).astype(np.float32)
+
+
+def pack_labels(labels: np.ndarray) -> np.ndarray:
+    """Pack labels in 0..3 four to a byte, first label in the low bits."""
+    labels = np.asarray(labels, dtype=np.uint8)
+    if np.any(labels > 3):
+        raise ValueError("Labels must be in the range 0..3 to pack into 2 bits")
+
+    padded = np.zeros(-(-len(labels) // 4) * 4, dtype=np.uint8)
+    padded[: len(labels)] = labels
+    quads = padded.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+
+def unpack_labels(packed: np.ndarray, count: int) -> np.ndarray:
+    """Unpack count 2-bit labels produced by pack_labels."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    quads = np.stack([(packed >> shift) & 0b11 for shift in (0, 2, 4, 6)], axis=1)
+    return quads.reshape(-1)[:count]
+
+
+# magic, version, flags, point_count
+TILE_HEADER = struct.Struct("<4sHHI")
+TILE_MAGIC = b"SDFT"
+TILE_VERSION = 1
+TILE_HAS_NORMALS = 1
+TILE_HAS_LABELS = 2
+TILE_QUANTIZED_POSITIONS = 4
+# bounds_low xyz, bounds_high xyz of 16-bit quantized positions
+TILE_QUANT_BOUNDS = struct.Struct("<6d")
+QUANT_MAX = 65535
+
+
+def quantize_positions(positions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Quantize positions to uint16 steps across their own bounding box.
+
+    Returns:
+        (quantized, low, high); positions are recovered as
+        low + quantized * (high - low) / 65535
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if len(positions) == 0:
+        return np.empty((0, 3), dtype=np.uint16), np.zeros(3), np.zeros(3)
+
+    low = positions.min(axis=0)
+    high = positions.max(axis=0)
+    extent = high - low
+    # Flat axes quantize to 0 and decode to low exactly
+    scale = np.divide(QUANT_MAX, extent, out=np.zeros(3), where=extent > 0)
+    quantized = np.rint((positions - low) * scale).astype(np.uint16)
+    return quantized, low, high
+
+
+def dequantize_positions(quantized: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Invert quantize_positions to (N, 3) float32 positions."""
+    step = (np.asarray(high, dtype=np.float64) - low) / QUANT_MAX
+    return (low + quantized * step).astype(np.float32)
+
+
+def encode_tile_binary(
+    positions: np.ndarray,
+    normals_oct: np.ndarray | None = None,
+    labels: np.ndarray | None = None,
+    quantize: bool = False,
+) -> bytes:
+    """Encode a tile as a 12-byte header followed by its raw arrays.
+
+    Layout (little-endian), for point_count points:
+        header: TILE_HEADER (12 bytes); flags bit 0 = normals, bit 1 = labels,
+            bit 2 = quantized positions
+        if quantized: TILE_QUANT_BOUNDS (48 bytes) then
+            positions: uint16[point_count * 3] (see quantize_positions)
+        else positions: float32[point_count * 3]
+        normals: int8[point_count * 2] octahedral, if present
+        labels: uint8[ceil(point_count / 4)] 2-bit packed, if present
+
+    Quantized positions halve the position bytes; the error is at most half
+    a step, 1/131070 of the tile's extent on each axis.
+    """
+    flags = 0
+    if quantize:
+        flags |= TILE_QUANTIZED_POSITIONS
+        quantized, low, high = quantize_positions(positions)
+        parts = [TILE_QUANT_BOUNDS.pack(*low, *high), quantized.astype("<u2").tobytes()]
+        count = len(quantized)
+    else:
+        positions = np.ascontiguousarray(positions, dtype="<f4")
+        parts = [positions.tobytes()]
+        count = len(positions)
+    if normals_oct is not None:
+        flags |= TILE_HAS_NORMALS
+        parts.append(np.ascontiguousarray(normals_oct, dtype=np.int8).tobytes())
+    if labels is not None:
+        flags |= TILE_HAS_LABELS
+        parts.append(pack_labels(labels).tobytes())
+
+    header = TILE_HEADER.pack(TILE_MAGIC, TILE_VERSION, flags, count)
+    return header + b"".join(parts)
+
+
+def decode_tile_binary(buf: bytes) -> dict[str, np.ndarray | None]:
+    """Decode encode_tile_binary output into positions, normals_oct and labels arrays.
+
+    Quantized positions are returned dequantized to float32.
+    """
+    magic, version, flags, count = TILE_HEADER.unpack_from(buf)
+    if magic != TILE_MAGIC or version != TILE_VERSION:
+        raise ValueError("Not a binary tile buffer")
+
+    offset = TILE_HEADER.size
+    if flags & TILE_QUANTIZED_POSITIONS:
+        bounds = TILE_QUANT_BOUNDS.unpack_from(buf, offset)
+        offset += TILE_QUANT_BOUNDS.size
+        quantized = np.frombuffer(buf, dtype="<u2", count=count * 3, offset=offset)
+        offset += quantized.nbytes
+        positions = dequantize_positions(
+            quantized.reshape(-1, 3), np.array(bounds[:3]), np.array(bounds[3:])
+        )
+    else:
+        positions = np.frombuffer(buf, dtype="<f4", count=count * 3, offset=offset)
+        positions = positions.reshape(-1, 3)
+        offset += positions.nbytes
+
+    normals_oct = None
+    if flags & TILE_HAS_NORMALS:
+        normals_oct = np.frombuffer(buf, dtype=np.int8, count=count * 2, offset=offset)
+        normals_oct = normals_oct.reshape(-1, 2)
+        offset += normals_oct.nbytes
+
+    labels = None
+    if flags & TILE_HAS_LABELS:
+        packed = np.frombuffer(buf, dtype=np.uint8, count=-(-count // 4), offset=offset)
+        labels = unpack_labels(packed, count)
+
+    return {"positions": positions, "normals_oct": normals_oct, "labels": labels}
+
+
+# magic, version, reserved, max_depth, node_count, bounds_low xyz, bounds_high xyz
+HIERARCHY_HEADER = struct.Struct("<4sHHII6d")
+HIERARCHY_MAGIC = b"SDFO"
+HIERARCHY_VERSION = 1
+
+
+def encode_octree_hierarchy(metadata: OctreeMetadata) -> bytes:
+    """Encode an octree as a 64-byte header plus breadth-first node arrays.
+
+    Node IDs and bounds are implicit: the root spans the header bounds and
+    every child is the octant of its parent selected by its index (bit 0 =
+    +x half, bit 1 = +y, bit 2 = +z), matching the "r" + octant-digit IDs.
+
+    Layout (little-endian), for node_count nodes in breadth-first order with
+    children visited in octant order:
+        header: HIERARCHY_HEADER (64 bytes)
+        child_masks: uint8[node_count], bit i set if child octant i exists
+        point_counts: uint32[node_count]
+    """
+    masks = []
+    counts = []
+    queue = deque([metadata.root_id])
+    while queue:
+        node = metadata.nodes[queue.popleft()]
+        children = sorted(node.children)
+        mask = 0
+        for child_id in children:
+            mask |= 1 << int(child_id[-1])
+        masks.append(mask)
+        counts.append(node.point_count)
+        queue.extend(children)
+
+    header = HIERARCHY_HEADER.pack(
+        HIERARCHY_MAGIC,
+        HIERARCHY_VERSION,
+        0,
+        metadata.max_depth,
+        len(masks),
+        *metadata.bounds_low,
+        *metadata.bounds_high,
+    )
+    return (
+        header
+        + np.asarray(masks, dtype=np.uint8).tobytes()
+        + np.asarray(counts, dtype="<u4").tobytes()
+    )
+
+
+def decode_octree_hierarchy(buf: bytes) -> dict[str, dict]:
+    """Decode encode_octree_hierarchy output into {node_id: {level, point_count, children}}."""
+    magic, version, _, _, node_count, *_ = HIERARCHY_HEADER.unpack_from(buf)
+    if magic != HIERARCHY_MAGIC or version != HIERARCHY_VERSION:
+        raise ValueError("Not an octree hierarchy buffer")
+
+    offset = HIERARCHY_HEADER.size
+    masks = np.frombuffer(buf, dtype=np.uint8, count=node_count, offset=offset)
+    counts = np.frombuffer(buf, dtype="<u4", count=node_count, offset=offset + node_count)
+
+    nodes: dict[str, dict] = {}
+    ids = deque(["r"])
+    for mask, count in zip(masks.tolist(), counts.tolist(), strict=True):
+        node_id = ids.popleft()
+        children = [f"{node_id}{octant}" for octant in range(8) if mask & (1 << octant)]
+        nodes[node_id] = {
+            "level": len(node_id) - 1,
+            "point_count": count,
+            "children": children,
+        }
+        ids.extend(children)
+    return nodes
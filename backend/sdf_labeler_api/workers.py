@@ -0,0 +1,63 @@
+# ABOUTME: Entry points for CPU-bound jobs the API runs in its worker process pool
+# ABOUTME: Plain module-level functions, so submitting a job pickles only its arguments
+
+from pathlib import Path
+
+from sdf_labeler_api.config import settings
+from sdf_labeler_api.models.point_cloud import PointCloudUploadResponse
+from sdf_labeler_api.models.samples import (
+    SampleGenerationRequest,
+    SamplePreview,
+    TrainingSampleSet,
+)
+
+
+def _use_data_dir(data_dir: Path) -> None:
+    """Point this process's settings at the data directory the API is serving.
+
+    Worker processes only ever run jobs for one app, and services read
+    settings.data_dir lazily, so adopting the parent's directory keeps them
+    in agreement. In the API process itself this is a no-op.
+    """
+    if settings.data_dir != data_dir:
+        settings.data_dir = data_dir
+
+
+def process_upload(
+    data_dir: Path,
+    project_id: str,
+    path: Path,
+    filename: str,
+    estimate_normals: bool = True,
+    normal_k: int = 16,
+) -> PointCloudUploadResponse:
+    """Parse, estimate normals for, and store an uploaded point cloud file."""
+    from sdf_labeler_api.services.pointcloud_service import PointCloudService
+
+    _use_data_dir(data_dir)
+    return PointCloudService(settings).process_file(
+        project_id, path, filename, estimate_normals, normal_k
+    )
+
+
+def preview_samples(
+    data_dir: Path, project_id: str, request: SampleGenerationRequest
+) -> SamplePreview:
+    """Preview the sample distribution generation would produce."""
+    from sdf_labeler_api.services.sampling_service import SamplingService
+
+    _use_data_dir(data_dir)
+    return SamplingService().preview(project_id, request)
+
+
+def generate_samples(
+    data_dir: Path,
+    project_id: str,
+    request: SampleGenerationRequest,
+    include_samples: bool = False,
+) -> TrainingSampleSet:
+    """Generate and save training samples from a project's constraints."""
+    from sdf_labeler_api.services.sampling_service import SamplingService
+
+    _use_data_dir(data_dir)
+    return SamplingService().generate(project_id, request, include_samples=include_samples)
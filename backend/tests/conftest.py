@@ -1,6 +1,7 @@
 # ABOUTME: Pytest fixtures for SDF Labeler API tests
 # ABOUTME: Provides test clients, temporary directories, and sample data
 
+import shutil
 import tempfile
 from pathlib import Path
 from typing import Generator
@@ -22,7 +23,9 @@ from sdf_labeler_api.models.constraints import (
     SphereConstraint,
 )
 from sdf_labeler_api.models.project import ProjectCreate
+from sdf_labeler_api.services import point_store
 from sdf_labeler_api.services.constraint_service import ConstraintService
+from sdf_labeler_api.services.pointcloud_service import PointCloudService
 from sdf_labeler_api.services.project_service import ProjectService
 
 
@@ -60,9 +63,9 @@ def sample_project(project_service: ProjectService):
     return project_service.create(request)
 
 
-@pytest.fixture
-def sample_pointcloud(temp_data_dir: Path, sample_project) -> tuple[np.ndarray, np.ndarray]:
-    """Create a sample point cloud for testing."""
+@pytest.fixture(scope="session")
+def shared_pointcloud_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Generate the sample point cloud once per session as .npy files."""
     # Generate a simple cube point cloud
     n_points = 1000
     rng = np.random.default_rng(42)
@@ -72,14 +75,28 @@ def sample_pointcloud(temp_data_dir: Path, sample_project) -> tuple[np.ndarray,
 
     # Random normals (normalized)
     normals = rng.standard_normal((n_points, 3)).astype(np.float32)
-    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    normals *= (np.float32(1.0) / np.sqrt(np.einsum("ij,ij->i", normals, normals)))[:, None]
+
+    pc_dir = tmp_path_factory.mktemp("shared", numbered=False)
+    point_store.save_points(pc_dir, xyz, normals)
+    return pc_dir
+
 
-    # Save to project directory
+@pytest.fixture
+def sample_pointcloud(
+    temp_data_dir: Path, sample_project, shared_pointcloud_dir: Path
+) -> tuple[np.ndarray, np.ndarray]:
+    """Create a sample point cloud for testing.
+
+    The arrays are memory-mapped read-only from the session's shared copy.
+    """
+    # Copy rather than link, so a test overwriting its point cloud leaves the shared one intact
     pc_dir = temp_data_dir / "projects" / sample_project.id / "pointcloud"
     pc_dir.mkdir(parents=True, exist_ok=True)
-    np.savez(pc_dir / "points.npz", xyz=xyz, normals=normals)
+    for name in (point_store.XYZ_NAME, point_store.NORMALS_NAME):
+        shutil.copyfile(shared_pointcloud_dir / name, pc_dir / name)
 
-    return xyz, normals
+    return point_store.load_points(shared_pointcloud_dir)
 
 
 @pytest.fixture
@@ -89,6 +106,7 @@ def client(temp_data_dir: Path) -> TestClient:
     import sdf_labeler_api.app as app_module
 
     app_module.project_service = ProjectService(temp_data_dir)
+    app_module.pointcloud_service = PointCloudService(settings)
 
     return TestClient(app)
 
@@ -1,8 +1,11 @@
 # ABOUTME: API integration tests for SDF Labeler
 # ABOUTME: Tests all REST endpoints end-to-end
 
+import base64
 import io
 import json
+import os
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 import numpy as np
@@ -10,6 +13,7 @@ import pytest
 from fastapi.testclient import TestClient
 
 from sdf_labeler_api.config import settings
+from sdf_labeler_api.services.tile_codec import decode_tile_binary
 
 
 class TestHealthEndpoint:
@@ -150,6 +154,277 @@ class TestProjectEndpoints:
         assert response.status_code == 404
 
 
+class TestORJSONResponse:
+    """Tests for the orjson-backed response class."""
+
+    def test_renders_numpy_arrays(self):
+        """Test numpy arrays serialize as JSON number lists."""
+        from sdf_labeler_api.app import ORJSONResponse
+
+        response = ORJSONResponse({"positions": np.arange(6, dtype=np.float64) / 2})
+
+        assert response.headers["content-type"] == "application/json"
+        assert json.loads(response.body) == {"positions": [0.0, 0.5, 1.0, 1.5, 2.0, 2.5]}
+
+
+class TestPointCloudEndpoints:
+    """Tests for point cloud upload endpoints."""
+
+    @pytest.fixture
+    def project_id(self, client: TestClient) -> str:
+        """Create a project and return its ID."""
+        response = client.post("/v1/projects", json={"name": "Upload Test"})
+        return response.json()["id"]
+
+    def test_upload_csv(self, client: TestClient, project_id: str, temp_data_dir: Path):
+        """Test uploading a CSV point cloud."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+
+        response = client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["point_count"] == 4
+        assert data["format"] == "csv"
+
+        # Streamed temp file is removed after processing
+        assert not list(temp_data_dir.glob("tmp*"))
+
+    def test_upload_too_large(
+        self,
+        client: TestClient,
+        project_id: str,
+        temp_data_dir: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that uploads over the size limit are rejected with 413."""
+        monkeypatch.setattr(settings, "max_upload_size_mb", 0)
+
+        response = client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            files={"file": ("points.csv", b"x,y,z\n0,0,0", "text/csv")},
+        )
+
+        assert response.status_code == 413
+        assert not list(temp_data_dir.glob("tmp*"))
+
+    def test_upload_runs_in_process_pool(self, client: TestClient, project_id: str):
+        """Test upload processing through the lifespan-managed process pool."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+
+        with client:
+            assert client.app.state.pool is not None
+            response = client.post(
+                f"/v1/projects/{project_id}/pointcloud",
+                params={"normal_k": 3},
+                files={"file": ("points.csv", csv_content, "text/csv")},
+            )
+
+        assert response.status_code == 200
+        assert response.json()["has_normals"] is True
+
+    def test_thread_limiter_sized_by_lifespan(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test the lifespan bounds the default threadpool to worker_threads."""
+        from anyio import to_thread
+
+        monkeypatch.setattr(settings, "worker_threads", 3)
+
+        with client:
+            tokens = client.portal.call(
+                lambda: to_thread.current_default_thread_limiter().total_tokens
+            )
+
+        assert tokens == 3
+
+    def test_stats_and_tile_after_upload(self, client: TestClient, project_id: str):
+        """Test stats and root tile are served after an upload."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+
+        stats = client.get(f"/v1/projects/{project_id}/pointcloud")
+        assert stats.status_code == 200
+        assert stats.json()["point_count"] == 4
+
+        tile = client.get(f"/v1/projects/{project_id}/pointcloud/tiles/0/0/0/0")
+        assert tile.status_code == 200
+        assert tile.json()["point_count"] == 4
+
+    def test_tile_etag_revalidation(self, client: TestClient, project_id: str):
+        """Test tiles return an ETag and 304 when revalidated with it."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+        url = f"/v1/projects/{project_id}/pointcloud/tiles/0/0/0/0"
+
+        first = client.get(url)
+        etag = first.headers["etag"]
+        revalidated = client.get(url, headers={"If-None-Match": etag})
+        stale = client.get(url, headers={"If-None-Match": '"other"'})
+
+        assert first.headers["cache-control"] == "no-cache"
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert stale.status_code == 200
+        assert stale.json() == first.json()
+
+    def test_tile_base64_encoding(self, client: TestClient, project_id: str):
+        """Test requesting a tile with base64 binary arrays."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+        url = f"/v1/projects/{project_id}/pointcloud/tiles/0/0/0/0"
+
+        encoded = client.get(url, params={"encoding": "base64"})
+        plain = client.get(url)
+
+        assert encoded.status_code == 200
+        assert encoded.headers["etag"] != plain.headers["etag"]
+        positions = np.frombuffer(base64.b64decode(encoded.json()["positions"]), dtype="<f4")
+        np.testing.assert_allclose(positions, plain.json()["positions"])
+
+    def test_tile_binary_encoding(self, client: TestClient, project_id: str):
+        """Test requesting a tile as a raw binary frame."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+        url = f"/v1/projects/{project_id}/pointcloud/tiles/0/0/0/0"
+
+        binary = client.get(url, params={"encoding": "binary"})
+        plain = client.get(url)
+
+        assert binary.status_code == 200
+        assert binary.headers["content-type"] == "application/octet-stream"
+        decoded = decode_tile_binary(binary.content)
+        np.testing.assert_allclose(decoded["positions"].ravel(), plain.json()["positions"])
+        assert decoded["normals_oct"].shape == (4, 2)
+
+        quantized = client.get(url, params={"encoding": "binary16"})
+        positions = decode_tile_binary(quantized.content)["positions"]
+        assert len(quantized.content) == 12 + 48 + 4 * (6 + 2)
+        np.testing.assert_allclose(positions.ravel(), plain.json()["positions"], atol=1e-4)
+
+    def test_tile_unknown_encoding(self, client: TestClient, project_id: str):
+        """Test an unsupported tile encoding is rejected."""
+        response = client.get(
+            f"/v1/projects/{project_id}/pointcloud/tiles/0/0/0/0",
+            params={"encoding": "draco"},
+        )
+        assert response.status_code == 422
+
+    def test_metadata_after_upload(self, client: TestClient, project_id: str):
+        """Test octree metadata is served after an upload."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+
+        response = client.get(f"/v1/projects/{project_id}/pointcloud/metadata")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_points"] == 4
+        assert data["nodes"]["r"]["point_count"] == 4
+
+    def test_metadata_binary_format(self, client: TestClient, project_id: str):
+        """Test the binary hierarchy matches the JSON metadata."""
+        from sdf_labeler_api.services.tile_codec import decode_octree_hierarchy
+
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+        url = f"/v1/projects/{project_id}/pointcloud/metadata"
+
+        binary = client.get(url, params={"format": "binary"})
+        nodes = client.get(url).json()["nodes"]
+
+        assert binary.headers["content-type"] == "application/octet-stream"
+        decoded = decode_octree_hierarchy(binary.content)
+        assert {k: v["point_count"] for k, v in decoded.items()} == {
+            k: v["point_count"] for k, v in nodes.items()
+        }
+
+    def test_metadata_binary_written_for_legacy_pointcloud(
+        self, client: TestClient, project_id: str, temp_data_dir: Path
+    ):
+        """Test point clouds without octree.bits get it generated on request."""
+        csv_content = b"x,y,z\n0,0,0\n1,0,0\n0,1,0\n0,0,1"
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            params={"normal_k": 3},
+            files={"file": ("points.csv", csv_content, "text/csv")},
+        )
+        bits_path = temp_data_dir / "projects" / project_id / "pointcloud" / "octree.bits"
+        bits_path.unlink()
+
+        response = client.get(
+            f"/v1/projects/{project_id}/pointcloud/metadata", params={"format": "binary"}
+        )
+
+        assert response.status_code == 200
+        assert bits_path.exists()
+
+    def test_tile_gzipped(self, client: TestClient, project_id: str):
+        """Test large JSON tiles are gzip-compressed for clients that accept it."""
+        rng = np.random.default_rng(0)
+        rows = "\n".join(f"{x:.6f},{y:.6f},{z:.6f}" for x, y, z in rng.random((500, 3)))
+        client.post(
+            f"/v1/projects/{project_id}/pointcloud",
+            files={"file": ("points.csv", f"x,y,z\n{rows}".encode(), "text/csv")},
+        )
+
+        response = client.get(
+            f"/v1/projects/{project_id}/pointcloud/tiles/0/0/0/0",
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["positions"]) > 0
+
+    def test_stats_without_pointcloud(self, client: TestClient, project_id: str):
+        """Test stats for a project with no point cloud."""
+        response = client.get(f"/v1/projects/{project_id}/pointcloud")
+        assert response.status_code == 404
+
+    def test_stats_project_not_found(self, client: TestClient):
+        """Test stats for a non-existent project."""
+        response = client.get("/v1/projects/non-existent/pointcloud")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project not found"
+
+    def test_upload_project_not_found(self, client: TestClient):
+        """Test uploading to a non-existent project."""
+        response = client.post(
+            "/v1/projects/non-existent/pointcloud",
+            files={"file": ("points.csv", b"x,y,z\n0,0,0", "text/csv")},
+        )
+        assert response.status_code == 404
+
+
 class TestConstraintEndpoints:
     """Tests for constraint management endpoints."""
 
@@ -178,6 +453,35 @@ class TestConstraintEndpoints:
         assert data["sign"] == "solid"
         assert data["center"] == [0.5, 0.5, 0.5]
 
+    def test_add_constraints_batch(self, client: TestClient, project_id: str):
+        """Test adding several constraints in one request."""
+        response = client.post(
+            f"/v1/projects/{project_id}/constraints:batch",
+            json=[
+                {"type": "sphere", "sign": "empty", "center": [0, 0, 0], "radius": 0.2},
+                {"type": "halfspace", "sign": "solid", "point": [0, 0, 0], "normal": [0, 0, 1]},
+            ],
+        )
+
+        assert response.status_code == 200
+        assert [c["type"] for c in response.json()] == ["sphere", "halfspace"]
+        listed = client.get(f"/v1/projects/{project_id}/constraints").json()
+        assert listed["total"] == 2
+
+    def test_add_constraints_batch_invalid(self, client: TestClient, project_id: str):
+        """Test an invalid item rejects the batch without storing anything."""
+        response = client.post(
+            f"/v1/projects/{project_id}/constraints:batch",
+            json=[
+                {"type": "sphere", "sign": "empty", "center": [0, 0, 0], "radius": 0.2},
+                {"type": "sphere", "sign": "empty"},
+            ],
+        )
+
+        assert response.status_code == 422
+        listed = client.get(f"/v1/projects/{project_id}/constraints").json()
+        assert listed["total"] == 0
+
     def test_add_sphere_constraint(self, client: TestClient, project_id: str):
         """Test adding a sphere constraint."""
         response = client.post(
@@ -400,6 +704,67 @@ class TestSampleEndpoints:
         data = response.json()
         assert data["sample_count"] > 0
         assert "source_breakdown" in data
+        assert data["samples"] == []
+
+    def test_generate_samples_include_samples(
+        self, client: TestClient, project_with_pointcloud: str
+    ):
+        """Test the generated samples are returned when requested."""
+        client.post(
+            f"/v1/projects/{project_with_pointcloud}/constraints",
+            json={
+                "type": "box",
+                "sign": "solid",
+                "center": [0.5, 0.5, 0.5],
+                "half_extents": [0.1, 0.1, 0.1],
+            },
+        )
+
+        response = client.post(
+            f"/v1/projects/{project_with_pointcloud}/samples/generate",
+            params={"include_samples": True},
+            json={"total_samples": 1000},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["samples"]) == data["sample_count"] > 0
+
+    def test_generate_samples_in_worker_pool(
+        self,
+        client: TestClient,
+        project_with_pointcloud: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test generation runs in the lifespan pool and survives a worker dying."""
+        monkeypatch.setattr(settings, "worker_processes", 1)
+        client.post(
+            f"/v1/projects/{project_with_pointcloud}/constraints",
+            json={
+                "type": "box",
+                "sign": "solid",
+                "center": [0.5, 0.5, 0.5],
+                "half_extents": [0.1, 0.1, 0.1],
+            },
+        )
+        url = f"/v1/projects/{project_with_pointcloud}/samples/generate"
+
+        with client:
+            response = client.post(url, json={"total_samples": 1000})
+            assert response.status_code == 200
+            assert response.json()["sample_count"] > 0
+
+            # Killing a worker breaks the pool; the next request rebuilds it
+            broken_pool = client.app.state.pool
+            with pytest.raises(BrokenProcessPool):
+                broken_pool.submit(os._exit, 1).result()
+
+            response = client.post(url, json={"total_samples": 1000})
+            assert response.status_code == 200
+            assert response.json()["sample_count"] > 0
+            assert client.app.state.pool is not broken_pool
+
+        assert client.app.state.pool is None
 
     def test_generate_samples_project_not_found(self, client: TestClient):
         """Test generating samples for non-existent project."""
@@ -459,6 +824,27 @@ class TestExportEndpoints:
         assert response.status_code == 200
         assert "application/octet-stream" in response.headers["content-type"]
 
+    def test_export_parquet_content(self, client: TestClient, project_with_samples: str):
+        """Test the exported bytes are the generated samples Parquet file."""
+        import pyarrow.parquet as pq
+
+        response = client.get(f"/v1/projects/{project_with_samples}/export/parquet")
+
+        samples_path = settings.data_dir / "projects" / project_with_samples / "samples.parquet"
+        assert response.content == samples_path.read_bytes()
+        table = pq.read_table(io.BytesIO(response.content))
+        assert {"x", "y", "z", "phi"} <= set(table.column_names)
+        assert "attachment" in response.headers["content-disposition"]
+
+    def test_export_parquet_not_gzipped(self, client: TestClient, project_with_samples: str):
+        """Test already-compressed Parquet bytes bypass the gzip middleware."""
+        response = client.get(
+            f"/v1/projects/{project_with_samples}/export/parquet",
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        assert "content-encoding" not in response.headers
+
     def test_export_parquet_no_samples(self, client: TestClient):
         """Test export when no samples exist."""
         # Create project without samples
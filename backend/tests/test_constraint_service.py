@@ -1,10 +1,17 @@
 # ABOUTME: Unit tests for ConstraintService
 # ABOUTME: Tests CRUD operations for geometric constraints
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pytest
+from pydantic import ValidationError
 
+from sdf_labeler_api.config import settings
 from sdf_labeler_api.models.constraints import (
     BoxConstraint,
+    BrushStrokeConstraint,
     ConstraintSet,
     SignConvention,
     SphereConstraint,
@@ -41,6 +48,73 @@ class TestConstraintServiceCRUD:
         assert result.type == "sphere"
         assert result.radius == 0.2
 
+    def test_add_raw_payload(self, constraint_service: ConstraintService, sample_project):
+        """Test adding a raw dict dispatches on its type discriminator."""
+        result = constraint_service.add(
+            sample_project.id,
+            {"type": "sphere", "sign": "empty", "center": [0.0, 0.0, 0.0], "radius": 0.5},
+        )
+
+        assert isinstance(result, SphereConstraint)
+        assert constraint_service.get(sample_project.id, result.id).radius == 0.5
+
+    def test_add_raw_payload_invalid(self, constraint_service: ConstraintService, sample_project):
+        """Test invalid raw payloads are rejected and nothing is stored."""
+        with pytest.raises(ValidationError):
+            constraint_service.add(sample_project.id, {"type": "sphere", "sign": "empty"})
+
+        assert constraint_service.list_all(sample_project.id).total == 0
+
+    def test_add_many(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint: BoxConstraint,
+    ):
+        """Test add_many appends models and raw payloads in order."""
+        added = constraint_service.add_many(
+            sample_project.id,
+            [
+                sample_box_constraint,
+                {"type": "sphere", "sign": "empty", "center": [0.0, 0.0, 0.0], "radius": 0.5},
+            ],
+        )
+
+        stored = constraint_service.list_all(sample_project.id).constraints
+        assert [c.id for c in stored] == [c.id for c in added]
+        assert isinstance(stored[1], SphereConstraint)
+
+    def test_add_many_invalid_writes_nothing(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint: BoxConstraint,
+    ):
+        """Test one invalid payload rejects the whole batch."""
+        with pytest.raises(ValidationError):
+            constraint_service.add_many(
+                sample_project.id, [sample_box_constraint, {"type": "sphere"}]
+            )
+
+        assert constraint_service.list_all(sample_project.id).total == 0
+
+    def test_total_tracks_deletes(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint,
+        sample_sphere_constraint,
+    ):
+        """Test total reflects the current constraints after a delete."""
+        constraint_service.add(sample_project.id, sample_box_constraint)
+        constraint_service.add(sample_project.id, sample_sphere_constraint)
+        constraint_service.delete(sample_project.id, sample_box_constraint.id)
+
+        result = constraint_service.list_all(sample_project.id)
+
+        assert result.total == 1
+        assert result.model_dump()["total"] == 1
+
     def test_add_all_constraint_types(
         self,
         constraint_service: ConstraintService,
@@ -229,10 +303,196 @@ class TestConstraintServicePersistence:
         constraint_service.add(sample_project.id, sample_box_constraint)
 
         constraints_path = (
-            temp_data_dir / "projects" / sample_project.id / "constraints.json"
+            temp_data_dir / "projects" / sample_project.id / "constraints.ndjson"
         )
         assert constraints_path.exists()
 
+    def test_add_appends_one_line(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint,
+        sample_sphere_constraint,
+        temp_data_dir,
+    ):
+        """Test adding appends a line and leaves earlier lines untouched."""
+        path = temp_data_dir / "projects" / sample_project.id / "constraints.ndjson"
+        constraint_service.add(sample_project.id, sample_box_constraint)
+        first = path.read_bytes()
+
+        constraint_service.add(sample_project.id, sample_sphere_constraint)
+
+        content = path.read_bytes()
+        assert content.startswith(first)
+        assert content.count(b"\n") == 2
+
+    def test_legacy_json_converted_on_write(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint,
+        sample_sphere_constraint,
+        temp_data_dir,
+    ):
+        """Test a constraints.json document is read, then replaced by NDJSON."""
+        project_dir = temp_data_dir / "projects" / sample_project.id
+        legacy = ConstraintSet(constraints=[sample_box_constraint])
+        (project_dir / "constraints.json").write_text(legacy.model_dump_json(indent=2))
+
+        assert constraint_service.list_all(sample_project.id).total == 1
+
+        constraint_service.add(sample_project.id, sample_sphere_constraint)
+
+        assert not (project_dir / "constraints.json").exists()
+        result = ConstraintService().list_all(sample_project.id)
+        assert [c.id for c in result.constraints] == [
+            sample_box_constraint.id,
+            sample_sphere_constraint.id,
+        ]
+
+
+class TestConstraintServiceCache:
+    """Tests for the mtime-validated constraint cache."""
+
+    def test_unchanged_file_is_not_reparsed(
+        self, constraint_service: ConstraintService, sample_project, sample_box_constraint
+    ):
+        """Test repeated reads reuse the cached set."""
+        constraint_service.add(sample_project.id, sample_box_constraint)
+
+        first = constraint_service.list_all(sample_project.id)
+
+        assert constraint_service.list_all(sample_project.id) is first
+
+    def test_external_write_invalidates(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint,
+        sample_sphere_constraint,
+    ):
+        """Test a write by another service instance is picked up."""
+        constraint_service.add(sample_project.id, sample_box_constraint)
+        constraint_service.list_all(sample_project.id)
+
+        other = ConstraintService()
+        other.add(sample_project.id, sample_sphere_constraint)
+        path = other._constraints_path(sample_project.id, settings.data_dir)
+        # Guarantee a distinct mtime on filesystems with coarse timestamps
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        result = constraint_service.list_all(sample_project.id)
+
+        assert [c.id for c in result.constraints] == [
+            sample_box_constraint.id,
+            sample_sphere_constraint.id,
+        ]
+        assert constraint_service.get(sample_project.id, sample_sphere_constraint.id)
+
+    def test_same_mtime_external_append_invalidates(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint,
+        sample_sphere_constraint,
+    ):
+        """Test an append landing in the same mtime tick is still picked up."""
+        constraint_service.add(sample_project.id, sample_box_constraint)
+        constraint_service.list_all(sample_project.id)
+        path = constraint_service._constraints_path(sample_project.id, settings.data_dir)
+        before = path.stat()
+
+        other = ConstraintService()
+        other.add(sample_project.id, sample_sphere_constraint)
+        # Simulate a coarse timestamp: the append leaves mtime unchanged
+        os.utime(path, ns=(before.st_atime_ns, before.st_mtime_ns))
+
+        result = constraint_service.list_all(sample_project.id)
+
+        assert [c.id for c in result.constraints] == [
+            sample_box_constraint.id,
+            sample_sphere_constraint.id,
+        ]
+
+    def test_returned_sets_are_not_mutated(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint,
+        sample_sphere_constraint,
+    ):
+        """Test later writes do not change a previously returned set."""
+        constraint_service.add(sample_project.id, sample_box_constraint)
+        before = constraint_service.list_all(sample_project.id)
+
+        constraint_service.add(sample_project.id, sample_sphere_constraint)
+        constraint_service.delete(sample_project.id, sample_box_constraint.id)
+
+        assert [c.id for c in before.constraints] == [sample_box_constraint.id]
+        assert constraint_service.get(sample_project.id, sample_box_constraint.id) is None
+
+    def test_rewrites_reuse_encoded_lines(
+        self,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_box_constraint,
+        sample_sphere_constraint,
+    ):
+        """Test update and delete persist correctly while reusing untouched lines."""
+        constraint_service.add(sample_project.id, sample_box_constraint)
+        constraint_service.add(sample_project.id, sample_sphere_constraint)
+        path = constraint_service._constraints_path(sample_project.id, settings.data_dir)
+        sphere_line = path.read_bytes().splitlines()[1]
+
+        moved = sample_box_constraint.model_copy(update={"center": (1.0, 2.0, 3.0)})
+        constraint_service.update(sample_project.id, moved)
+
+        assert path.read_bytes().splitlines()[1] == sphere_line
+        fresh = ConstraintService()
+        assert fresh.get(sample_project.id, moved.id).center == (1.0, 2.0, 3.0)
+
+        constraint_service.delete(sample_project.id, moved.id)
+
+        assert path.read_bytes() == sphere_line + b"\n"
+        assert ConstraintService().list_all(sample_project.id).total == 1
+
+    def test_deleted_file_clears_cache(
+        self, constraint_service: ConstraintService, sample_project, sample_box_constraint
+    ):
+        """Test a removed constraints file reads as empty."""
+        constraint_service.add(sample_project.id, sample_box_constraint)
+        constraint_service._constraints_path(sample_project.id, settings.data_dir).unlink()
+
+        assert constraint_service.list_all(sample_project.id).total == 0
+        assert constraint_service.get(sample_project.id, sample_box_constraint.id) is None
+
+    def test_concurrent_writes_are_not_lost(
+        self, constraint_service: ConstraintService, sample_project
+    ):
+        """Test adds from many threads, then a delete, keep cache and file in agreement."""
+        n_threads, n_adds = 8, 25
+
+        def add_spheres(_: int) -> None:
+            for _ in range(n_adds):
+                constraint_service.add(
+                    sample_project.id,
+                    SphereConstraint(sign=SignConvention.EMPTY, center=(0, 0, 0), radius=0.1),
+                )
+
+        with ThreadPoolExecutor(n_threads) as pool:
+            list(pool.map(add_spheres, range(n_threads)))
+
+        added = constraint_service.list_all(sample_project.id)
+        assert added.total == n_threads * n_adds
+
+        constraint_service.delete(sample_project.id, added.constraints[0].id)
+
+        path = constraint_service._constraints_path(sample_project.id, settings.data_dir)
+        assert len(path.read_bytes().splitlines()) == n_threads * n_adds - 1
+        assert constraint_service.list_all(sample_project.id).total == n_threads * n_adds - 1
+        assert ConstraintService().list_all(sample_project.id).total == n_threads * n_adds - 1
+
 
 class TestConstraintTypes:
     """Tests for specific constraint types."""
@@ -252,6 +512,40 @@ class TestConstraintTypes:
         assert len(result.stroke_points) == 3
         assert result.radius == 0.05
 
+    def test_brush_stroke_points_are_array(self, sample_brush_stroke_constraint):
+        """Test stroke points are held as an (N, 3) array and dumped as nested lists."""
+        assert isinstance(sample_brush_stroke_constraint.stroke_points, np.ndarray)
+        assert sample_brush_stroke_constraint.stroke_points.shape == (3, 3)
+
+        dumped = sample_brush_stroke_constraint.model_dump(mode="json")
+        assert dumped["stroke_points"][1] == [0.1, 0.0, 0.0]
+
+    def test_brush_stroke_equality(self, sample_brush_stroke_constraint):
+        """Test constraints with stroke point arrays compare by value."""
+        same = BrushStrokeConstraint.model_validate(sample_brush_stroke_constraint.model_dump())
+        moved = same.model_copy(update={"stroke_points": same.stroke_points + 1.0})
+
+        assert same is not sample_brush_stroke_constraint
+        assert same == sample_brush_stroke_constraint
+        assert moved != sample_brush_stroke_constraint
+
+    def test_brush_stroke_rejects_bad_points(self):
+        """Test stroke points must be (x, y, z) triples."""
+        with pytest.raises(ValidationError):
+            BrushStrokeConstraint(
+                sign=SignConvention.SOLID, stroke_points=[(0.0, 0.0)], radius=0.1
+            )
+
+    def test_unknown_fields_rejected(self):
+        """Test constraints reject fields that do not belong to their type."""
+        with pytest.raises(ValidationError):
+            SphereConstraint(
+                sign=SignConvention.SOLID,
+                center=(0.0, 0.0, 0.0),
+                radius=0.1,
+                half_extents=(1.0, 1.0, 1.0),
+            )
+
     def test_seed_propagation_stores_results(
         self,
         constraint_service: ConstraintService,
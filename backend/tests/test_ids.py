@@ -0,0 +1,34 @@
+# ABOUTME: Unit tests for identifier generation
+# ABOUTME: Tests UUIDv7 layout and ordering
+
+import time
+import uuid
+
+from sdf_labeler_api.ids import new_id
+
+
+class TestUuid7:
+    """Tests for UUIDv7 generation."""
+
+    def test_version_and_variant(self):
+        """Test generated ids are RFC 9562 version 7 UUIDs."""
+        value = uuid.UUID(new_id())
+
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+    def test_embeds_current_time(self):
+        """Test the leading 48 bits are the Unix time in milliseconds."""
+        before = time.time_ns() // 1_000_000
+        value = uuid.UUID(new_id())
+        after = time.time_ns() // 1_000_000
+
+        # A full counter may borrow up to a few milliseconds ahead
+        assert before <= value.int >> 80 <= after + 5
+
+    def test_monotonic(self):
+        """Test ids generated in a burst sort in generation order."""
+        ids = [new_id() for _ in range(10000)]
+
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
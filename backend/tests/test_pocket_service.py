@@ -1,6 +1,8 @@
 # ABOUTME: Unit tests for PocketService
 # ABOUTME: Tests voxel grid construction, flood fill, and pocket detection
 
+import os
+import threading
 from pathlib import Path
 
 import numpy as np
@@ -188,6 +190,57 @@ class TestOccupancyGrid:
         assert occupied_with_dilation > occupied_no_dilation
 
 
+    def test_build_occupancy_grid_exact_voxels(self, pocket_service: PocketService):
+        """Each point should mark exactly its own voxel, with the max corner clamped."""
+        xyz = np.array([[0.0, 0.0, 0.0], [0.25, 0.75, 0.55], [1.0, 1.0, 1.0], [0.25, 0.75, 0.55]])
+        bounds_low = np.array([0.0, 0.0, 0.0])
+        bounds_high = np.array([1.0, 1.0, 1.0])
+
+        grid = pocket_service._build_occupancy_grid(
+            xyz, bounds_low, bounds_high, 0.1, dilation=0
+        )
+
+        occupied = {tuple(v) for v in np.argwhere(grid == VoxelState.OCCUPIED).tolist()}
+        assert occupied == {(0, 0, 0), (2, 7, 5), (9, 9, 9)}
+
+
+    def test_build_occupancy_grid_chunked(
+        self, pocket_service: PocketService, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Binning in parallel chunks should mark the same voxels as one pass."""
+        from sdf_labeler_api.services import pocket_service as pocket_module
+
+        rng = np.random.default_rng(3)
+        xyz = rng.uniform(0, 1, (5000, 3))
+        bounds_low, bounds_high = xyz.min(axis=0), xyz.max(axis=0)
+
+        single = pocket_service._build_occupancy_grid(
+            xyz, bounds_low, bounds_high, 0.05, dilation=0
+        )
+        monkeypatch.setattr(pocket_module, "VOXEL_BIN_CHUNK_SIZE", 256)
+        chunked = pocket_service._build_occupancy_grid(
+            xyz, bounds_low, bounds_high, 0.05, dilation=0
+        )
+
+        np.testing.assert_array_equal(chunked, single)
+
+    def test_build_occupancy_grid_reuses_binning_threads(
+        self, pocket_service: PocketService, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Chunked binning should run on one long-lived pool, not a pool per call."""
+        from sdf_labeler_api.services import pocket_service as pocket_module
+
+        xyz = np.random.default_rng(4).uniform(0, 1, (2000, 3))
+        bounds_low, bounds_high = xyz.min(axis=0), xyz.max(axis=0)
+        monkeypatch.setattr(pocket_module, "VOXEL_BIN_CHUNK_SIZE", 256)
+
+        for _ in range(3):
+            pocket_service._build_occupancy_grid(xyz, bounds_low, bounds_high, 0.05)
+
+        bin_threads = [t for t in threading.enumerate() if t.name.startswith("voxel-bin")]
+        assert 0 < len(bin_threads) <= (os.cpu_count() or 1)
+
+
 class TestFloodFill:
     """Tests for flood-fill outside marking."""
 
@@ -235,45 +288,88 @@ class TestFloodFill:
         assert result[2, 2, 2] == VoxelState.EMPTY
 
 
+    def test_split_empty_space_matches_flood_fill(self, pocket_service: PocketService):
+        """Single-pass labeling should match dilation flood fill plus pocket labeling."""
+        from scipy import ndimage
+
+        rng = np.random.default_rng(7)
+        grid = np.where(
+            rng.random((24, 20, 16)) < 0.45, VoxelState.OCCUPIED, VoxelState.EMPTY
+        ).astype(np.uint8)
+
+        # Reference: iterative dilation from the empty boundary voxels
+        struct = ndimage.generate_binary_structure(3, 1)
+        empty = grid == VoxelState.EMPTY
+        seed = empty.copy()
+        seed[1:-1, 1:-1, 1:-1] = False
+        outside = ndimage.binary_dilation(seed, mask=empty, iterations=-1, structure=struct)
+        expected_grid = grid.copy()
+        expected_grid[outside] = VoxelState.OUTSIDE
+        expected_labels, expected_count = ndimage.label(
+            expected_grid == VoxelState.EMPTY, structure=struct
+        )
+
+        result_grid, labels, count = pocket_service._split_empty_space(grid)
+
+        assert expected_count > 0
+        assert labels.dtype == np.min_scalar_type(expected_count)
+        np.testing.assert_array_equal(result_grid, expected_grid)
+        np.testing.assert_array_equal(labels, expected_labels)
+        assert count == expected_count
+
+
 class TestPocketLabeling:
     """Tests for pocket connected component labeling."""
 
     def test_label_pockets_single(self, pocket_service: PocketService):
         """Single enclosed region should get one label."""
-        grid = np.full((5, 5, 5), VoxelState.OUTSIDE, dtype=np.uint8)
+        grid = np.full((5, 5, 5), VoxelState.OCCUPIED, dtype=np.uint8)
         # Single pocket at center
         grid[2, 2, 2] = VoxelState.EMPTY
 
-        labeled, count = pocket_service._label_pockets(grid)
+        _, labeled, count = pocket_service._split_empty_space(grid)
 
         assert count == 1
         assert labeled[2, 2, 2] == 1
 
     def test_label_pockets_multiple(self, pocket_service: PocketService):
         """Multiple separated regions should get different labels."""
-        grid = np.full((7, 7, 7), VoxelState.OUTSIDE, dtype=np.uint8)
+        grid = np.full((7, 7, 7), VoxelState.OCCUPIED, dtype=np.uint8)
         # Two separate pockets
         grid[1, 1, 1] = VoxelState.EMPTY
         grid[5, 5, 5] = VoxelState.EMPTY
 
-        labeled, count = pocket_service._label_pockets(grid)
+        _, labeled, count = pocket_service._split_empty_space(grid)
 
         assert count == 2
         assert labeled[1, 1, 1] != labeled[5, 5, 5]
 
     def test_label_pockets_connected(self, pocket_service: PocketService):
         """Connected empty voxels should get same label."""
-        grid = np.full((7, 7, 7), VoxelState.OUTSIDE, dtype=np.uint8)
+        grid = np.full((7, 7, 7), VoxelState.OCCUPIED, dtype=np.uint8)
         # Connected pocket region
         grid[2:5, 2:5, 2:5] = VoxelState.EMPTY
 
-        labeled, count = pocket_service._label_pockets(grid)
+        _, labeled, count = pocket_service._split_empty_space(grid)
 
         assert count == 1
         # All empty voxels should have label 1
         assert labeled[2, 2, 2] == 1
         assert labeled[4, 4, 4] == 1
 
+    def test_label_pockets_skips_outside_air(self, pocket_service: PocketService):
+        """Empty space touching the grid boundary is not a pocket."""
+        grid = np.full((7, 7, 7), VoxelState.OCCUPIED, dtype=np.uint8)
+        grid[0:3, 3, 3] = VoxelState.EMPTY  # Open to the x=0 face
+        grid[5, 5, 5] = VoxelState.EMPTY
+
+        result, labeled, count = pocket_service._split_empty_space(grid)
+
+        assert count == 1
+        assert labeled[5, 5, 5] == 1
+        assert not labeled[0:3, 3, 3].any()
+        assert (result[0:3, 3, 3] == VoxelState.OUTSIDE).all()
+
 
 class TestPocketInfoExtraction:
     """Tests for extracting pocket metadata."""
@@ -286,7 +382,7 @@ class TestPocketInfoExtraction:
         voxel_size = 0.1
         bounds_low = np.array([0, 0, 0])
 
-        info = pocket_service._extract_pocket_info(labeled, 1, voxel_size, bounds_low)
+        [info] = pocket_service._extract_all_pocket_info(labeled, 1, voxel_size, bounds_low, 1)
 
         assert info.pocket_id == 1
         assert info.voxel_count == 27
@@ -297,6 +393,31 @@ class TestPocketInfoExtraction:
         # Bounds should cover the pocket
         assert info.bounds_low[0] == pytest.approx(0.2, rel=0.01)
         assert info.bounds_high[0] == pytest.approx(0.5, rel=0.01)
+        np.testing.assert_allclose(info.centroid, (0.35, 0.35, 0.35))
+
+    def test_extract_all_pocket_info_matches_voxel_scan(self, pocket_service: PocketService):
+        """Whole-grid extraction should agree with scanning each pocket's voxels."""
+        labeled = np.zeros((10, 10, 10), dtype=np.int32)
+        labeled[2:5, 2:5, 2:5] = 1
+        labeled[6:9, 1:3, 7:8] = 2
+        labeled[7, 2, 7] = 0
+        labeled[0, 9, 9] = 3  # Below the size threshold
+        bounds_low = np.array([-1.0, 0.5, 2.0])
+
+        pockets = pocket_service._extract_all_pocket_info(labeled, 3, 0.1, bounds_low, 2)
+
+        assert [p.pocket_id for p in pockets] == [1, 2]
+        for info in pockets:
+            voxels = np.argwhere(labeled == info.pocket_id)
+            assert info.voxel_count == len(voxels)
+            np.testing.assert_allclose(
+                info.centroid, (voxels.mean(axis=0) + 0.5) * 0.1 + bounds_low
+            )
+            np.testing.assert_allclose(info.bounds_low, voxels.min(axis=0) * 0.1 + bounds_low)
+            np.testing.assert_allclose(
+                info.bounds_high, (voxels.max(axis=0) + 1) * 0.1 + bounds_low
+            )
+            assert info.volume_estimate == pytest.approx(len(voxels) * 0.1**3)
 
 
 class TestAnalyzePockets:
@@ -510,3 +631,117 @@ class TestCacheManagement:
         assert voxels is not None
         assert voxels.shape[1] == 3  # (N, 3)
         assert len(voxels) == analysis.pockets[0].voxel_count
+
+    @pytest.mark.asyncio
+    async def test_grid_cache_memory_mappable(
+        self,
+        pocket_service: PocketService,
+        sample_project,
+        cube_shell_pointcloud: np.ndarray,
+    ):
+        """Label grid should be a narrow .npy opened memory-mapped."""
+        await pocket_service.analyze_pockets(sample_project.id, voxel_target=16, recompute=True)
+
+        labeled, voxel_size, bounds_low, _ = pocket_service._load_labeled_grid(sample_project.id)
+
+        assert isinstance(labeled, np.memmap)
+        assert labeled.dtype == np.uint8
+        assert voxel_size > 0
+        assert bounds_low.shape == (3,)
+
+    @pytest.mark.asyncio
+    async def test_reanalysis_replaces_mapped_label_grid(
+        self,
+        pocket_service: PocketService,
+        sample_project,
+        cube_shell_pointcloud: np.ndarray,
+    ):
+        """Re-analysis should swap in a new label file, leaving open mappings intact."""
+        await pocket_service.analyze_pockets(sample_project.id, voxel_target=16, recompute=True)
+        labeled, _, _, _ = pocket_service._load_labeled_grid(sample_project.id)
+        expected = np.array(labeled)
+        labeled_path = pocket_service._pockets_dir(sample_project.id) / "labeled.npy"
+        inode = labeled_path.stat().st_ino
+
+        await pocket_service.analyze_pockets(sample_project.id, voxel_target=16, recompute=True)
+
+        assert labeled_path.stat().st_ino != inode
+        np.testing.assert_array_equal(labeled, expected)
+
+    @pytest.mark.asyncio
+    async def test_get_pocket_voxels_uses_grid_sidecar(
+        self,
+        pocket_service: PocketService,
+        sample_project,
+        cube_shell_pointcloud: np.ndarray,
+    ):
+        """Pocket voxel boxes should come from grid.json, not the analysis document."""
+        analysis = await pocket_service.analyze_pockets(
+            sample_project.id, voxel_target=16, recompute=True
+        )
+        if len(analysis.pockets) == 0:
+            pytest.skip("No pockets found in test data")
+        pocket = analysis.pockets[0]
+        (pocket_service._pockets_dir(sample_project.id) / "analysis.json").unlink()
+
+        *_, pocket_boxes = pocket_service._load_labeled_grid(sample_project.id)
+        voxels = pocket_service.get_pocket_voxels(sample_project.id, pocket.pocket_id)
+
+        assert str(pocket.pocket_id) in pocket_boxes
+        assert len(voxels) == pocket.voxel_count
+
+    @pytest.mark.asyncio
+    async def test_get_pocket_voxels_matches_full_scan(
+        self,
+        pocket_service: PocketService,
+        sample_project,
+        cube_shell_pointcloud: np.ndarray,
+    ):
+        """Bounding-box reads should return the same voxels as scanning the grid."""
+        analysis = await pocket_service.analyze_pockets(
+            sample_project.id, voxel_target=16, recompute=True
+        )
+        if len(analysis.pockets) == 0:
+            pytest.skip("No pockets found in test data")
+        pocket_id = analysis.pockets[0].pocket_id
+
+        voxels = pocket_service.get_pocket_voxels(sample_project.id, pocket_id)
+
+        labeled, voxel_size, bounds_low, _ = pocket_service._load_labeled_grid(sample_project.id)
+        expected = np.argwhere(labeled == pocket_id) * voxel_size + bounds_low + voxel_size / 2
+        np.testing.assert_allclose(voxels, expected)
+
+    def test_get_pocket_voxels_legacy_npz(self, pocket_service: PocketService, sample_project):
+        """Caches in the old grid.npz layout should still be readable."""
+        labeled = np.zeros((4, 4, 4), dtype=np.int32)
+        labeled[1:3, 1:3, 1:3] = 1
+        pockets_dir = pocket_service._pockets_dir(sample_project.id)
+        np.savez_compressed(
+            pockets_dir / "grid.npz",
+            grid=np.zeros((4, 4, 4), dtype=np.uint8),
+            labeled=labeled,
+            voxel_size=np.array([0.5]),
+            bounds_low=np.zeros(3),
+        )
+
+        voxels = pocket_service.get_pocket_voxels(sample_project.id, 1)
+
+        assert len(voxels) == 8
+        np.testing.assert_allclose(voxels.min(axis=0), [0.75, 0.75, 0.75])
+
+    @pytest.mark.asyncio
+    async def test_state_grid_saved(
+        self,
+        pocket_service: PocketService,
+        sample_project,
+        cube_shell_pointcloud: np.ndarray,
+    ):
+        """Voxel state grid should be written as a loadable .npy."""
+        analysis = await pocket_service.analyze_pockets(
+            sample_project.id, voxel_target=16, recompute=True
+        )
+
+        grid = np.load(pocket_service._pockets_dir(sample_project.id) / "grid.npy")
+
+        assert grid.dtype == np.uint8
+        assert grid.shape == tuple(analysis.grid_metadata.resolution)
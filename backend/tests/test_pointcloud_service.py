@@ -1,16 +1,25 @@
 # ABOUTME: Unit tests for PointCloudService
 # ABOUTME: Tests point cloud loading, octree building, and tile streaming
 
+import base64
 import io
 import json
+import os
 from pathlib import Path
-from unittest.mock import AsyncMock, MagicMock
 
 import numpy as np
 import pytest
 
 from sdf_labeler_api.config import Settings
-from sdf_labeler_api.services.pointcloud_service import PointCloudService
+from sdf_labeler_api.services import point_store
+from sdf_labeler_api.services import pointcloud_service as pointcloud_module
+from sdf_labeler_api.services.pointcloud_service import (
+    PointCloudService,
+    _faiss_searcher,
+    _open3d_normals,
+    _smallest_eigenvectors,
+)
+from sdf_labeler_api.services.tile_codec import decode_normals_oct, unpack_labels
 
 
 @pytest.fixture
@@ -83,6 +92,14 @@ class TestCoordsToNodeId:
         # Far corner subdivision
         assert pointcloud_service._coords_to_node_id(2, 3, 3, 3) == "r77"
 
+    def test_deep_levels(self, pointcloud_service: PointCloudService):
+        """Test one octant digit per level at depths spanning the lookup table and beyond."""
+        for level in (11, 12, 22, 25):
+            zeros = "0" * (level - 1)
+            top = 1 << (level - 1)
+            assert pointcloud_service._coords_to_node_id(level, top, 0, 0) == f"r1{zeros}"
+            assert pointcloud_service._coords_to_node_id(level, 0, 1, 1) == f"r{zeros}6"
+
 
 class TestLoadPoints:
     """Tests for loading points from different formats."""
@@ -106,6 +123,70 @@ class TestLoadPoints:
         assert normals.shape == (2, 3)
         np.testing.assert_array_almost_equal(normals[0], [0.0, 0.0, 1.0])
 
+    def test_load_csv_ignores_partial_normals(self, pointcloud_service: PointCloudService):
+        """Test CSV extra columns are skipped and incomplete normals are dropped."""
+        csv_content = b"id,x,y,z,nx,ny,intensity\n0,1.0,2.0,3.0,0.0,1.0,9\n1,4,5,6,1.0,0.0,8"
+        xyz, normals = pointcloud_service._load_points(csv_content, "csv")
+
+        assert xyz.shape == (2, 3)
+        assert normals is None
+        np.testing.assert_array_almost_equal(xyz[1], [4.0, 5.0, 6.0])
+
+    def test_load_csv_missing_position_column(self, pointcloud_service: PointCloudService):
+        """Test CSV without a position column raises a clear error."""
+        with pytest.raises(ValueError, match="missing columns: z"):
+            pointcloud_service._load_points(b"x,y\n1.0,2.0\n", "csv")
+
+    def test_load_parquet(self, pointcloud_service: PointCloudService):
+        """Test loading Parquet with and without normal columns."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = {"x": [1.0, 4.0], "y": [2.0, 5.0], "z": [3.0, 6.0], "label": [1, 2]}
+        buffer = io.BytesIO()
+        pq.write_table(pa.table(columns), buffer)
+        xyz, normals = pointcloud_service._load_points(buffer.getvalue(), "parquet")
+
+        assert xyz.shape == (2, 3)
+        assert normals is None
+        np.testing.assert_array_almost_equal(xyz[1], [4.0, 5.0, 6.0])
+
+        columns.update(nx=[0.0, 0.0], ny=[0.0, 1.0], nz=[1.0, 0.0])
+        buffer = io.BytesIO()
+        pq.write_table(pa.table(columns), buffer)
+        xyz, normals = pointcloud_service._load_points(buffer.getvalue(), "parquet")
+
+        assert normals.shape == (2, 3)
+        np.testing.assert_array_almost_equal(normals[1], [0.0, 1.0, 0.0])
+
+    def test_load_las_in_chunks(
+        self, pointcloud_service: PointCloudService, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test LAS points and normals are assembled correctly across chunks."""
+        import laspy
+
+        from sdf_labeler_api.services import pointcloud_service as module
+
+        header = laspy.LasHeader(point_format=3, version="1.2")
+        header.scales = np.array([0.001, 0.001, 0.001])
+        header.offsets = np.array([10.0, -5.0, 0.0])
+        normal_dims = ("NormalX", "NormalY", "NormalZ")
+        header.add_extra_dims(
+            [laspy.ExtraBytesParams(name=name, type=np.float32) for name in normal_dims]
+        )
+        las = laspy.LasData(header)
+        expected = np.column_stack([np.arange(5) * 1.5 + 10, -np.arange(5.0), np.arange(5) * 0.25])
+        las.x, las.y, las.z = expected.T
+        las.NormalZ = np.ones(5, dtype=np.float32)
+        buffer = io.BytesIO()
+        las.write(buffer)
+
+        monkeypatch.setattr(module, "LAS_CHUNK_SIZE", 2)
+        xyz, normals = pointcloud_service._load_points(buffer.getvalue(), "las")
+
+        np.testing.assert_allclose(xyz, expected, atol=1e-3)
+        np.testing.assert_array_equal(normals, [[0.0, 0.0, 1.0]] * 5)
+
     def test_load_npz_with_xyz_key(self, pointcloud_service: PointCloudService):
         """Test loading NPZ file with 'xyz' key."""
         xyz_data = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
@@ -171,6 +252,20 @@ class TestLoadPoints:
         np.testing.assert_array_almost_equal(xyz[0], [1.0, 2.0, 3.0])
         np.testing.assert_array_almost_equal(normals[0], [0.0, 0.0, 1.0])
 
+    def test_load_npy_path_is_mapped(
+        self, pointcloud_service: PointCloudService, tmp_path: Path
+    ):
+        """Test an NPY file on disk is memory-mapped instead of read."""
+        arr = np.arange(12, dtype=np.float32).reshape(2, 6)
+        path = tmp_path / "upload.npy"
+        np.save(path, arr)
+
+        xyz, normals = pointcloud_service._load_points(path, "npy")
+
+        assert isinstance(xyz, np.memmap)
+        np.testing.assert_array_equal(xyz, arr[:, :3])
+        np.testing.assert_array_equal(normals, arr[:, 3:])
+
     def test_load_unsupported_format(self, pointcloud_service: PointCloudService):
         """Test loading unsupported format raises error."""
         with pytest.raises(ValueError, match="Unsupported format"):
@@ -209,6 +304,75 @@ class TestEstimateNormals:
         lengths = np.linalg.norm(normals, axis=1)
         np.testing.assert_array_almost_equal(lengths, np.ones(50), decimal=5)
 
+    def test_estimate_normals_k_larger_than_cloud(self, pointcloud_service: PointCloudService):
+        """Test k is clamped to the number of points."""
+        xyz = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 0.0]])
+
+        normals = pointcloud_service._estimate_normals(xyz, k=16)
+
+        np.testing.assert_allclose(normals, np.tile([0.0, 0.0, 1.0], (4, 1)), atol=1e-12)
+
+    def test_estimate_normals_above_ann_threshold(self, pointcloud_service: PointCloudService):
+        """Test large clouds still get correct normals with or without an ANN library."""
+        pointcloud_service.settings.ann_normal_threshold = 0
+        rng = np.random.default_rng(1)
+        xyz = np.column_stack([rng.uniform(0, 1, 200), rng.uniform(0, 1, 200), np.zeros(200)])
+
+        normals = pointcloud_service._estimate_normals(xyz, k=8)
+
+        np.testing.assert_allclose(normals, np.tile([0.0, 0.0, 1.0], (200, 1)), atol=1e-6)
+
+    def test_faiss_neighbors_include_self(self):
+        """Test the FAISS searcher returns each point among its own neighbors."""
+        pytest.importorskip("faiss")
+        xyz = np.random.default_rng(2).uniform(0, 1, (500, 3))
+
+        neighbors = _faiss_searcher(xyz, 8)(xyz[:50])
+
+        assert neighbors.shape == (50, 8)
+        assert (neighbors == np.arange(50)[:, None]).any(axis=1).mean() > 0.95
+
+    def test_open3d_normals_match_numpy(
+        self, pointcloud_service: PointCloudService, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test Open3D normals agree with the NumPy estimator up to sign."""
+        pytest.importorskip("open3d")
+        rng = np.random.default_rng(3)
+        xy = rng.uniform(-1, 1, (500, 2))
+        xyz = np.column_stack([xy, 0.3 * np.sin(2 * xy[:, 0]) * np.cos(xy[:, 1])])
+
+        normals = _open3d_normals(xyz, 12)
+        monkeypatch.setattr(pointcloud_module, "_open3d_normals", lambda xyz, k: None)
+        expected = pointcloud_service._estimate_normals(xyz, k=12)
+
+        assert normals.shape == (500, 3)
+        alignment = np.abs(np.einsum("ni,ni->n", normals, expected))
+        np.testing.assert_allclose(alignment, 1.0, atol=1e-6)
+
+    def test_smallest_eigenvectors_match_eigh(self):
+        """Test the closed-form solver agrees with LAPACK."""
+        rng = np.random.default_rng(0)
+        a = rng.standard_normal((500, 3, 3))
+        cov = a @ a.transpose(0, 2, 1)
+
+        vectors = _smallest_eigenvectors(cov)
+        _, expected = np.linalg.eigh(cov)
+
+        # Same direction up to sign
+        alignment = np.abs(np.einsum("ni,ni->n", vectors, expected[:, :, 0]))
+        np.testing.assert_allclose(alignment, 1.0, atol=1e-8)
+
+    def test_smallest_eigenvectors_degenerate(self):
+        """Test collinear and coincident neighborhoods still yield unit vectors."""
+        direction = np.array([1.0, 2.0, 3.0])
+        cov = np.stack([np.outer(direction, direction), np.zeros((3, 3))])
+
+        vectors = _smallest_eigenvectors(cov)
+
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        assert abs(vectors[0] @ direction) < 1e-9
+        np.testing.assert_allclose(vectors[1], [0.0, 0.0, 1.0])
+
 
 class TestOctreeOperations:
     """Tests for octree building and querying."""
@@ -234,6 +398,35 @@ class TestOctreeOperations:
         assert len(metadata.nodes) == metadata.node_count
         assert "r" in metadata.nodes
 
+    def test_children_partition_parent_points(
+        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    ):
+        """Test each point of a split node lands in exactly one child, max bounds included."""
+        project_id = "test-project"
+        rng = np.random.default_rng(7)
+        xyz = rng.uniform(0, 1, (2000, 3))
+        xyz[:10] = xyz.max(axis=0)  # points on the upper bound of every axis
+        pointcloud_service.settings.octree_node_target = 100
+
+        pointcloud_service._build_octree(project_id, xyz, normals=None)
+        nodes = pointcloud_service.get_octree_metadata(project_id).nodes
+
+        for node in nodes.values():
+            if node.children:
+                assert sum(nodes[c].point_count for c in node.children) == node.point_count
+                for child_id in node.children:
+                    child = nodes[child_id]
+                    assert all(
+                        lo >= plo and hi <= phi
+                        for lo, hi, plo, phi in zip(
+                            child.bounds_low,
+                            child.bounds_high,
+                            node.bounds_low,
+                            node.bounds_high,
+                            strict=True,
+                        )
+                    )
+
     def test_build_octree_with_normals(
         self, pointcloud_service: PointCloudService, temp_data_dir: Path
     ):
@@ -273,11 +466,167 @@ class TestOctreeOperations:
         assert tile["point_count"] > 0
         assert len(tile["positions"]) == tile["point_count"] * 3
 
+    def test_get_tile_base64(self, pointcloud_service: PointCloudService):
+        """Test base64 tile arrays decode back to the stored float32 data."""
+        project_id = "test-project"
+        rng = np.random.default_rng(0)
+        xyz = rng.uniform(0, 1, (50, 3)).astype(np.float32)
+        normals = np.tile(np.array([0.0, 0.0, 1.0], dtype=np.float32), (50, 1))
+        pointcloud_service._build_octree(project_id, xyz, normals)
+
+        tile = pointcloud_service.get_tile(project_id, 0, 0, 0, 0, encoding="base64")
+
+        assert tile["encoding"] == "base64"
+        assert tile["point_count"] == 50
+        positions = np.frombuffer(base64.b64decode(tile["positions"]), dtype="<f4")
+        # Tile points are stored in Morton order, not input order
+        np.testing.assert_array_equal(
+            np.sort(positions.reshape(-1, 3), axis=0), np.sort(xyz, axis=0)
+        )
+        decoded_normals = np.frombuffer(base64.b64decode(tile["normals"]), dtype="<f4")
+        np.testing.assert_array_equal(decoded_normals.reshape(-1, 3), normals)
+        assert tile["labels"] is None
+
+    def test_get_tile_quantized(self, pointcloud_service: PointCloudService):
+        """Test quantized tiles carry octahedral normals and packed labels."""
+        project_id = "test-project"
+        xyz = np.random.default_rng(0).random((10, 3))
+        normals = np.tile(np.array([0.0, 0.0, 1.0]), (10, 1))
+        pointcloud_service._build_octree(project_id, xyz, normals)
+
+        tile = pointcloud_service.get_tile(project_id, 0, 0, 0, 0, encoding="quantized")
+
+        assert tile["encoding"] == "quantized"
+        oct_normals = np.frombuffer(base64.b64decode(tile["normals"]), dtype=np.int8)
+        assert oct_normals.size == 20
+        np.testing.assert_allclose(decode_normals_oct(oct_normals), normals, atol=1e-6)
+
+    def test_get_tile_legacy_float_normals(
+        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    ):
+        """Test tiles written with float32 normals and labels are still served."""
+        tiles_dir = temp_data_dir / "projects" / "legacy" / "pointcloud" / "tiles"
+        tiles_dir.mkdir(parents=True)
+        np.savez_compressed(
+            tiles_dir / "r.npz",
+            positions=np.zeros((4, 3), dtype=np.float32),
+            normals=np.tile(np.array([0.0, 1.0, 0.0], dtype=np.float32), (4, 1)),
+            labels=np.array([0, 1, 2, 1], dtype=np.uint8),
+        )
+
+        plain = pointcloud_service.get_tile("legacy", 0, 0, 0, 0)
+        quantized = pointcloud_service.get_tile("legacy", 0, 0, 0, 0, encoding="quantized")
+
+        assert plain["normals"][:3] == [0.0, 1.0, 0.0]
+        assert plain["labels"] == [0, 1, 2, 1]
+        packed = np.frombuffer(base64.b64decode(quantized["labels"]), dtype=np.uint8)
+        assert unpack_labels(packed, 4).tolist() == [0, 1, 2, 1]
+
+    def test_tiles_written_to_single_store(
+        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    ):
+        """Test tiles go into one mapped store and replace per-tile .npz files."""
+        project_id = "test-project"
+        tiles_dir = temp_data_dir / "projects" / project_id / "pointcloud" / "tiles"
+        tiles_dir.mkdir(parents=True)
+        np.savez_compressed(tiles_dir / "r.npz", positions=np.zeros((1, 3), dtype=np.float32))
+        rng = np.random.default_rng(3)
+        xyz = rng.uniform(0, 1, (300, 3))
+        normals = np.tile([0.0, 0.0, 1.0], (300, 1))
+        pointcloud_service.settings.octree_node_target = 64
+
+        pointcloud_service._build_octree(project_id, xyz, normals)
+
+        assert sorted(p.name for p in tiles_dir.iterdir()) == ["tiles.bin", "tiles_index.json"]
+        metadata = pointcloud_service.get_octree_metadata(project_id)
+        leaf_points = 0
+        for node_id, node in metadata.nodes.items():
+            level = len(node_id) - 1
+            x, y, z = (
+                sum(((int(d) >> axis) & 1) << (level - 1 - i) for i, d in enumerate(node_id[1:]))
+                for axis in range(3)
+            )
+            tile = pointcloud_service.get_tile(project_id, level, x, y, z)
+            assert tile["node_id"] == node_id
+            if not node.children:
+                assert tile["point_count"] == node.point_count
+                leaf_points += node.point_count
+            np.testing.assert_allclose(np.reshape(tile["normals"], (-1, 3))[:, 2], 1.0, atol=1e-6)
+        assert leaf_points == 300
+
+    def test_tile_points_in_morton_order(self, pointcloud_service: PointCloudService):
+        """Test tile points are written along a Z-order curve over the tile bounds."""
+        project_id = "test-project"
+        # The corners of a cube, listed in reverse Z-order
+        corners = [[x, y, z] for z in (0, 1) for y in (0, 1) for x in (0, 1)]
+        xyz = np.array(corners[::-1], dtype=np.float64)
+        pointcloud_service._build_octree(project_id, xyz, normals=None)
+
+        tile = pointcloud_service.get_tile(project_id, 0, 0, 0, 0)
+
+        assert np.reshape(tile["positions"], (-1, 3)).tolist() == corners
+
+    def test_get_tile_bytes_matches_tile(self, pointcloud_service: PointCloudService):
+        """Test serialized tile bytes decode to the tile dict and the stored points."""
+        project_id = "test-project"
+        xyz = np.random.default_rng(0).uniform(0, 1, (50, 3)).astype(np.float32)
+        pointcloud_service._build_octree(project_id, xyz, normals=None)
+
+        etag, body = pointcloud_service.get_tile_bytes(project_id, 0, 0, 0, 0)
+
+        decoded = json.loads(body)
+        assert decoded == pointcloud_service.get_tile(project_id, 0, 0, 0, 0)
+        # The body prints float32 values at float32 precision
+        positions = np.float32(decoded["positions"]).reshape(-1, 3)
+        np.testing.assert_array_equal(np.sort(positions, axis=0), np.sort(xyz, axis=0))
+        assert etag.startswith('"r-')
+
+    def test_get_tile_bytes_changes_on_rebuild(self, pointcloud_service: PointCloudService):
+        """Test a rebuilt tile gets a new ETag and body instead of the cached one."""
+        project_id = "test-project"
+        rng = np.random.default_rng(0)
+        pointcloud_service._build_octree(project_id, rng.uniform(0, 1, (50, 3)), normals=None)
+        etag_before, _ = pointcloud_service.get_tile_bytes(project_id, 0, 0, 0, 0)
+
+        pointcloud_service._build_octree(project_id, rng.uniform(0, 1, (60, 3)), normals=None)
+        etag_after, body = pointcloud_service.get_tile_bytes(project_id, 0, 0, 0, 0)
+
+        assert etag_after != etag_before
+        assert json.loads(body)["point_count"] == 60
+
+    def test_get_tile_bytes_nonexistent(self, pointcloud_service: PointCloudService):
+        """Test getting bytes for a nonexistent tile returns None."""
+        assert pointcloud_service.get_tile_bytes("nonexistent-project", 0, 0, 0, 0) is None
+
     def test_get_tile_nonexistent(self, pointcloud_service: PointCloudService):
         """Test getting a nonexistent tile returns None."""
         tile = pointcloud_service.get_tile("nonexistent-project", 0, 0, 0, 0)
         assert tile is None
 
+    def test_metadata_cached_until_file_changes(
+        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    ):
+        """Test metadata is parsed once and re-read when another build rewrites it."""
+        project_id = "test-project"
+        rng = np.random.default_rng(0)
+        pointcloud_service._build_octree(project_id, rng.uniform(0, 1, (50, 3)), normals=None)
+
+        first = pointcloud_service.get_octree_metadata(project_id)
+        assert pointcloud_service.get_octree_metadata(project_id) is first
+
+        # A build in another process leaves this service's cache untouched
+        other = PointCloudService(pointcloud_service.settings)
+        other._build_octree(project_id, rng.uniform(0, 1, (60, 3)), normals=None)
+        metadata_path = temp_data_dir / "projects" / project_id / "pointcloud"
+        metadata_path = metadata_path / "octree_metadata.json"
+        stat = metadata_path.stat()
+        os.utime(metadata_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert pointcloud_service.get_octree_metadata(project_id).total_points == 60
+
+        metadata_path.unlink()
+        assert pointcloud_service.get_octree_metadata(project_id) is None
+
     def test_get_metadata_nonexistent(self, pointcloud_service: PointCloudService):
         """Test getting metadata for nonexistent project returns None."""
         metadata = pointcloud_service.get_octree_metadata("nonexistent-project")
@@ -319,6 +668,37 @@ class TestGetStats:
         assert stats.octree_depth >= 0
         assert stats.lod_levels >= 1
 
+    def test_get_stats_from_summaries(
+        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    ):
+        """Test stats come from the points sidecar and octree header, and track replacement."""
+        project_id = "test-project"
+        pc_dir = temp_data_dir / "projects" / project_id / "pointcloud"
+        pc_dir.mkdir(parents=True)
+        xyz = np.random.default_rng(5).uniform(-1, 2, (500, 3))
+        pointcloud_service.settings.octree_node_target = 64
+        pointcloud_service._save_points(pc_dir, xyz, None)
+        pointcloud_service._build_octree(project_id, xyz, None)
+
+        stats = pointcloud_service.get_stats(project_id)
+
+        assert (pc_dir / "points_meta.json").exists()
+        assert stats.point_count == 500
+        assert stats.has_normals is False
+        np.testing.assert_allclose(stats.bounds_low, xyz.min(axis=0))
+        np.testing.assert_allclose(stats.centroid, xyz.mean(axis=0))
+        metadata = pointcloud_service.get_octree_metadata(project_id)
+        assert stats.octree_depth == metadata.max_depth
+        assert stats.octree_node_count == metadata.node_count
+
+        # Points replaced without going through _save_points
+        np.save(pc_dir / "xyz.npy", xyz[:10])
+        np.save(pc_dir / "normals.npy", np.ones((10, 3)))
+        refreshed = pointcloud_service.get_stats(project_id)
+
+        assert refreshed.point_count == 10
+        assert refreshed.has_normals is True
+
     def test_get_stats_without_normals(
         self, pointcloud_service: PointCloudService, temp_data_dir: Path
     ):
@@ -346,21 +726,17 @@ class TestGetStats:
 class TestUploadAndProcess:
     """Tests for the full upload workflow."""
 
-    @pytest.mark.asyncio
-    async def test_upload_csv_file(
-        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    def test_upload_csv_file(
+        self, pointcloud_service: PointCloudService, tmp_path: Path
     ):
         """Test uploading a CSV point cloud file."""
-        csv_content = b"x,y,z\n0.0,0.0,0.0\n1.0,0.0,0.0\n0.0,1.0,0.0\n0.0,0.0,1.0"
+        csv_path = tmp_path / "upload.csv"
+        csv_path.write_bytes(b"x,y,z\n0.0,0.0,0.0\n1.0,0.0,0.0\n0.0,1.0,0.0\n0.0,0.0,1.0")
 
-        # Create mock UploadFile
-        mock_file = MagicMock()
-        mock_file.filename = "test_points.csv"
-        mock_file.read = AsyncMock(return_value=csv_content)
-
-        result = await pointcloud_service.upload_and_process(
+        result = pointcloud_service.process_file(
             project_id="test-project",
-            file=mock_file,
+            path=csv_path,
+            filename="test_points.csv",
             estimate_normals=True,
             normal_k=3,  # Small k for 4 points
         )
@@ -372,26 +748,20 @@ class TestUploadAndProcess:
         assert len(result.bounds_low) == 3
         assert len(result.bounds_high) == 3
 
-    @pytest.mark.asyncio
-    async def test_upload_npz_with_normals(
-        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    def test_upload_npz_with_normals(
+        self, pointcloud_service: PointCloudService, tmp_path: Path
     ):
         """Test uploading NPZ file that already has normals."""
         xyz = np.array([[0, 0, 0], [1, 1, 1]], dtype=np.float32)
         normals = np.array([[0, 0, 1], [0, 0, 1]], dtype=np.float32)
 
-        buffer = io.BytesIO()
-        np.savez(buffer, xyz=xyz, normals=normals)
-        buffer.seek(0)
-        content = buffer.read()
+        npz_path = tmp_path / "upload.npz"
+        np.savez(npz_path, xyz=xyz, normals=normals)
 
-        mock_file = MagicMock()
-        mock_file.filename = "test_points.npz"
-        mock_file.read = AsyncMock(return_value=content)
-
-        result = await pointcloud_service.upload_and_process(
+        result = pointcloud_service.process_file(
             project_id="test-project",
-            file=mock_file,
+            path=npz_path,
+            filename="test_points.npz",
             estimate_normals=False,  # Don't estimate, use existing
         )
 
@@ -399,22 +769,78 @@ class TestUploadAndProcess:
         assert result.has_normals is True
         assert result.format == "npz"
 
+    def test_upload_stores_mappable_arrays(
+        self, pointcloud_service: PointCloudService, temp_data_dir: Path, tmp_path: Path
+    ):
+        """Test uploads replace a legacy points.npz with memory-mappable .npy files."""
+        pc_dir = temp_data_dir / "projects" / "test-project" / "pointcloud"
+        pc_dir.mkdir(parents=True)
+        np.savez(pc_dir / "points.npz", xyz=np.zeros((1, 3)), normals=np.array([]))
+        npz_path = tmp_path / "upload.npz"
+        xyz = np.array([[0, 0, 0], [1, 1, 1]], dtype=np.float64)
+        np.savez(npz_path, xyz=xyz, normals=np.array([[0, 0, 1], [0, 0, 1]]))
+
+        pointcloud_service.process_file(
+            project_id="test-project",
+            path=npz_path,
+            filename="test_points.npz",
+            estimate_normals=False,
+        )
+
+        assert not (pc_dir / "points.npz").exists()
+        loaded_xyz, loaded_normals = point_store.load_points(pc_dir)
+        assert isinstance(loaded_xyz, np.memmap)
+        np.testing.assert_array_equal(loaded_xyz, xyz)
+        assert loaded_normals.shape == (2, 3)
+
+    def test_save_points_keeps_open_mappings_valid(self, tmp_path: Path):
+        """Test re-saving replaces the files rather than rewriting mapped data in place."""
+        old_xyz = np.zeros((4, 3))
+        point_store.save_points(tmp_path, old_xyz, np.ones((4, 3)))
+        mapped_xyz, _ = point_store.load_points(tmp_path)
+
+        point_store.save_points(tmp_path, np.full((4, 3), 7.0), None)
+
+        np.testing.assert_array_equal(mapped_xyz, old_xyz)
+        new_xyz, new_normals = point_store.load_points(tmp_path)
+        np.testing.assert_array_equal(new_xyz, 7.0)
+        assert new_normals is None
+        assert not list(tmp_path.glob("*.tmp"))
+
     @pytest.mark.asyncio
-    async def test_upload_creates_octree(
+    async def test_store_dataframe_from_single_block(
         self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    ):
+        """Test storing a scenario-style frame backed by one (N, 6) array."""
+        import pandas as pd
+
+        rng = np.random.default_rng(0)
+        block = np.hstack([rng.uniform(0, 1, (50, 3)), np.tile([0.0, 0.0, 1.0], (50, 1))])
+        df = pd.DataFrame(block, columns=["x", "y", "z", "nx", "ny", "nz"], copy=False)
+
+        result = await pointcloud_service.store_dataframe("test-project", df)
+
+        assert result.point_count == 50
+        assert result.has_normals is True
+        pc_dir = temp_data_dir / "projects" / "test-project" / "pointcloud"
+        loaded_xyz, loaded_normals = point_store.load_points(pc_dir)
+        np.testing.assert_array_equal(loaded_xyz, block[:, :3])
+        np.testing.assert_array_equal(loaded_normals, block[:, 3:])
+
+    def test_upload_creates_octree(
+        self, pointcloud_service: PointCloudService, tmp_path: Path
     ):
         """Test that upload creates octree metadata."""
-        csv_content = b"x,y,z\n" + b"\n".join(
-            f"{i*0.01},{i*0.01},{i*0.01}".encode() for i in range(100)
+        csv_path = tmp_path / "upload.csv"
+        csv_path.write_bytes(
+            b"x,y,z\n"
+            + b"\n".join(f"{i*0.01},{i*0.01},{i*0.01}".encode() for i in range(100))
         )
 
-        mock_file = MagicMock()
-        mock_file.filename = "test.csv"
-        mock_file.read = AsyncMock(return_value=csv_content)
-
-        await pointcloud_service.upload_and_process(
+        pointcloud_service.process_file(
             project_id="test-project",
-            file=mock_file,
+            path=csv_path,
+            filename="test.csv",
             estimate_normals=True,
             normal_k=10,
         )
@@ -424,25 +850,19 @@ class TestUploadAndProcess:
         assert metadata is not None
         assert metadata.total_points == 100
 
-    @pytest.mark.asyncio
-    async def test_upload_without_normal_estimation(
-        self, pointcloud_service: PointCloudService, temp_data_dir: Path
+    def test_upload_without_normal_estimation(
+        self, pointcloud_service: PointCloudService, tmp_path: Path
     ):
         """Test upload without normal estimation."""
         xyz = np.array([[0, 0, 0], [1, 1, 1]], dtype=np.float32)
 
-        buffer = io.BytesIO()
-        np.savez(buffer, xyz=xyz)  # No normals
-        buffer.seek(0)
-        content = buffer.read()
-
-        mock_file = MagicMock()
-        mock_file.filename = "test.npz"
-        mock_file.read = AsyncMock(return_value=content)
+        npz_path = tmp_path / "upload.npz"
+        np.savez(npz_path, xyz=xyz)  # No normals
 
-        result = await pointcloud_service.upload_and_process(
+        result = pointcloud_service.process_file(
             project_id="test-project",
-            file=mock_file,
+            path=npz_path,
+            filename="test.npz",
             estimate_normals=False,
         )
 
@@ -163,6 +163,51 @@ class TestProjectService:
         assert retrieved.name == project.name
 
 
+class TestProjectServiceCache:
+    """Tests for the in-memory project cache."""
+
+    def test_get_served_from_cache(self, project_service: ProjectService, sample_project):
+        """Test repeated lookups do not re-read project.json."""
+        first = project_service.get(sample_project.id)
+        project_service._metadata_path(sample_project.id).unlink()
+
+        assert project_service.get(sample_project.id) is first
+
+    def test_update_refreshes_cache(self, project_service: ProjectService, sample_project):
+        """Test updates are visible through get without touching the old instance."""
+        project_service.update_config(sample_project.id, ProjectConfig(near_band=0.07))
+
+        assert project_service.get(sample_project.id).config.near_band == 0.07
+        assert sample_project.config.near_band != 0.07
+
+    def test_set_pointcloud_refreshes_cache(
+        self, project_service: ProjectService, sample_project
+    ):
+        """Test point cloud reference is visible through get."""
+        project_service.set_pointcloud(
+            sample_project.id, "pc-1", (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)
+        )
+
+        assert project_service.get(sample_project.id).point_cloud_id == "pc-1"
+
+    def test_list_all_cold_cache(self, project_service: ProjectService, temp_data_dir):
+        """Test a fresh service reads every project from disk when listing."""
+        created = [project_service.create(ProjectCreate(name=f"P{i}")) for i in range(5)]
+        (temp_data_dir / "projects" / "stray-file.txt").write_text("not a project")
+        (temp_data_dir / "projects" / "empty-dir").mkdir()
+
+        projects = ProjectService(temp_data_dir).list_all()
+
+        assert sorted(p.id for p in projects) == sorted(p.id for p in created)
+
+    def test_delete_evicts_cache(self, project_service: ProjectService, sample_project):
+        """Test deleted projects are not returned from the cache."""
+        project_service.get(sample_project.id)
+        project_service.delete(sample_project.id)
+
+        assert project_service.get(sample_project.id) is None
+
+
 class TestProjectServiceEdgeCases:
     """Edge case tests for ProjectService."""
 
@@ -11,7 +11,7 @@ from sdf_labeler_api.models.constraints import (
 )
 from sdf_labeler_api.models.samples import SampleGenerationRequest
 from sdf_labeler_api.services.constraint_service import ConstraintService
-from sdf_labeler_api.services.sampling_service import SamplingService
+from sdf_labeler_api.services.sampling_service import SamplingService, _to_samples
 
 
 @pytest.fixture
@@ -48,7 +48,7 @@ class TestRayCarveAdaptiveBackBuffer:
         constraint_service.add(sample_project.id, constraint)
 
         request = SampleGenerationRequest(total_samples=1000, samples_per_primitive=500)
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         # Should have samples from ray_carve
         assert result.sample_count > 0
@@ -91,7 +91,7 @@ class TestRayCarveAdaptiveBackBuffer:
         constraint_service.add(sample_project.id, constraint)
 
         request = SampleGenerationRequest(total_samples=1000, samples_per_primitive=500)
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         surface_samples = [s for s in result.samples if s.source == "ray_carve_surface"]
         assert len(surface_samples) > 0
@@ -125,7 +125,7 @@ class TestRayCarveAdaptiveBackBuffer:
         constraint_service.add(sample_project.id, constraint)
 
         request = SampleGenerationRequest(total_samples=1000, samples_per_primitive=500)
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         surface_samples = [s for s in result.samples if s.source == "ray_carve_surface"]
         assert len(surface_samples) > 0
@@ -167,7 +167,7 @@ class TestRayCarveAdaptiveBackBuffer:
         constraint_service.add(sample_project.id, constraint)
 
         request = SampleGenerationRequest(total_samples=1000, samples_per_primitive=500)
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         surface_samples = [s for s in result.samples if s.source == "ray_carve_surface"]
         assert len(surface_samples) > 0
@@ -203,7 +203,7 @@ class TestRayCarveAdaptiveBackBuffer:
         constraint_service.add(sample_project.id, constraint)
 
         request = SampleGenerationRequest(total_samples=1000, samples_per_primitive=500)
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         empty_samples = [s for s in result.samples if s.source == "ray_carve_empty"]
         assert len(empty_samples) > 0
@@ -213,3 +213,92 @@ class TestRayCarveAdaptiveBackBuffer:
             assert 0 <= sample.x <= (1.0 - 0.1)  # Before empty_band_width
             assert sample.is_free is True
             assert sample.phi == 0.1  # empty_band_width
+
+
+class TestRayCarveArrays:
+    """Tests for the structure-of-arrays view of ray-carve rays."""
+
+    def test_arrays_built_on_validation(self):
+        """Test rays are packed into arrays with missing values encoded."""
+        constraint = RayCarveConstraint(
+            sign=SignConvention.EMPTY,
+            rays=[
+                RayInfo(
+                    origin=(0.0, 0.0, 0.0),
+                    direction=(2.0, 0.0, 0.0),
+                    hit_distance=1.0,
+                    surface_normal=(0.0, 0.0, 1.0),
+                    local_spacing=0.05,
+                ),
+                RayInfo(origin=(0.0, 1.0, 0.0), direction=(0.0, 0.0, 1.0), hit_distance=2.0),
+            ],
+        )
+
+        arrays = constraint.arrays
+        assert arrays.origins.shape == (2, 3)
+        np.testing.assert_allclose(arrays.directions[0], [1.0, 0.0, 0.0])
+        np.testing.assert_allclose(arrays.hit_distances, [1.0, 2.0])
+        assert arrays.local_spacing[0] == 0.05
+        assert np.isnan(arrays.local_spacing[1])
+        assert arrays.has_surface_normal.tolist() == [True, False]
+
+    def test_arrays_survive_round_trip(self):
+        """Test arrays are rebuilt when a constraint is re-validated from JSON."""
+        constraint = RayCarveConstraint(
+            sign=SignConvention.EMPTY,
+            rays=[RayInfo(origin=(0.0, 0.0, 0.0), direction=(1.0, 0.0, 0.0), hit_distance=1.0)],
+        )
+
+        restored = RayCarveConstraint.model_validate_json(constraint.model_dump_json())
+
+        assert "_arrays" not in restored.model_dump()
+        np.testing.assert_allclose(restored.arrays.origins, constraint.arrays.origins)
+
+    def test_equality_ignores_cached_arrays(self):
+        """Test constraints compare by their rays, packed or not."""
+        rays = [
+            RayInfo(origin=(0.0, 0.0, 0.0), direction=(1.0, 0.0, 0.0), hit_distance=1.0),
+            RayInfo(origin=(0.0, 1.0, 0.0), direction=(0.0, 1.0, 0.0), hit_distance=2.0),
+        ]
+        constraint = RayCarveConstraint(id="ray", sign=SignConvention.EMPTY, rays=rays)
+        unpacked = RayCarveConstraint.model_construct(**dict(constraint))
+
+        assert constraint == RayCarveConstraint(id="ray", sign=SignConvention.EMPTY, rays=rays)
+        assert unpacked == constraint
+        assert constraint != constraint.model_copy(update={"rays": rays[:1]})
+
+    def test_per_ray_buffer_limits_empty_samples(self, sampling_service: SamplingService):
+        """Test each ray stops its empty samples at its own buffer zone."""
+        constraint = RayCarveConstraint(
+            sign=SignConvention.EMPTY,
+            rays=[
+                RayInfo(
+                    origin=(0.0, 0.0, 0.0),
+                    direction=(1.0, 0.0, 0.0),
+                    hit_distance=1.0,
+                    local_spacing=0.5,
+                ),
+                RayInfo(origin=(0.0, 1.0, 0.0), direction=(1.0, 0.0, 0.0), hit_distance=1.0),
+                # Buffer swallows the whole ray: no empty samples
+                RayInfo(
+                    origin=(0.0, 2.0, 0.0),
+                    direction=(1.0, 0.0, 0.0),
+                    hit_distance=1.0,
+                    local_spacing=2.0,
+                ),
+            ],
+            back_buffer_width=0.1,
+            back_buffer_coefficient=1.0,
+        )
+
+        samples = _to_samples(
+            sampling_service._sample_ray_carve(constraint, np.random.default_rng(0), 20)
+        )
+
+        empty = [s for s in samples if s.source == "ray_carve_empty"]
+        surface = [s for s in samples if s.source == "ray_carve_surface"]
+        assert len(empty) == 20
+        assert len(surface) == 30
+        assert all(s.x <= 0.5 and s.phi == 0.5 for s in empty if s.y == 0.0)
+        assert all(s.x <= 0.9 and s.phi == 0.1 for s in empty if s.y == 1.0)
+        assert all(-0.02 <= s.phi <= 0.0 for s in surface)
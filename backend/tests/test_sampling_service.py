@@ -14,7 +14,12 @@ from sdf_labeler_api.models.constraints import (
 )
 from sdf_labeler_api.models.samples import SampleGenerationRequest
 from sdf_labeler_api.services.constraint_service import ConstraintService
-from sdf_labeler_api.services.sampling_service import SamplingService
+from sdf_labeler_api.services.sampling_service import (
+    SamplingService,
+    _column_range,
+    _take_rows,
+    _to_samples,
+)
 
 
 @pytest.fixture
@@ -58,7 +63,7 @@ class TestSamplingServiceGenerate:
         constraint_service.add(sample_project.id, box)
 
         request = SampleGenerationRequest(total_samples=1000)
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         assert result.sample_count > 0
         assert "box_solid" in result.source_breakdown
@@ -86,7 +91,7 @@ class TestSamplingServiceGenerate:
         constraint_service.add(sample_project.id, box)
 
         request = SampleGenerationRequest()
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         assert result.sample_count > 0
 
@@ -95,6 +100,32 @@ class TestSamplingServiceGenerate:
             assert sample.phi > 0  # Empty = positive SDF
             assert sample.is_free is True
 
+    def test_box_samples_offset_from_faces(self, sampling_service: SamplingService):
+        """Test box samples sit near_band off a face along its axis-aligned normal."""
+        box = BoxConstraint(
+            sign=SignConvention.EMPTY,
+            center=(0.5, 0.5, 0.5),
+            half_extents=(0.2, 0.3, 0.4),
+        )
+        rng = np.random.default_rng(0)
+
+        samples = _to_samples(
+            sampling_service._sample_box(box, rng, near_band=0.01, n_samples=200)
+        )
+
+        assert len(samples) == 200
+        center, half = np.array(box.center), np.array(box.half_extents)
+        for sample in samples:
+            point = np.array([sample.x, sample.y, sample.z])
+            normal = np.array([sample.nx, sample.ny, sample.nz])
+            axis = int(np.flatnonzero(normal)[0])
+            assert abs(normal[axis]) == 1.0 and np.abs(normal).sum() == 1.0
+            face = center[axis] + normal[axis] * half[axis]
+            assert point[axis] == pytest.approx(face + normal[axis] * 0.01)
+            others = np.delete(np.abs(point - center) <= half + 1e-12, axis)
+            assert others.all()
+            assert sample.phi == 0.01
+
     def test_generate_from_sphere(
         self,
         sampling_service: SamplingService,
@@ -111,7 +142,7 @@ class TestSamplingServiceGenerate:
         constraint_service.add(sample_project.id, sphere)
 
         request = SampleGenerationRequest()
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         assert result.sample_count > 0
         assert "sphere_solid" in result.source_breakdown
@@ -122,6 +153,22 @@ class TestSamplingServiceGenerate:
             norm = np.sqrt(nx**2 + ny**2 + nz**2)
             assert abs(norm - 1.0) < 1e-5, "Normals should be unit vectors"
 
+    def test_sphere_samples_inside_band(self, sampling_service: SamplingService):
+        """Test solid sphere samples sit near_band inside the surface along their normal."""
+        sphere = SphereConstraint(sign=SignConvention.SOLID, center=(1.0, 2.0, 3.0), radius=0.5)
+        rng = np.random.default_rng(0)
+
+        samples = _to_samples(
+            sampling_service._sample_sphere(sphere, rng, near_band=0.02, n_samples=100)
+        )
+
+        assert len(samples) == 100
+        points = np.array([[s.x, s.y, s.z] for s in samples])
+        normals = np.array([[s.nx, s.ny, s.nz] for s in samples])
+        np.testing.assert_allclose(np.linalg.norm(points - sphere.center, axis=1), 0.48)
+        np.testing.assert_allclose(points, np.add(sphere.center, 0.48 * normals))
+        assert all(s.phi == -0.02 for s in samples)
+
     def test_generate_from_halfspace(
         self,
         sampling_service: SamplingService,
@@ -143,6 +190,51 @@ class TestSamplingServiceGenerate:
         assert result.sample_count > 0
         assert "halfspace_empty" in result.source_breakdown
 
+    def test_halfspace_uses_project_bounds(
+        self,
+        sampling_service: SamplingService,
+        constraint_service: ConstraintService,
+        project_service,
+        sample_project,
+        sample_pointcloud,
+    ):
+        """Test halfspace samples are drawn within the bounds recorded on the project."""
+        project_service.set_pointcloud(sample_project.id, "pc", (2.0, 2.0, 2.0), (3.0, 3.0, 3.0))
+        halfspace = HalfspaceConstraint(
+            sign=SignConvention.EMPTY,
+            point=(0.0, 0.0, 2.5),
+            normal=(0.0, 0.0, 1.0),
+        )
+        constraint_service.add(sample_project.id, halfspace)
+
+        result = sampling_service.generate(
+            sample_project.id, SampleGenerationRequest(), include_samples=True
+        )
+
+        assert result.sample_count > 0
+        for sample in result.samples:
+            assert min(sample.x, sample.y, sample.z) >= 2.0
+            assert max(sample.x, sample.y, sample.z) <= 3.0
+
+    def test_halfspace_phi_from_plane_distance(self, sampling_service: SamplingService):
+        """Test halfspace samples stay in bounds with phi = -(|distance| + near_band)."""
+        halfspace = HalfspaceConstraint(
+            sign=SignConvention.SOLID, point=(0.0, 0.0, 0.5), normal=(0.0, 0.0, 2.0)
+        )
+        bounds = (np.zeros(3), np.ones(3))
+        rng = np.random.default_rng(0)
+
+        samples = _to_samples(
+            sampling_service._sample_halfspace(halfspace, bounds, rng, near_band=0.01, n_samples=50)
+        )
+
+        assert len(samples) == 50
+        for sample in samples:
+            assert min(sample.x, sample.y, sample.z) >= 0.0
+            assert max(sample.x, sample.y, sample.z) <= 1.0
+            assert sample.phi == pytest.approx(-(abs(sample.z - 0.5) + 0.01))
+            assert (sample.nx, sample.ny, sample.nz) == (0.0, 0.0, 1.0)
+
     def test_generate_from_brush_stroke(
         self,
         sampling_service: SamplingService,
@@ -159,7 +251,7 @@ class TestSamplingServiceGenerate:
         constraint_service.add(sample_project.id, stroke)
 
         request = SampleGenerationRequest(samples_per_primitive=10)
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         # 3 stroke points * 10 samples each = 30 samples
         assert result.sample_count == 30
@@ -188,7 +280,7 @@ class TestSamplingServiceGenerate:
         constraint_service.add(sample_project.id, seed)
 
         request = SampleGenerationRequest()
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         assert result.sample_count == 5
         assert "propagated_solid" in result.source_breakdown
@@ -242,7 +334,7 @@ class TestSamplingServiceGenerate:
         constraint_service.add(sample_project.id, box)
 
         request = SampleGenerationRequest()
-        result = sampling_service.generate(sample_project.id, request)
+        result = sampling_service.generate(sample_project.id, request, include_samples=True)
 
         for sample in result.samples:
             assert sample.weight == 2.5
@@ -265,8 +357,8 @@ class TestSamplingServiceGenerate:
         request1 = SampleGenerationRequest(seed=42)
         request2 = SampleGenerationRequest(seed=42)
 
-        result1 = sampling_service.generate(sample_project.id, request1)
-        result2 = sampling_service.generate(sample_project.id, request2)
+        result1 = sampling_service.generate(sample_project.id, request1, include_samples=True)
+        result2 = sampling_service.generate(sample_project.id, request2, include_samples=True)
 
         assert result1.sample_count == result2.sample_count
         for s1, s2 in zip(result1.samples, result2.samples):
@@ -337,6 +429,88 @@ class TestSamplingServiceExport:
         assert path.exists()
         assert path.suffix == ".parquet"
 
+    def test_saved_samples_round_trip(
+        self,
+        sampling_service: SamplingService,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_pointcloud,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test samples.parquet is compact, batched into row groups, and float32-exact."""
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        from sdf_labeler_api.services import sampling_service as module
+
+        monkeypatch.setattr(module, "SAMPLES_ROW_GROUP_SIZE", 40)
+        box = BoxConstraint(
+            sign=SignConvention.SOLID, center=(0.5, 0.5, 0.5), half_extents=(0.1, 0.1, 0.1)
+        )
+        constraint_service.add(sample_project.id, box)
+        result = sampling_service.generate(
+            sample_project.id, SampleGenerationRequest(), include_samples=True
+        )
+
+        path = sampling_service.export_parquet(sample_project.id)
+        with pq.ParquetFile(path) as parquet_file:
+            metadata = parquet_file.metadata
+            assert metadata.num_row_groups == -(-result.sample_count // 40)
+            assert metadata.row_group(0).column(0).compression == "ZSTD"
+            assert parquet_file.schema_arrow.field("x").type == "float"
+            assert str(parquet_file.schema_arrow.field("source").type.index_type) == "int8"
+        saved = pd.read_parquet(path)
+        expected = pd.DataFrame([s.model_dump() for s in result.samples])
+        numeric = ["x", "y", "z", "phi", "nx", "ny", "nz", "weight"]
+        np.testing.assert_array_equal(saved[numeric], expected[numeric].astype(np.float32))
+        assert saved["source"].astype(str).tolist() == expected["source"].tolist()
+        assert saved["is_free"].tolist() == expected["is_free"].tolist()
+
+    def test_samples_for_visualization(
+        self,
+        sampling_service: SamplingService,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_pointcloud,
+    ):
+        """Test visualization points match the generated samples, subsampled to limit."""
+        sphere = SphereConstraint(sign=SignConvention.EMPTY, center=(0.5, 0.5, 0.5), radius=0.2)
+        constraint_service.add(sample_project.id, sphere)
+        generated = sampling_service.generate(
+            sample_project.id, SampleGenerationRequest(), include_samples=True
+        )
+
+        full = sampling_service.get_samples_for_visualization(sample_project.id, limit=1000)
+        subsampled = sampling_service.get_samples_for_visualization(sample_project.id, limit=10)
+
+        assert full.total_count == full.returned_count == generated.sample_count
+        # Samples are stored as float32
+        np.testing.assert_array_equal(
+            np.array([(p.x, p.y, p.z, p.phi) for p in full.samples], dtype=np.float32),
+            np.array([(s.x, s.y, s.z, s.phi) for s in generated.samples], dtype=np.float32),
+        )
+        assert subsampled.returned_count == 10
+        near_band = np.float32(sample_project.config.near_band)
+        assert subsampled.phi_min == subsampled.phi_max == near_band
+
+    def test_take_rows_reads_only_needed_row_groups(self, tmp_path):
+        """Test rows come back in request order and phi range comes from statistics."""
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        path = tmp_path / "samples.parquet"
+        phi = np.random.default_rng(0).uniform(-1, 1, 1000)
+        pd.DataFrame({"x": np.arange(1000.0), "phi": phi}).to_parquet(path, row_group_size=100)
+        indices = np.array([950, 3, 512, 4, 999])
+
+        with pq.ParquetFile(path) as parquet_file:
+            table = _take_rows(parquet_file, indices, ["x", "phi"])
+            phi_range = _column_range(parquet_file, "phi")
+
+        assert table.column("x").to_pylist() == indices.astype(float).tolist()
+        np.testing.assert_array_equal(table.column("phi").to_numpy(), phi[indices])
+        assert phi_range == (phi.min(), phi.max())
+
     def test_export_config(
         self,
         sampling_service: SamplingService,
@@ -375,3 +549,66 @@ class TestSamplingServiceValidation:
         result = sampling_service.generate(sample_project.id, request)
 
         assert result.sample_count == 0
+
+    def test_generate_primitives_without_pointcloud(
+        self,
+        sampling_service: SamplingService,
+        constraint_service: ConstraintService,
+        sample_project,
+    ):
+        """Test primitive-only constraints generate samples without a point cloud."""
+        box = BoxConstraint(
+            sign=SignConvention.SOLID,
+            center=(0.5, 0.5, 0.5),
+            half_extents=(0.1, 0.1, 0.1),
+        )
+        constraint_service.add(sample_project.id, box)
+
+        result = sampling_service.generate(sample_project.id, SampleGenerationRequest())
+
+        assert result.sample_count > 0
+
+    def test_generate_point_indices_requires_pointcloud(
+        self,
+        sampling_service: SamplingService,
+        constraint_service: ConstraintService,
+        sample_project,
+    ):
+        """Test index-based constraints still need an uploaded point cloud."""
+        seed = SeedPropagationConstraint(
+            sign=SignConvention.SOLID,
+            seed_point=(0.5, 0.5, 0.5),
+            propagation_radius=0.1,
+            propagated_indices=[0],
+            confidences=[1.0],
+        )
+        constraint_service.add(sample_project.id, seed)
+
+        with pytest.raises(ValueError, match="No point cloud uploaded"):
+            sampling_service.generate(sample_project.id, SampleGenerationRequest())
+
+    def test_out_of_range_propagated_indices_skipped(
+        self,
+        sampling_service: SamplingService,
+        constraint_service: ConstraintService,
+        sample_project,
+        sample_pointcloud,
+    ):
+        """Test that indices outside the point cloud are dropped with their confidences."""
+        xyz, _ = sample_pointcloud
+        seed = SeedPropagationConstraint(
+            sign=SignConvention.SOLID,
+            seed_point=(0.5, 0.5, 0.5),
+            propagation_radius=0.1,
+            propagated_indices=[-1, 3, len(xyz), 7],
+            confidences=[0.1, 0.9, 0.2, 0.8],
+        )
+        constraint_service.add(sample_project.id, seed)
+
+        result = sampling_service.generate(
+            sample_project.id, SampleGenerationRequest(), include_samples=True
+        )
+
+        assert result.sample_count == 2
+        assert [s.x for s in result.samples] == pytest.approx(xyz[[3, 7], 0])
+        assert [s.weight for s in result.samples] == pytest.approx([0.9, 0.8])
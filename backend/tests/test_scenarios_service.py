@@ -0,0 +1,61 @@
+# ABOUTME: Unit tests for scenarios_service
+# ABOUTME: Tests scenario listing and its cache against a fake survi_scenarios module
+
+import sys
+import types
+from collections.abc import Generator
+
+import pytest
+
+from sdf_labeler_api.services import scenarios_service
+
+
+@pytest.fixture
+def fake_survi(monkeypatch: pytest.MonkeyPatch) -> Generator[types.ModuleType, None, None]:
+    """Install a fake survi_scenarios module that counts listing calls."""
+    module = types.ModuleType("survi_scenarios")
+    module.calls = 0
+
+    def list_trenchfoot_scenarios() -> list[str]:
+        module.calls += 1
+        return ["S01_straight_vwalls"]
+
+    module.list_trenchfoot_scenarios = list_trenchfoot_scenarios
+    module.list_sdf_scenarios = lambda: ["torus_compact"]
+    monkeypatch.setitem(sys.modules, "survi_scenarios", module)
+    scenarios_service.clear_scenario_cache()
+    yield module
+    scenarios_service.clear_scenario_cache()
+
+
+class TestListScenarios:
+    """Tests for scenario listing."""
+
+    def test_list_scenarios(self, fake_survi: types.ModuleType):
+        """Test scenarios are described per category."""
+        trenchfoot = scenarios_service.list_trenchfoot_scenarios()
+        sdf = scenarios_service.list_sdf_scenarios()
+
+        assert [(s.name, s.category) for s in trenchfoot] == [
+            ("S01_straight_vwalls", "trenchfoot")
+        ]
+        assert trenchfoot[0].description == "Trenchfoot scenario: S01 Straight Vwalls"
+        assert [(s.name, s.category) for s in sdf] == [("torus_compact", "sdf")]
+
+    def test_listing_cached_until_cleared(self, fake_survi: types.ModuleType):
+        """Test the package is only asked for its scenarios once per cache lifetime."""
+        scenarios_service.list_trenchfoot_scenarios()
+        scenarios_service.list_trenchfoot_scenarios()
+        assert fake_survi.calls == 1
+
+        scenarios_service.clear_scenario_cache()
+        scenarios_service.list_trenchfoot_scenarios()
+        assert fake_survi.calls == 2
+
+    def test_missing_package_lists_nothing(self, monkeypatch: pytest.MonkeyPatch):
+        """Test listing returns no scenarios when survi_scenarios is unavailable."""
+        monkeypatch.setitem(sys.modules, "survi_scenarios", None)
+        scenarios_service.clear_scenario_cache()
+
+        assert scenarios_service.list_trenchfoot_scenarios() == []
+        assert scenarios_service.list_sdf_scenarios() == []
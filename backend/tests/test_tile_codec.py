@@ -0,0 +1,177 @@
+# ABOUTME: Unit tests for tile attribute encodings
+# ABOUTME: Tests normal quantization, label packing, binary tiles and hierarchy layout
+
+import numpy as np
+import pytest
+
+from sdf_labeler_api.models.point_cloud import OctreeMetadata, OctreeNodeInfo
+from sdf_labeler_api.services.tile_codec import (
+    HIERARCHY_HEADER,
+    TILE_HEADER,
+    TILE_QUANT_BOUNDS,
+    decode_normals_oct,
+    decode_octree_hierarchy,
+    decode_tile_binary,
+    encode_normals_oct,
+    encode_octree_hierarchy,
+    encode_tile_binary,
+    pack_labels,
+    unpack_labels,
+)
+
+
+class TestOctahedralNormals:
+    """Tests for octahedral normal encoding."""
+
+    def test_round_trip_error_under_one_degree(self):
+        """Test decoded normals stay within a degree of the originals."""
+        rng = np.random.default_rng(0)
+        normals = rng.standard_normal((10000, 3))
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+        decoded = decode_normals_oct(encode_normals_oct(normals))
+
+        cos = np.clip(np.einsum("ni,ni->n", normals, decoded), -1.0, 1.0)
+        assert np.degrees(np.arccos(cos)).max() < 1.0
+
+    def test_encoded_shape_and_dtype(self):
+        """Test each normal encodes to two signed bytes."""
+        encoded = encode_normals_oct(np.array([[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]]))
+
+        assert encoded.shape == (2, 2)
+        assert encoded.dtype == np.int8
+
+    def test_axis_normals_exact(self):
+        """Test axis-aligned normals decode exactly, including both poles."""
+        axes = np.vstack([np.eye(3), -np.eye(3)])
+
+        decoded = decode_normals_oct(encode_normals_oct(axes))
+
+        np.testing.assert_allclose(decoded, axes, atol=1e-6)
+
+
+class TestLabelPacking:
+    """Tests for 2-bit label packing."""
+
+    def test_round_trip(self):
+        """Test packed labels unpack to the originals."""
+        labels = np.array([0, 1, 2, 3, 2, 1, 0], dtype=np.uint8)
+
+        packed = pack_labels(labels)
+
+        assert len(packed) == 2
+        np.testing.assert_array_equal(unpack_labels(packed, len(labels)), labels)
+
+    def test_bit_layout(self):
+        """Test the first label occupies the low bits of each byte."""
+        packed = pack_labels(np.array([1, 2, 0, 3], dtype=np.uint8))
+
+        assert packed.tolist() == [0b11_00_10_01]
+
+    def test_rejects_wide_labels(self):
+        """Test labels that do not fit in 2 bits are rejected."""
+        with pytest.raises(ValueError, match="0..3"):
+            pack_labels(np.array([4], dtype=np.uint8))
+
+
+class TestBinaryTile:
+    """Tests for the binary tile framing."""
+
+    def test_round_trip(self):
+        """Test positions, normals and labels survive encoding."""
+        rng = np.random.default_rng(0)
+        positions = rng.uniform(-1, 1, (7, 3)).astype(np.float32)
+        normals_oct = rng.integers(-127, 128, (7, 2)).astype(np.int8)
+        labels = rng.integers(0, 4, 7).astype(np.uint8)
+
+        decoded = decode_tile_binary(encode_tile_binary(positions, normals_oct, labels))
+
+        np.testing.assert_array_equal(decoded["positions"], positions)
+        np.testing.assert_array_equal(decoded["normals_oct"], normals_oct)
+        np.testing.assert_array_equal(decoded["labels"], labels)
+
+    def test_quantized_positions(self):
+        """Test 16-bit positions decode within half a step of the originals."""
+        rng = np.random.default_rng(1)
+        positions = rng.uniform([-5, 0, 10], [5, 2, 10], (100, 3)).astype(np.float32)
+
+        buf = encode_tile_binary(positions, quantize=True)
+        decoded = decode_tile_binary(buf)["positions"]
+
+        assert len(buf) == TILE_HEADER.size + TILE_QUANT_BOUNDS.size + 100 * 6
+        step = (positions.max(axis=0) - positions.min(axis=0)) / 65535
+        assert np.all(np.abs(decoded - positions) <= step / 2 + 1e-5)
+        # A flat axis decodes exactly
+        np.testing.assert_array_equal(decoded[:, 2], 10.0)
+
+    def test_positions_only_size(self):
+        """Test a tile without attributes is the header plus raw float32 positions."""
+        buf = encode_tile_binary(np.zeros((5, 3)))
+
+        assert len(buf) == TILE_HEADER.size + 5 * 12
+        decoded = decode_tile_binary(buf)
+        assert decoded["normals_oct"] is None
+        assert decoded["labels"] is None
+
+    def test_decode_rejects_other_data(self):
+        """Test foreign buffers are rejected."""
+        with pytest.raises(ValueError):
+            decode_tile_binary(bytes(16))
+
+
+class TestOctreeHierarchy:
+    """Tests for the binary implicit octree hierarchy."""
+
+    @pytest.fixture
+    def metadata(self) -> OctreeMetadata:
+        """A three-level octree with a sparse set of children."""
+        shape = {"r": ["r1", "r6"], "r1": [], "r6": ["r60", "r67"], "r60": [], "r67": []}
+        nodes = {
+            node_id: OctreeNodeInfo(
+                node_id=node_id,
+                level=len(node_id) - 1,
+                bounds_low=(0.0, 0.0, 0.0),
+                bounds_high=(1.0, 1.0, 1.0),
+                point_count=10 * len(node_id),
+                children=children,
+            )
+            for node_id, children in shape.items()
+        }
+        return OctreeMetadata(
+            bounds_low=(-1.0, -2.0, -3.0),
+            bounds_high=(1.0, 2.0, 3.0),
+            total_points=10,
+            max_depth=2,
+            node_count=len(nodes),
+            nodes=nodes,
+        )
+
+    def test_size(self, metadata: OctreeMetadata):
+        """Test the encoding is the header plus five bytes per node."""
+        encoded = encode_octree_hierarchy(metadata)
+
+        assert HIERARCHY_HEADER.size == 64
+        assert len(encoded) == 64 + 5 * metadata.node_count
+
+    def test_round_trip(self, metadata: OctreeMetadata):
+        """Test node IDs, counts and children are recovered from the layout."""
+        decoded = decode_octree_hierarchy(encode_octree_hierarchy(metadata))
+
+        assert set(decoded) == set(metadata.nodes)
+        for node_id, node in metadata.nodes.items():
+            assert decoded[node_id]["children"] == node.children
+            assert decoded[node_id]["point_count"] == node.point_count
+            assert decoded[node_id]["level"] == node.level
+
+    def test_header_fields(self, metadata: OctreeMetadata):
+        """Test the header carries bounds and depth."""
+        fields = HIERARCHY_HEADER.unpack_from(encode_octree_hierarchy(metadata))
+
+        assert fields[0] == b"SDFO"
+        assert fields[3:5] == (2, 5)
+        assert fields[5:] == (-1.0, -2.0, -3.0, 1.0, 2.0, 3.0)
+
+    def test_decode_rejects_other_data(self):
+        """Test foreign buffers are rejected."""
+        with pytest.raises(ValueError):
+            decode_octree_hierarchy(bytes(64))